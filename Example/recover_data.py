@@ -25,4 +25,20 @@ def _rd_pkl(directory,filename):
     path = os.path.join(directory,filename)    
     with open(path, 'rb') as fp:
         data = pickle.load(fp)
-    return data
\ No newline at end of file
+    return data
+
+def _rd_fault_cause(directory):
+    # fault_cause.npy holds uint8 codes (or a list of fault events with a 'cause' field), decoded by fault_cause_labels.npy
+    codes = _rd_np(directory,'fault_cause.npy')
+    labels = _rd_np(directory,'fault_cause_labels.npy')
+    if codes.dtype.names:
+        codes = codes['cause']
+    return labels[codes]
+
+
+def _rd_store(directory, name, **selection):
+    # result store written with the "Result store" option, e.g. _rd_store(path, 'EI_total', steps=slice(0, 12), columns='GWP')
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+    from result_store import ResultStore
+    return ResultStore(directory).read(name, **selection)
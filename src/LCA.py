@@ -13,20 +13,174 @@ Created on 2024
 @author: baudais
 """
 
+import math
 import os
+from concurrent.futures import ProcessPoolExecutor
 
 import brightway2 as bw
 import numpy as np
 import pandas as pd
-from brightway2 import *
-from stats_arrays import *
-
-
-def EI_calculation(dic, path_input, name_input):
+from bw2data.errors import InvalidExchange  # noqa: F401, raised by the import of an incomplete inventory
+from scipy.sparse.linalg import splu
+
+from lca_cache import LCAResultCache, content_hash, exchanges_hash
+
+# set in the metadata of the foreground database to recognise an inventory already imported
+IMPORT_HASH = "pelca_import_hash"
+CORE_MIGRATION = "biosphere-2-3-categories"
+
+
+def multi_method_scores(activities, methods):
+    """LCIA scores of every activity (columns) for every method (rows).
+
+    The technosphere matrix of all the activities is factorized once and solved for all their unit demands at once,
+    then the inventories are characterized by all the methods stacked in one matrix product, instead of one LCA and
+    one lcia() per activity and method.
+    """
+    lca = bw.LCA({act: 1 for act in activities}, methods[0])
+    lca.load_lci_data()
+    demand = np.zeros((lca.technosphere_matrix.shape[0], len(activities)))
+    for column, act in enumerate(activities):
+        demand[lca.product_dict[act.key], column] = 1
+    supply = splu(lca.technosphere_matrix.tocsc()).solve(demand)
+    inventory = lca.biosphere_matrix @ supply
+    characterization = []
+    for method in methods:
+        lca.switch_method(method)
+        characterization.append(lca.characterization_matrix.diagonal())
+    return np.vstack(characterization) @ inventory
+
+
+def activity_hashes(activities, foreground):
+    """Content hash of each activity: its exchanges and, recursively, those of its inputs from the foreground
+    database."""
+    memo = {}
+
+    def activity_hash(act):
+        if act.key not in memo:
+            memo[act.key] = None  # a loop in the foreground stops at the activity being hashed
+            memo[act.key] = exchanges_hash(
+                [exchange.as_dict() for exchange in act.exchanges()],
+                lambda key: activity_hash(bw.get_activity(key)) if key[0] == foreground and key != act.key else None,
+            )
+        return memo[act.key]
+
+    return [activity_hash(act) for act in activities]
+
+
+def database_version(dic):
+    """Version of the background data, the last modification of the ecoinvent and biosphere databases."""
+    return [str(bw.databases[name].get("modified")) for name in (dic["database_ecoinvent"], "biosphere3")
+            if name in bw.databases]
+
+
+def cached_scores(dic, activities, methods):
+    """multi_method_scores of the activities, reusing the scores of the LCA cache of unchanged activities."""
+    cache = LCAResultCache(os.path.join(dic["LCA_path"], "lca_cache.json"))
+    version = database_version(dic)
+    hashes = activity_hashes(activities, dic["inventory_name"])
+    scores = np.full((len(methods), len(activities)), np.nan)
+    for column, activity_hash in enumerate(hashes):
+        for row, method in enumerate(methods):
+            score = cache.get(activity_hash, method, version)
+            scores[row, column] = np.nan if score is None else score
+    missing = [column for column in range(len(activities)) if np.isnan(scores[:, column]).any()]
+    print(f"{len(activities) - len(missing)} activities taken from the LCA cache, {len(missing)} to calculate")
+    if missing:
+        scores[:, missing] = multi_method_scores([activities[column] for column in missing], methods)
+        for column in missing:
+            for row, method in enumerate(methods):
+                cache.put(hashes[column], method, version, scores[row, column])
+        cache.save()
+    return scores
+
+
+def _monte_carlo_chunk(project, functional_unit, methods, iterations, seed):
+    """(method, iteration) samples of one worker of monte_carlo_samples."""
+    bw.projects.set_current(project)
+    MC_lca = bw.MonteCarloLCA(functional_unit, seed=seed)
+    MC_lca.lci()
+    characterization = []
+    for method in methods:
+        MC_lca.switch_method(method)
+        characterization.append(MC_lca.characterization_matrix.diagonal())
+    characterization = np.vstack(characterization)
+    results = np.empty((len(methods), iterations))
+    for iteration in range(iterations):
+        next(MC_lca)
+        # (C * inventory).sum() of every method: characterization factors times the inventory summed over activities
+        results[:, iteration] = characterization @ np.asarray(MC_lca.inventory.sum(axis=1)).ravel()
+    return results
+
+
+def monte_carlo_functional_unit(dic, activities):
+    """Functional unit {activity key: amount} of the Monte Carlo LCA: one of each activity, the hourly use activities
+    over all the hours of the service life."""
+    use_amount = dic["num_hourPerYear"] * dic["service_life"]
+    return {act.key: use_amount if act["name"] in dic["use_activities"] else 1 for act in activities}
+
+
+def monte_carlo_samples(dic, functional_unit, methods):
+    """(method, iteration) Monte Carlo samples of the LCIA scores of functional_unit ({activity key: amount}).
+
+    The iterations are run by chunks of dic["MC_chunk"] in dic["MC_workers"] processes, chunk i seeded by the i-th
+    child of numpy.random.SeedSequence(dic["seed"]). After each round of chunks the run stops early once the standard
+    error of the mean of every method is below dic["MC_tolerance"] times its mean (0 runs all dic["iterations"]).
+    """
+    iterations = int(dic["iterations"])
+    workers = int(dic.get("MC_workers", 1))
+    tolerance = float(dic.get("MC_tolerance", 0))
+    chunk = int(dic.get("MC_chunk", 100))
+    sizes = [min(chunk, iterations - start) for start in range(0, iterations, chunk)]
+    seeds = [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(dic.get("seed")).spawn(len(sizes))]
+    arguments = [(dic["proj_name"], functional_unit, methods, size, seed) for size, seed in zip(sizes, seeds)]
+
+    samples = []
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for start in range(0, len(arguments), workers):
+            batch = arguments[start : start + workers]
+            if executor is None:
+                samples += [_monte_carlo_chunk(*argument) for argument in batch]
+            else:
+                samples += list(executor.map(_monte_carlo_chunk, *zip(*batch)))
+            results = np.hstack(samples)
+            print("Iterations : ", results.shape[1])
+            if tolerance > 0 and converged(results, tolerance):
+                print("Standard error below tolerance for every method")
+                break
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return results
+
+
+def converged(results, tolerance):
+    """Whether the standard error of the mean of every method (rows) is below tolerance times the mean."""
+    if results.shape[1] < 2:
+        return False
+    standard_error = results.std(axis=1, ddof=1) / math.sqrt(results.shape[1])
+    return bool(np.all(standard_error <= tolerance * np.abs(results.mean(axis=1))))
+
+
+def _write_inventory_hash(dic, filename):
+    # the result file is valid for this input workbook, see dictionary._init_dic
+    with open(os.path.join(dic["path_result_EI"], dic["directory"], filename + ".inventory_hash"), "w") as f:
+        f.write(dic["inventory_hash"])
+
+
+def setup_project(dic, path_input, name_input):
+    """Open the brightway project of dic and import only what it lacks: biosphere and methods, ecoinvent, the core
+    migrations, and the inventory of the input workbook if its sheets or the background databases changed since its
+    last import."""
     # open project
-    projects.set_current(dic["proj_name"])  # Creating/accessing the project
+    bw.projects.set_current(dic["proj_name"])  # Creating/accessing the project
 
-    bw2setup()  # Importing elementary flows, LCIA methods and some other data
+    # warm start: biosphere, methods and migrations are written once per project
+    if "biosphere3" in bw.databases and len(bw.methods):
+        print("Project already set up.")
+    else:
+        bw.bw2setup()  # Importing elementary flows, LCIA methods and some other data
 
     # ecoinvent
     if dic["database_ecoinvent"] in bw.databases:
@@ -42,25 +196,37 @@ def EI_calculation(dic, path_input, name_input):
         ei37cutoff.statistics()
         ei37cutoff.write_database()
 
-    bw.create_core_migrations()
+    if CORE_MIGRATION not in bw.migrations:
+        bw.create_core_migrations()
 
-    # Export excel
-    imp = bw.ExcelImporter(os.path.join(path_input, name_input))
-    imp.apply_strategies()
-    imp.match_database(fields=("name", "reference product", "unit", "location"))
-    imp.match_database(dic["database_ecoinvent"], fields=("name", "reference product", "unit", "location"))
-    imp.statistics()
+    # the inventory is imported again only if its sheets or the background databases changed since the last import
+    import_hash = content_hash(dic["import_hash"], database_version(dic))
+    if dic["inventory_name"] in bw.databases and bw.databases[dic["inventory_name"]].get(IMPORT_HASH) == import_hash:
+        print("Inventory has already been imported.")
+    else:
+        # Export excel
+        imp = bw.ExcelImporter(os.path.join(path_input, name_input))
+        imp.apply_strategies()
+        imp.match_database(fields=("name", "reference product", "unit", "location"))
+        imp.match_database(dic["database_ecoinvent"], fields=("name", "reference product", "unit", "location"))
+        imp.statistics()
 
-    # imp.write_excel()  # ou can check whether the import went as expected by having a look at an Excel sheet, that includes our process data.
+        # imp.write_excel()  # ou can check whether the import went as expected by having a look at an Excel sheet, that includes our process data.
 
-    imp.write_database()  # Having imported the data, we also need to write it to a database to save it
+        imp.write_database()  # Having imported the data, we also need to write it to a database to save it
+        bw.databases[dic["inventory_name"]][IMPORT_HASH] = import_hash
+        bw.databases.flush()
+
+
+def EI_calculation(dic, path_input, name_input):
+    setup_project(dic, path_input, name_input)
 
     print("\n")
     activities = bw.Database(dic["inventory_name"])  # activities presentation
     for act in activities:
         print(act)
 
-    act_LCA = activities
+    act_LCA = list(activities)
     methods = []
 
     for index, row in dic["LCIA"].iterrows():
@@ -71,14 +237,11 @@ def EI_calculation(dic, path_input, name_input):
 
     print("\n")
     print("Starting LCA calculation :")
-    for act in act_LCA:
+    scores = cached_scores(dic, act_LCA, methods)
+    for column, act in enumerate(act_LCA):
         print(act)
-        lca = bw.LCA({act: 1})
-        lca.lci()
-        for method in methods:
-            lca.switch_method(method)
-            lca.lcia()
-            results.append((act["name"], method[1].title(), lca.score))
+        for row, method in enumerate(methods):
+            results.append((act["name"], method[1].title(), scores[row, column]))
     # results
 
     # Mise en forme des résultats
@@ -95,29 +258,9 @@ def EI_calculation(dic, path_input, name_input):
     # Basic LCA
 
     # Diviser le DataFrame en deux parties : avec et sans 'energy per hours'
-    excel = pd.ExcelFile(os.path.join(path_input, name_input))
-    df = pd.read_excel(excel, sheet_name="Inventory - Use", header=None)
-    df_RU = pd.read_excel(excel, sheet_name="Inventory - Manufacturing", header=None)
-
-    excel.close()
-
-    # Initialiser une liste pour stocker les nom des RU
-    list_RU = []
-    # Parcourir chaque ligne du DataFrame
-    for index, row in df_RU.iterrows():
-        # Vérifier si le contenu de la colonne 0 est 'activity'
-        if row[0] == "Activity":
-            # Ajouter la valeur de la colonne 1 à la liste
-            list_RU.append(row[1])
-
-    # Initialiser une liste pour stocker les valeurs
-    list_energy = []
-    # Parcourir chaque ligne du DataFrame
-    for index, row in df.iterrows():
-        # Vérifier si le contenu de la colonne 0 est 'activity'
-        if row[0] == "Activity":
-            # Ajouter la valeur de la colonne 1 à la liste
-            list_energy.append(row[1])
+    # noms des RU et des activités d'usage, lus une seule fois avec la configuration
+    list_RU = dic["RU_activities"]
+    list_energy = dic["use_activities"]
     df_without_energy = results_df.drop(columns=list_energy).copy()
     df_energy_only = results_df[list_energy].copy()
 
@@ -137,69 +280,21 @@ def EI_calculation(dic, path_input, name_input):
         # Écrire chaque partie dans une feuille différente
         df_without_energy.to_excel(writer, sheet_name="Manufacturing", index=True)
         df_energy_only.to_excel(writer, sheet_name="Use", index=True)
+    _write_inventory_hash(dic, dic["filename_result_EI"])
 
     # Monte Carlo part
     if dic["simulation"] == "Monte Carlo":
-        # Lire les données d'Inventory - Use pour la simulation
-        df_inventory_use = pd.read_excel(
-            os.path.join(path_input, name_input), sheet_name="Inventory - Use", header=None
-        )
-        excel.close()
-
-        # Modifier les quantités pour Monte Carlo
-        updated_factors = df_inventory_use[df_inventory_use[0] == "Activity"][1].apply(
-            lambda x: x * dic["num_hourPerYear"] * dic["service_life"]
-        )
-        activity_updates = dict(zip(df_inventory_use[df_inventory_use[0] == "Activity"][1], updated_factors))
-
-        # define the function for MC simulation
-        iterations = dic["iterations"]
-
-        def multiImpactMonteCarloLCA(functional_unit, list_methods, iterations):
-            # Step 1
-            MC_lca = bw.MonteCarloLCA(functional_unit)
-            MC_lca.lci()  # take time
-            # Step 2
-            C_matrices = {}
-            # Step 3
-            for method in list_methods:
-                MC_lca.switch_method(method)
-                C_matrices[method] = MC_lca.characterization_matrix
-            # Step 4
-            results = np.empty((len(list_methods), iterations))
-            # Step 5
-            i = 0
-            for iteration in range(iterations):
-                next(MC_lca)  # take time
-                i = i + 1
-                print("Iteration : ", iteration)
-                for method_index, method in enumerate(list_methods):
-                    results[method_index, iteration] = (C_matrices[method] * MC_lca.inventory).sum()
-            return results
-
-        # Update the functional unit with the modified quantities
-        fu = {act: activity_updates.get(act, 1) for act in activities}
+        fu = monte_carlo_functional_unit(dic, activities)
 
         # let it run!
         print("\nMonte Carlo : ", dic["proj_name"])
-        test_results = multiImpactMonteCarloLCA(fu, methods, iterations)
-
-        st_dev_list = []
-        mean_list = []
-        mean_list_norm = []
-        max_list_norm = []
-        min_list_norm = []
-        for i in range(0, len(test_results)):
-            st_dev = np.std(test_results[i, :])
-            st_dev_list.append(st_dev)
-            mean = np.mean(test_results[i, :])
-            mean_print = 100
-            mean_list.append(mean)
-            mean_list_norm.append(mean_print)
-            maxi = mean + 2 * st_dev
-            max_list_norm.append(maxi)
-            minim = mean - 2 * st_dev
-            min_list_norm.append(minim)
+        test_results = monte_carlo_samples(dic, fu, methods)
+        np.save(os.path.join(dic["path_result_EI"], dic["directory"], "LCA_MC_samples.npy"), test_results)
+
+        mean_list = test_results.mean(axis=1)
+        st_dev_list = test_results.std(axis=1)
+        max_list_norm = mean_list + 2 * st_dev_list
+        min_list_norm = mean_list - 2 * st_dev_list
 
         list_results_MC = list(zip(dic["LCIA_unit"], mean_list, st_dev_list, max_list_norm, min_list_norm))
         results_df_MC = pd.DataFrame(list_results_MC, columns=["Unit", "Mean", "SD", "Max", "Min"])
@@ -207,3 +302,4 @@ def EI_calculation(dic, path_input, name_input):
         results_df_MC = results_df_MC.reset_index()
         results_df_MC = results_df_MC.rename(columns={"index": "Method"})
         results_df_MC.to_excel(os.path.join(dic["path_result_EI"], dic["directory"], dic["filename_result_EI_MC"]))
+        _write_inventory_hash(dic, dic["filename_result_EI_MC"])
@@ -0,0 +1,58 @@
+"""Import time of the PELCA modules, measured with python -X importtime in a fresh interpreter.
+
+Usage: python benchmark_imports.py [--modules pelca staircase] [--top 15]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# modules that a run whose LCA results are already calculated must not load
+HEAVY_MODULES = ("brightway2", "bw2data", "bw2calc", "bw2io", "peewee", "whoosh", "customtkinter", "scipy.stats")
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_times(modules):
+    """{module: (self, cumulative) import time in microseconds} of importing modules in a fresh interpreter, in
+    import order."""
+    statement = "; ".join(f"import {module}" for module in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            times[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return times
+
+
+def total_time(times, modules):
+    """Cumulative import time of the top-level modules, in seconds."""
+    return sum(times[module][1] for module in modules if module in times) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time of PELCA modules")
+    parser.add_argument("--modules", nargs="+", default=["pelca", "staircase", "plotting"])
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    times = import_times(args.modules)
+    print(f"{total_time(times, args.modules):.3f} s to import {', '.join(args.modules)}")
+    print(f"{'Module':<40}{'Self (ms)':>12}{'Cumulative (ms)':>18}")
+    for module, (own, cumulative) in sorted(times.items(), key=lambda item: -item[1][1])[: args.top]:
+        print(f"{module:<40}{own / 1000:>12.1f}{cumulative / 1000:>18.1f}")
+    heavy = [module for module in HEAVY_MODULES if module in times]
+    if heavy:
+        print(f"Heavy modules imported: {', '.join(heavy)}")
+
+
+if __name__ == "__main__":
+    main()
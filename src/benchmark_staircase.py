@@ -0,0 +1,80 @@
+"""Benchmark of the staircase engines on a synthetic system.
+
+Usage: python benchmark_staircase.py [--iterations 10000] [--service-life 30] [--step 12] [--RU 4]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from staircase import STAIRCASE
+
+
+def synthetic_inputs(args):
+    """Random LCA results and fault table for args.RU replacement units, with cross replacement of the last RU."""
+    rng = np.random.default_rng(0)
+    EI_manufacturing = rng.uniform(1, 10, (16, args.RU))
+    EI_use = rng.uniform(0, 1e-3, (16, args.RU))
+    beta_sigma_ERW = np.column_stack(
+        [
+            np.full(args.RU, 1000.0),
+            np.full(args.RU, 0.6),
+            np.full(args.RU, 3000.0),
+            np.ones(args.RU),
+            rng.uniform(10, 40, args.RU),
+            np.full(args.RU, 8.0),
+        ]
+    )
+    remplacement_matrix = np.eye(args.RU)
+    remplacement_matrix[-1, :] = 1
+    dic = {
+        "service_life": args.service_life,
+        "step": args.step,
+        "num_hourPerYear": 5000,
+        "nb_ite_MC": args.iterations,
+        "Early_failure": "True",
+        "Random_failure": "True",
+        "Wearout_failure": "True",
+        "Maintenance": "False",
+        "maintenance": np.full(args.RU, np.nan),
+        "pre_set_fail": False,
+        "Remplacement_matrix": pd.DataFrame(remplacement_matrix),
+    }
+    return dic, EI_manufacturing, EI_use, beta_sigma_ERW
+
+
+def run(engine, args):
+    dic, EI_manufacturing, EI_use, beta_sigma_ERW = synthetic_inputs(args)
+    dic["engine"] = engine
+    start = time.perf_counter()
+    staircase = STAIRCASE.from_arrays(dic, EI_manufacturing, EI_use, beta_sigma_ERW, rng=0)
+    return time.perf_counter() - start, staircase
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the staircase engines")
+    parser.add_argument("--iterations", type=int, default=10000)
+    parser.add_argument("--service-life", type=int, default=30)
+    parser.add_argument("--step", type=int, default=12)
+    parser.add_argument("--RU", type=int, default=4)
+    parser.add_argument("--engines", nargs="+", default=["Loop", "Vectorized", "Event"])
+    args = parser.parse_args()
+
+    print(
+        f"{args.iterations} iterations, {args.service_life} years x {args.step} steps/year, {args.RU} RU"
+    )
+    print(f"{'Engine':<12}{'Time (s)':>10}{'Speed-up':>10}{'Mean EI_total[0]':>20}{'Mean faults':>14}")
+    reference = None
+    for engine in args.engines:
+        duration, staircase = run(engine, args)
+        reference = duration if reference is None else reference
+        print(
+            f"{engine:<12}{duration:>10.2f}{reference / duration:>10.1f}"
+            f"{staircase.EI_total[-1, :, 0].mean():>20.4g}{staircase.number_of_fault[-1].sum(axis=1).mean():>14.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
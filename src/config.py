@@ -0,0 +1,335 @@
+"""PELCA (Power Electronics Life Cycle Assessment) is an open-source project aimed at assessing the environmental impact over the life cycle of modular and diagnosable power electronics systems. The integration of modularity and diagnosability aligns with circular economy principles, promoting practices such as repair and reuse. This project provides a tool to calculate the environmental impacts associated with the manufacturing, usage, and replacement of power electronics products.
+Copyright (C) Mitsubishi Electric R&D Centre Europe and SATIE 2024, author Briac Baudais baudaisbriac@gmail.com
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU Lesser General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with this program.  If not, see https://www.gnu.org/licenses/lgpl-3.0.html"""
+
+"""
+Input workbook loader: every sheet is parsed once into a typed PelcaConfig, memoised in memory and on disk.
+"""
+
+import dataclasses
+import hashlib
+import json
+import numbers
+import os
+from dataclasses import dataclass, field
+from typing import Optional
+
+import pandas as pd
+
+from lca_cache import INVENTORY_SHEETS, sheets_hash
+
+SHEETS = ("LCA", "LCIA", "Staircase", "Replac. Matrix", "Faults & Maintenance") + INVENTORY_SHEETS
+CACHE_FOLDER = "__pelca_cache__"
+CACHE_VERSION = 1
+_memo = {}
+
+
+def get_value_from_df(df, search_value, col_index=1):
+    return df.iloc[df[df.isin([search_value]).any(axis=1)].index[0], col_index]
+
+
+def get_optional_value_from_df(df, search_value, default, col_index=1):
+    # Rows added after the first release may be missing from older input files
+    if not df.isin([search_value]).any(axis=None):
+        return default
+    value = get_value_from_df(df, search_value, col_index)
+    return default if pd.isna(value) else value
+
+
+def _body(raw, first_row):
+    """Rows of a sheet read with header=None from first_row, renumbered from 0."""
+    return raw.iloc[first_row:].reset_index(drop=True)
+
+
+def _table(raw, header_row, index_col=None):
+    """Table of a sheet read with header=None whose column names are on header_row."""
+    table = raw.iloc[header_row + 1 :].dropna(how="all").reset_index(drop=True)
+    table.columns = raw.iloc[header_row]
+    if index_col is not None:
+        table = table.set_index(table.columns[index_col])
+    table = table.loc[:, table.columns.notna()]
+    table.columns.name = table.index.name = None
+    return table.infer_objects()
+
+
+def _activities(raw):
+    """Names of the activities of an inventory sheet."""
+    return [] if raw is None else raw.loc[raw[0] == "Activity", 1].tolist()
+
+
+def _bool(value, name):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+        return value.strip().lower() == "true"
+    raise ValueError(f"'{name}' must be True or False, got {value!r}")
+
+
+def _integer(value, name, minimum):
+    if pd.isna(value) or float(value) != int(float(value)) or int(float(value)) < minimum:
+        raise ValueError(f"'{name}' must be an integer of at least {minimum}, got {value!r}")
+    return int(float(value))
+
+
+def _positive(value, name):
+    if isinstance(value, bool) or not isinstance(value, numbers.Real) or value < 0:
+        raise ValueError(f"'{name}' must be a number of at least 0, got {value!r}")
+    return float(value)
+
+
+def _choice(value, name, choices):
+    if value not in choices:
+        raise ValueError(f"'{name}' must be one of {', '.join(choices)}, got {value!r}")
+    return value
+
+
+@dataclass
+class PelcaConfig:
+    """Content of an input workbook.
+
+    Boolean options are bools here and "True"/"False" strings in the dic returned by to_dic, the form the rest of
+    the tool uses.
+    """
+
+    # LCA sheet, the brightway fields are only needed when the LCA has to be calculated
+    path_result_EI: str
+    filename_result_EI: str
+    filename_result_EI_MC: str
+    simulation: str
+    database_ecoinvent: Optional[str] = None
+    database_ecoinvent_path: Optional[str] = None
+    inventory_name: Optional[str] = None
+    proj_name: Optional[str] = None
+    iterations: Optional[int] = None
+    MC_workers: int = 1
+    MC_chunk: int = 100
+    MC_tolerance: float = 0.0
+    # Staircase sheet
+    service_life: int = 1
+    num_hourPerYear: float = 0
+    step: int = 1
+    filename_result_staircase: str = ""
+    nb_ite_MC: int = 1
+    Early_failure: bool = True
+    Random_failure: bool = True
+    Wearout_failure: bool = True
+    Maintenance: bool = False
+    engine: str = "Loop"
+    sampling: str = "Random"
+    importance_sampling: float = 0.0
+    output: str = "Trajectories"
+    save_trajectories: bool = False
+    result_store: bool = False
+    reuse_faults: bool = False
+    batch_size: int = 1000
+    target_precision: float = 0.0
+    time_budget: float = 0.0
+    fault_cause_format: str = "Dense"
+    workers: int = 0
+    seed: Optional[int] = None
+    weibull_cache: Optional[str] = None
+    weibull_cache_size: float = 256.0
+    selected_EI: int = 0
+    # tables and inventory
+    LCIA: pd.DataFrame = field(default_factory=pd.DataFrame)
+    Remplacement_matrix: pd.DataFrame = field(default_factory=pd.DataFrame)
+    faults: pd.DataFrame = field(default_factory=pd.DataFrame)
+    RU_activities: list = field(default_factory=list)
+    use_activities: list = field(default_factory=list)
+    inventory_hash: str = ""
+    import_hash: str = ""
+
+    def __post_init__(self):
+        _choice(self.simulation, "Type of simulation (Analysis\\Monte Carlo)", ("Analysis", "Monte Carlo"))
+        self.service_life = _integer(self.service_life, "Service life (year)", 1)
+        self.step = _integer(self.step, "Time step (step/year)", 1)
+        self.nb_ite_MC = _integer(self.nb_ite_MC, "Monte Carlo (number of iteration)", 1)
+        if isinstance(self.num_hourPerYear, bool) or not isinstance(self.num_hourPerYear, numbers.Real):
+            raise ValueError(f"'Annual usage time (hours/year)' must be a number, got {self.num_hourPerYear!r}")
+        for name in ["Early_failure", "Random_failure", "Wearout_failure", "Maintenance", "save_trajectories", "result_store",
+                     "reuse_faults"]:
+            setattr(self, name, _bool(getattr(self, name), name.replace("_", " ")))
+        _choice(self.engine, "Staircase engine", ("Loop", "Vectorized", "Event", "Renewal"))
+        _choice(self.sampling, "Sampling", ("Random", "Antithetic", "Latin hypercube", "Sobol"))
+        self.importance_sampling = _positive(self.importance_sampling, "Importance sampling")
+        if self.importance_sampling >= 1:
+            raise ValueError(f"'Importance sampling' must be below 1, got {self.importance_sampling!r}")
+        _choice(self.output, "Staircase output", ("Trajectories", "Statistics", "Memory-mapped"))
+        _choice(self.fault_cause_format, "Fault cause format", ("Dense", "Events"))
+        self.batch_size = _integer(self.batch_size, "Iterations per batch", 1)
+        self.target_precision = _positive(self.target_precision, "Target relative precision")
+        self.time_budget = _positive(self.time_budget, "Time budget (s)")
+        self.workers = _integer(self.workers, "Parallel workers", 0)
+        self.seed = None if self.seed is None else _integer(self.seed, "Random seed", 0)
+        if self.iterations is not None:
+            self.iterations = _integer(self.iterations, "Number of iterations (Monte Carlo)", 1)
+        self.MC_workers = _integer(self.MC_workers, "Monte Carlo workers", 1)
+        self.MC_chunk = _integer(self.MC_chunk, "Monte Carlo iterations per worker", 1)
+        self.MC_tolerance = float(self.MC_tolerance)
+        self.weibull_cache_size = float(self.weibull_cache_size)
+        self.selected_EI = _integer(self.selected_EI, "Plot specific env. impact", 0)
+
+    @classmethod
+    def from_sheets(cls, raw_sheets):
+        """Config of the sheets of a workbook read with header=None ({sheet name: DataFrame})."""
+        df = _body(raw_sheets["LCA"], 1)
+        df_stair = _body(raw_sheets["Staircase"], 1)
+        df_RM = _body(raw_sheets["Replac. Matrix"], 4).iloc[:, 1:].dropna(how="all").dropna(how="all", axis=1)
+        faults = raw_sheets.get("Faults & Maintenance")
+        return cls(
+            path_result_EI=get_value_from_df(df, "LCA result path"),
+            filename_result_EI=get_value_from_df(df, "LCA result filename"),
+            filename_result_EI_MC=get_value_from_df(df, "LCA Monte Carlo result filename"),
+            simulation=get_value_from_df(df, "Type of simulation (Analysis\\Monte Carlo)"),
+            database_ecoinvent=get_optional_value_from_df(df, "Database ecoinvent", None),
+            database_ecoinvent_path=get_optional_value_from_df(df, "Ecoinvent path", None),
+            inventory_name=get_optional_value_from_df(df, "Inventory name", None),
+            proj_name=get_optional_value_from_df(df, "Project name (brightway)", None),
+            iterations=get_optional_value_from_df(df, "Number of iterations (Monte Carlo)", None),
+            MC_workers=get_optional_value_from_df(df, "Monte Carlo workers", 1),
+            MC_chunk=get_optional_value_from_df(df, "Monte Carlo iterations per worker", 100),
+            MC_tolerance=get_optional_value_from_df(df, "Monte Carlo tolerance", 0),
+            service_life=get_value_from_df(df_stair, "Service life (year)"),
+            num_hourPerYear=get_value_from_df(df_stair, "Annual usage time (hours/year)"),
+            step=get_value_from_df(df_stair, "Time step (step/year)"),
+            filename_result_staircase=get_value_from_df(df_stair, "Staircase result filename"),
+            nb_ite_MC=get_value_from_df(df_stair, "Monte Carlo (number of iteration)"),
+            Early_failure=get_value_from_df(df_stair, "Early failure"),
+            Random_failure=get_value_from_df(df_stair, "Random failure"),
+            Wearout_failure=get_value_from_df(df_stair, "Wearout failure"),
+            Maintenance=get_value_from_df(df_stair, "Maintenance"),
+            engine=get_optional_value_from_df(df_stair, "Staircase engine", "Loop"),
+            sampling=get_optional_value_from_df(df_stair, "Sampling", "Random"),
+            importance_sampling=get_optional_value_from_df(df_stair, "Importance sampling", 0.0),
+            output=get_optional_value_from_df(df_stair, "Staircase output", "Trajectories"),
+            save_trajectories=get_optional_value_from_df(df_stair, "Save trajectories", "False"),
+            result_store=get_optional_value_from_df(df_stair, "Result store", "False"),
+            reuse_faults=get_optional_value_from_df(df_stair, "Reuse fault samples", "False"),
+            batch_size=get_optional_value_from_df(df_stair, "Iterations per batch", 1000),
+            target_precision=get_optional_value_from_df(df_stair, "Target relative precision", 0.0),
+            time_budget=get_optional_value_from_df(df_stair, "Time budget (s)", 0.0),
+            fault_cause_format=get_optional_value_from_df(df_stair, "Fault cause format", "Dense"),
+            workers=get_optional_value_from_df(df_stair, "Parallel workers", 0),
+            seed=get_optional_value_from_df(df_stair, "Random seed", None),
+            weibull_cache=get_optional_value_from_df(df_stair, "Weibull cache folder", None),
+            weibull_cache_size=get_optional_value_from_df(df_stair, "Weibull cache size (MB)", 256),
+            selected_EI=get_value_from_df(df_stair, "Plot specific env. impact") - 1,
+            LCIA=_table(raw_sheets["LCIA"], 1),
+            Remplacement_matrix=df_RM.reset_index(drop=True).infer_objects(),
+            faults=pd.DataFrame() if faults is None else _table(faults, 3, index_col=0),
+            RU_activities=_activities(raw_sheets.get("Inventory - Manufacturing")),
+            use_activities=_activities(raw_sheets.get("Inventory - Use")),
+            inventory_hash=sheets_hash(raw_sheets),
+            import_hash=sheets_hash(raw_sheets, INVENTORY_SHEETS),
+        )
+
+    def to_dic(self):
+        """The configuration as the dic used by the LCA, staircase and plotting modules."""
+        dic = {}
+        for item in dataclasses.fields(self):
+            value = getattr(self, item.name)
+            if isinstance(value, bool):
+                value = str(value)
+            elif isinstance(value, pd.DataFrame):
+                value = value.copy()
+            dic[item.name] = value
+        dic["directory"] = "Results PELCA"
+        dic["LCA_path"] = os.path.join(self.path_result_EI, dic["directory"])
+        if self.weibull_cache is None:
+            dic["weibull_cache"] = os.path.join(dic["LCA_path"], "weibull_cache")
+        dic["EI_name"] = self.LCIA["Acronym"].tolist() if "Acronym" in self.LCIA else []
+        dic["LCIA_unit"] = self.LCIA["Unit"].tolist() if "Unit" in self.LCIA else []
+        dic["pre_set_fail"] = False
+        return dic
+
+    def to_json(self):
+        """Compact serialized form, read back by from_json."""
+        values = {}
+        for item in dataclasses.fields(self):
+            value = getattr(self, item.name)
+            if isinstance(value, pd.DataFrame):
+                # exact float repr, unlike DataFrame.to_json
+                value = {
+                    "frame": {
+                        "columns": value.columns.tolist(),
+                        "index": value.index.tolist(),
+                        "data": value.astype(object).to_numpy().tolist(),
+                    }
+                }
+            values[item.name] = value
+        # numpy scalars left in the object columns of the tables
+        return json.dumps(values, default=lambda value: value.item())
+
+    @classmethod
+    def from_json(cls, text):
+        values = json.loads(text)
+        for name, value in values.items():
+            if isinstance(value, dict) and "frame" in value:
+                values[name] = pd.DataFrame(**value["frame"]).infer_objects()
+        return cls(**values)
+
+
+def read_workbook(path):
+    """Sheets of the workbook PELCA uses, each parsed once with header=None."""
+    with pd.ExcelFile(path) as excel:
+        return pd.read_excel(excel, sheet_name=[sheet for sheet in SHEETS if sheet in excel.sheet_names], header=None)
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_config(path_input, name_input):
+    """PelcaConfig of an input workbook.
+
+    The parsed configuration is memoised in memory and in __pelca_cache__/<workbook>.json next to the workbook, valid
+    while the workbook keeps the same modification time and size, or failing that the same content hash. Only a
+    modified workbook is parsed again.
+    """
+    path = os.path.abspath(os.path.join(path_input, name_input))
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    if path in _memo and _memo[path][0] == signature:
+        return _memo[path][1]
+
+    cache_path = os.path.join(os.path.dirname(path), CACHE_FOLDER, name_input + ".json")
+    cached = None
+    if os.path.exists(cache_path):
+        with open(cache_path) as f:
+            cached = json.load(f)
+        if cached.get("version") != CACHE_VERSION:
+            cached = None
+    file_hash = None
+    if cached is not None and [cached["mtime_ns"], cached["size"]] != list(signature):
+        file_hash = _file_hash(path)
+        if cached["sha256"] != file_hash:
+            cached = None
+
+    if cached is not None:
+        config = PelcaConfig.from_json(cached["config"])
+    else:
+        config = PelcaConfig.from_sheets(read_workbook(path))
+    if cached is None or file_hash is not None:
+        # new or touched workbook: store its configuration under its current signature
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        entry = {
+            "version": CACHE_VERSION,
+            "mtime_ns": signature[0],
+            "size": signature[1],
+            "sha256": file_hash or _file_hash(path),
+            "config": config.to_json(),
+        }
+        with open(cache_path + ".tmp", "w") as f:
+            json.dump(entry, f)
+        os.replace(cache_path + ".tmp", cache_path)
+    _memo[path] = (signature, config)
+    return config
@@ -13,59 +13,26 @@ Created on 2024
 @author: baudais
 """
 
-import csv
 import os
-import pickle
-import shutil
 
-import numpy as np
 import pandas as pd
 
+from config import load_config
+
 
 def _init_dir(path, directory):
-    # Create the directory
+    # Create the directory, keeping the caches it may already hold (LCA scores, Weibull tables)
     if os.path.exists(path):
-        shutil.rmtree(path)
+        return
     os.mkdir(path)
     print("Directory '% s' created" % directory)
 
 
 # %% Init
 def _init_dic(path_input, name_input):
-    def read_excel_sheet(excel, sheet_name, header, skiprows, usecols=None):
-        return pd.read_excel(excel, sheet_name=sheet_name, header=header, skiprows=skiprows, usecols=usecols)
-
-    def get_value_from_df(df, search_value, col_index=1):
-        return df.iloc[df[df.isin([search_value]).any(axis=1)].index[0], col_index]
-
-    def save_dict_to_file(dic, path, file_name, file_name_pickle):
-        path_file = os.path.join(path, file_name)
-        path_file_pickle = os.path.join(path, file_name_pickle)
-
-        with open(path_file, "w") as csv_file:
-            writer = csv.writer(csv_file)
-            for key, value in dic.items():
-                writer.writerow([key, value])
-
-        with open(path_file_pickle, "wb") as fp:
-            pickle.dump(dic, fp)
-
-    excel = pd.ExcelFile(os.path.join(path_input, name_input))
-    df = read_excel_sheet(excel, "LCA", header=None, skiprows=1)
-    df_LCIA = read_excel_sheet(excel, "LCIA", header=0, skiprows=1)
-    df_stair = read_excel_sheet(excel, "Staircase", header=None, skiprows=1)
-    df_RM = read_excel_sheet(excel, "Replac. Matrix", header=None, skiprows=[0, 1, 2, 3], usecols=lambda x: x != 0)
-    excel.close()
-
-    dic = {}
-
-    dic["path_result_EI"] = get_value_from_df(df, "LCA result path")
-    dic["filename_result_EI"] = get_value_from_df(df, "LCA result filename")
-    dic["filename_result_EI_MC"] = get_value_from_df(df, "LCA Monte Carlo result filename")
-    dic["simulation"] = get_value_from_df(df, "Type of simulation (Analysis\\Monte Carlo)")
-    dic["directory"] = "Results PELCA"
-    dic["LCA_path"] = os.path.join(dic["path_result_EI"], dic["directory"])
-    path = os.path.join(path_input, dic["directory"])
+    # every sheet of the workbook is parsed once, and not at all while the workbook is unchanged
+    config = load_config(path_input, name_input)
+    dic = config.to_dic()
 
     file_path = os.path.join(
         dic["path_result_EI"],
@@ -73,7 +40,14 @@ def _init_dic(path_input, name_input):
         dic["filename_result_EI"] if dic["simulation"] == "Analysis" else dic["filename_result_EI_MC"],
     )
 
-    if os.path.exists(file_path):
+    # the results are reused only if they were calculated from the same inventory, LCA and LCIA sheets
+    hash_path = file_path + ".inventory_hash"
+    same_inventory = False
+    if os.path.exists(hash_path):
+        with open(hash_path) as f:
+            same_inventory = f.read() == dic["inventory_hash"]
+
+    if os.path.exists(file_path) and same_inventory:
         print("LCA is already calculated.")
         dic["LCA"] = "no"
         excel = pd.ExcelFile(file_path)
@@ -82,34 +56,21 @@ def _init_dic(path_input, name_input):
         dic["EI_name"] = df_result["Method"].tolist()
         dic["LCIA_unit"] = df_result["Unit"].tolist()
     else:
-        print("LCA not yet calculated.")
+        print("LCA not yet calculated." if not os.path.exists(file_path) else "Inventory changed, LCA to update.")
         dic["LCA"] = "yes"
-        _init_dir(dic["LCA_path"], dic["directory"])
-
-        dic["database_ecoinvent"] = get_value_from_df(df, "Database ecoinvent")
-        dic["database_ecoinvent_path"] = get_value_from_df(df, "Ecoinvent path")
-        dic["inventory_name"] = get_value_from_df(df, "Inventory name")
-        dic["proj_name"] = get_value_from_df(df, "Project name (brightway)")
-        dic["iterations"] = get_value_from_df(df, "Number of iterations (Monte Carlo)")
-
-        dic["EI_name"] = df_LCIA["Acronym"].tolist()
-        dic["LCIA_unit"] = df_LCIA["Unit"].tolist()
-        dic["LCIA"] = df_LCIA
-
-    dic["service_life"] = get_value_from_df(df_stair, "Service life (year)")
-    dic["num_hourPerYear"] = get_value_from_df(df_stair, "Annual usage time (hours/year)")
-    dic["step"] = get_value_from_df(df_stair, "Time step (step/year)")
-    dic["filename_result_staircase"] = get_value_from_df(df_stair, "Staircase result filename")
-    dic["nb_ite_MC"] = get_value_from_df(df_stair, "Monte Carlo (number of iteration)")
-    dic["Early_failure"] = get_value_from_df(df_stair, "Early failure")
-    dic["Random_failure"] = get_value_from_df(df_stair, "Random failure")
-    dic["Wearout_failure"] = get_value_from_df(df_stair, "Wearout failure")
-    dic["Maintenance"] = get_value_from_df(df_stair, "Maintenance")
-    dic["pre_set_fail"] = False
-    dic["Remplacement_matrix"] = df_RM
-    dic["selected_EI"] = get_value_from_df(df_stair, "Plot specific env. impact") - 1
-
-    save_dict_to_file(dic, dic["LCA_path"], "dict_file.csv", "dict_file.pkl")
-    print("dictionary saved successfully to file")
+        for name, row in [
+            ("database_ecoinvent", "Database ecoinvent"),
+            ("database_ecoinvent_path", "Ecoinvent path"),
+            ("inventory_name", "Inventory name"),
+            ("proj_name", "Project name (brightway)"),
+            ("iterations", "Number of iterations (Monte Carlo)"),
+        ]:
+            if dic[name] is None:
+                raise ValueError(f"'{row}' of the LCA sheet is needed to calculate the LCA")
+
+    _init_dir(dic["LCA_path"], dic["directory"])
+    with open(os.path.join(dic["LCA_path"], "config.json"), "w") as f:
+        f.write(config.to_json())
+    print("configuration saved successfully to file")
 
     return dic
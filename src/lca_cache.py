@@ -0,0 +1,86 @@
+"""PELCA (Power Electronics Life Cycle Assessment) is an open-source project aimed at assessing the environmental impact over the life cycle of modular and diagnosable power electronics systems. The integration of modularity and diagnosability aligns with circular economy principles, promoting practices such as repair and reuse. This project provides a tool to calculate the environmental impacts associated with the manufacturing, usage, and replacement of power electronics products.
+Copyright (C) Mitsubishi Electric R&D Centre Europe and SATIE 2024, author Briac Baudais baudaisbriac@gmail.com
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU Lesser General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with this program.  If not, see https://www.gnu.org/licenses/lgpl-3.0.html"""
+
+"""
+Persistent cache of the LCA scores, so that only the activities whose inventory changed are recalculated.
+"""
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+INVENTORY_SHEETS = ("Inventory - Manufacturing", "Inventory - Use")
+RESULT_SHEETS = INVENTORY_SHEETS + ("LCA", "LCIA")
+
+
+def content_hash(*values):
+    """sha256 of the JSON form of values (tuples, lists, strings and numbers)."""
+    return hashlib.sha256(json.dumps(values, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def exchanges_hash(exchanges, input_hash=None):
+    """Hash of a list of exchange dictionaries, independent of their order.
+
+    input_hash(key) gives the hash of an input activity whose content must be included (foreground activities), None
+    for the background ones, which are covered by the database version.
+    """
+    fields = ("amount", "type", "unit", "uncertainty type", "loc", "scale", "shape", "minimum", "maximum")
+    rows = []
+    for exchange in exchanges:
+        key = tuple(exchange["input"])
+        upstream = input_hash(key) if input_hash is not None else None
+        rows.append([list(key), upstream] + [exchange.get(field) for field in fields])
+    return content_hash(sorted(rows, key=json.dumps))
+
+
+def sheets_hash(raw_sheets, sheets=RESULT_SHEETS):
+    """Hash of sheets among raw_sheets ({sheet name: DataFrame read with header=None})."""
+    digest = hashlib.sha256()
+    for sheet in sheets:
+        if sheet in raw_sheets:
+            digest.update(sheet.encode())
+            digest.update(pd.util.hash_pandas_object(raw_sheets[sheet].astype(str), index=True).values.tobytes())
+    return digest.hexdigest()
+
+
+def workbook_hash(path, sheets=RESULT_SHEETS):
+    """Hash of the sheets of the input workbook, by default those the LCA results depend on."""
+    with pd.ExcelFile(path) as excel:
+        names = [sheet for sheet in sheets if sheet in excel.sheet_names]
+        return sheets_hash(pd.read_excel(excel, sheet_name=names, header=None), sheets)
+
+
+class LCAResultCache:
+    """Score of each (activity, method) pair, keyed by the content hash of the activity, the method and the version of
+    the background databases, stored in a JSON file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.scores = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.scores = json.load(f)
+
+    @staticmethod
+    def key(activity_hash, method, version):
+        return content_hash(activity_hash, list(method), version)
+
+    def get(self, activity_hash, method, version):
+        return self.scores.get(self.key(activity_hash, method, version))
+
+    def put(self, activity_hash, method, version, score):
+        self.scores[self.key(activity_hash, method, version)] = float(score)
+
+    def save(self):
+        temporary = self.path + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump(self.scores, f)
+        os.replace(temporary, self.path)
@@ -14,6 +14,7 @@ Created on 2024
 @author: baudais
 """
 
+import multiprocessing
 import sys
 from tkinter import END
 
@@ -71,14 +72,18 @@ def update_console():
     root.after(100, update_console)  # Vérifier les nouveaux messages toutes les 100 ms
 
 
-root = PelcaGUI()
+if __name__ == "__main__":
+    # the worker processes of the parallel staircase must not open the GUI (spawn start method, frozen executable)
+    multiprocessing.freeze_support()
 
-# Redirigez stdout et stderr
-redirector = RedirectText(root.console_text)
-sys.stdout = redirector
-sys.stderr = redirector
+    root = PelcaGUI()
 
-# Liaison de la fonction on_closing à l'événement de fermeture
-root.protocol("WM_DELETE_WINDOW", on_closing)
-root.mainloop()
-root.after(100, update_console)  # Démarrer la boucle de mise à jour
+    # Redirigez stdout et stderr
+    redirector = RedirectText(root.console_text)
+    sys.stdout = redirector
+    sys.stderr = redirector
+
+    # Liaison de la fonction on_closing à l'événement de fermeture
+    root.protocol("WM_DELETE_WINDOW", on_closing)
+    root.mainloop()
+    root.after(100, update_console)  # Démarrer la boucle de mise à jour
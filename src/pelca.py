@@ -0,0 +1,147 @@
+"""PELCA (Power Electronics Life Cycle Assessment) is an open-source project aimed at assessing the environmental impact over the life cycle of modular and diagnosable power electronics systems. The integration of modularity and diagnosability aligns with circular economy principles, promoting practices such as repair and reuse. This project provides a tool to calculate the environmental impacts associated with the manufacturing, usage, and replacement of power electronics products.
+Copyright (C) Mitsubishi Electric R&D Centre Europe and SATIE 2024, author Briac Baudais baudaisbriac@gmail.com
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU Lesser General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with this program.  If not, see https://www.gnu.org/licenses/lgpl-3.0.html"""
+
+"""
+Command line entry point of PELCA, without the GUI.
+
+Usage: python pelca.py run input.xlsx [other.xlsx ...] [--workers 4] [--plots folder]
+
+brightway2 is only imported when the LCA of a workbook has to be calculated, matplotlib only when plots are saved, and
+customtkinter never.
+"""
+
+import argparse
+import os
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import dictionary
+
+
+def _save_figures(figs, folder):
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for idx, fig in enumerate(figs):
+        path = os.path.join(folder, f"plot_{idx+1}.svg")
+        fig.savefig(path, dpi=300)
+        paths.append(path)
+    return paths
+
+
+def run_pipeline(path_input, name_input, plots=None):
+    """Run PELCA on an input workbook as the GUI does: LCA if its results are missing or outdated, then the staircase
+    (Analysis) or the Monte Carlo LCA results (Monte Carlo).
+
+    plots is a folder where the figures are saved as .svg, None to draw none. Returns a summary dict: input workbook,
+    type of simulation, whether the LCA was calculated, result files and figures.
+    """
+    dic = dictionary._init_dic(path_input, name_input)
+    summary = {
+        "input": os.path.join(path_input, name_input),
+        "simulation": dic["simulation"],
+        "LCA calculated": dic["LCA"] == "yes",
+        "results": [],
+        "figures": [],
+    }
+    if dic["LCA"] == "yes":
+        import LCA
+
+        LCA.EI_calculation(dic, path_input, name_input)
+    if plots is not None:
+        import matplotlib
+
+        matplotlib.use("Agg")
+        import plotting
+
+    if dic["simulation"] == "Analysis":
+        from staircase import STAIRCASE
+
+        staircase_instance = STAIRCASE(path_input, name_input, dic)
+        (
+            EI,
+            EI_manu,
+            EI_use,
+            usage_time,
+            number_of_fault,
+            wcdf,
+            fault_cause,
+            RU_age,
+            EI_maintenance,
+        ) = staircase_instance.get_variables(dic)
+        summary["results"].append(os.path.join(dic["LCA_path"], dic["filename_result_staircase"]))
+        if plots is not None:
+            plot_instance = plotting.PLOT(
+                dic,
+                EI,
+                EI_manu,
+                EI_use,
+                usage_time,
+                fault_cause,
+                dic["nb_RU"],
+                dic["nb_ite_MC"],
+                dic["step"],
+                wcdf,
+                EI_maintenance,
+                statistics=staircase_instance.statistics,
+                weights=staircase_instance.weights,
+            )
+            figs = [getattr(plot_instance, f"fig{idx}") for idx in range(1, 7)]
+            summary["figures"] = _save_figures(figs, plots)
+    elif dic["simulation"] == "Monte Carlo":
+        summary["results"].append(os.path.join(dic["LCA_path"], dic["filename_result_EI_MC"]))
+        if plots is not None:
+            plot_instance = plotting.PLOT_MC(dic)
+            summary["figures"] = _save_figures([plot_instance.fig1, plot_instance.fig2], plots)
+    return summary
+
+
+def _run_file(path, plots=None):
+    """run_pipeline of one workbook of a batch; an error is reported in the summary instead of stopping the batch."""
+    path_input, name_input = os.path.split(os.path.abspath(path))
+    try:
+        return run_pipeline(path_input, name_input, plots)
+    except Exception:
+        return {"input": path, "error": traceback.format_exc()}
+
+
+def run_batch(paths, workers=None, plots=None):
+    """run_pipeline of several workbooks in a process pool of workers processes (all the cores by default, the
+    current process with 1). With plots, the figures of each workbook go to plots/<workbook name>. Returns the
+    summaries in the order of paths."""
+    folders = [None if plots is None else os.path.join(plots, os.path.splitext(os.path.basename(path))[0])
+               for path in paths]
+    if workers == 1 or len(paths) == 1:
+        return [_run_file(path, folder) for path, folder in zip(paths, folders)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_run_file, paths, folders))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="pelca", description="Power Electronics Life Cycle Assessment")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="run the LCA and staircase of input workbooks")
+    run.add_argument("inputs", nargs="+", help="input workbooks (.xlsx)")
+    run.add_argument("--workers", type=int, default=None, help="processes of a batch (all the cores by default)")
+    run.add_argument("--plots", default=None, help="folder where the figures are saved (none by default)")
+    args = parser.parse_args(argv)
+
+    summaries = run_batch(args.inputs, args.workers, args.plots)
+    failed = 0
+    for summary in summaries:
+        if "error" in summary:
+            failed += 1
+            print(f"{summary['input']}: failed\n{summary['error']}", file=sys.stderr)
+        else:
+            print(f"{summary['input']}: {', '.join(summary['results'] + summary['figures'])}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
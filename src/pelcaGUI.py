@@ -1,17 +1,13 @@
 import os
+import sys
 from tkinter import Text, filedialog, messagebox
 
 import customtkinter as ctk
-import matplotlib.pyplot as plt
-from bw2data.errors import InvalidExchange
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from PIL import Image
 
-import dictionary
-import LCA
-import plotting
-import staircase
-from utils import create_thumbnail, export_data, get_max_fig_size
+from utils import create_thumbnail, export_data, export_fault_cause, get_max_fig_size
+
+# matplotlib, brightway2 (LCA) and the PELCA modules are imported on first use so that the window opens without them
 
 # Define colors for the dark theme
 BG_COLOR = "#2E2E2E"
@@ -36,6 +32,7 @@ class PelcaGUI(ctk.CTk):
         self.create_ui_elements()
         self.is_running = False
         self.figs = []
+        self.results = {}
 
     def setup_window(self):
         self.title("PELCA")
@@ -188,15 +185,15 @@ class PelcaGUI(ctk.CTk):
         if folder_path:
             try:
                 if self.var_EI.get():
-                    export_data(folder_path, "Impact_total", EI)
+                    export_data(folder_path, "Impact_total", self.results["EI"])
                 if self.var_EI_manu.get():
-                    export_data(folder_path, "Impact_manu", EI_manu)
+                    export_data(folder_path, "Impact_manu", self.results["EI_manu"])
                 if self.var_EI_use.get():
-                    export_data(folder_path, "Impact_use", EI_use)
+                    export_data(folder_path, "Impact_use", self.results["EI_use"])
                 if self.var_fault_cause.get():
-                    export_data(folder_path, "fault_cause", fault_cause)
+                    export_fault_cause(folder_path, self.results["fault_cause"])
                 if self.var_RU_age.get():
-                    export_data(folder_path, "RU_age", RU_age)
+                    export_data(folder_path, "RU_age", self.results["RU_age"])
                 print(f"Selected data saved successfully in {folder_path}")
             except Exception as e:
                 print(f"An error occurred while saving the data: {e}")
@@ -204,6 +201,8 @@ class PelcaGUI(ctk.CTk):
     def display_plot(self, index):
         for widget in self.plot_frame.winfo_children():
             widget.destroy()
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
         fig = self.figs[index]
         fig.tight_layout()
         canvas = FigureCanvasTkAgg(fig, master=self.plot_frame)
@@ -282,6 +281,10 @@ class PelcaGUI(ctk.CTk):
         self.after(100, do_reset)
 
     def run_script(self):
+        import matplotlib.pyplot as plt
+
+        import dictionary
+
         plt.close("all")
         self.button_run.configure(state="disabled")
         full_path_input = self.entry_file_path.get()
@@ -296,18 +299,26 @@ class PelcaGUI(ctk.CTk):
         try:
             dic = dictionary._init_dic(path_input, name_input)
             if dic["LCA"] == "yes":
+                import LCA
+
                 LCA.EI_calculation(dic, path_input, name_input)
             if dic["simulation"] == "Analysis":
                 self.run_analysis(dic, path_input, name_input)
             elif dic["simulation"] == "Monte Carlo":
                 self.run_monte_carlo(dic)
             self.finish_script_execution("Script executed successfully", dic["simulation"])
-        except InvalidExchange:
-            self.finish_script_execution("An error occurred: Exchange is missing ‘amount’ or ‘input’")
         except BaseException as e:
-            self.finish_script_execution(f"An error occurred: {str(e)}")
+            # InvalidExchange of bw2data, which is only loaded with LCA
+            LCA = sys.modules.get("LCA")
+            if LCA is not None and isinstance(e, LCA.InvalidExchange):
+                self.finish_script_execution("An error occurred: Exchange is missing ‘amount’ or ‘input’")
+            else:
+                self.finish_script_execution(f"An error occurred: {str(e)}")
 
     def run_analysis(self, dic, path_input, name_input):
+        import plotting
+        import staircase
+
         staircase_instance = staircase.STAIRCASE(path_input, name_input, dic)
         (
             EI,
@@ -320,6 +331,7 @@ class PelcaGUI(ctk.CTk):
             RU_age,
             EI_maintenance,
         ) = staircase_instance.get_variables(dic)
+        self.results = {"EI": EI, "EI_manu": EI_manu, "EI_use": EI_use, "fault_cause": fault_cause, "RU_age": RU_age}
         plot_instance = plotting.PLOT(
             dic,
             EI,
@@ -332,6 +344,8 @@ class PelcaGUI(ctk.CTk):
             dic["step"],
             wcdf,
             EI_maintenance,
+            statistics=staircase_instance.statistics,
+            weights=staircase_instance.weights,
         )
         self.figs = [
             plot_instance.fig1,
@@ -344,6 +358,8 @@ class PelcaGUI(ctk.CTk):
         self.setup_plot_frame()
 
     def run_monte_carlo(self, dic):
+        import plotting
+
         plot_instance = plotting.PLOT_MC(dic)
         self.figs = [plot_instance.fig1, plot_instance.fig2]
         self.setup_plot_frame()
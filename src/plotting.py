@@ -29,9 +29,19 @@ from matplotlib.projections.polar import PolarAxes
 from matplotlib.spines import Spine
 from matplotlib.transforms import Affine2D
 
+from staircase import count_fault_cause, end_of_life_step
+from step_statistics import StepStatistics
+
+
+# size and scaling of the figures when no display is available (headless runs, see pelca.py)
+DEFAULT_SCREEN_SIZE = (1920, 1080)
+
 
 def get_screen_size():
-    root = tk.Tk()
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return DEFAULT_SCREEN_SIZE
     root.withdraw()  # Cache la fenêtre principale
     screen_width = root.winfo_screenwidth()
     screen_height = root.winfo_screenheight()
@@ -45,7 +55,10 @@ def get_dpi_scaling():
         ctypes.windll.user32.ReleaseDC(0, hdc)
         scaling_factor = dpi / 96.0  # 96 DPI est la référence pour 100% de mise à l'échelle
     else:  # Linux et autres systèmes
-        root = tk.Tk()
+        try:
+            root = tk.Tk()
+        except tk.TclError:
+            return 1.0
         root.withdraw()  # Ne pas afficher la fenêtre
         dpi = root.winfo_fpixels("1i")  # Obtenir les pixels par pouce
         scaling_factor = dpi / 96.0  # 96 DPI est la référence pour 100% de mise à l'échelle
@@ -96,21 +109,17 @@ def _decile(
     xlog=False,
     ylim_min=0,
     x_legend=0.3,
+    stats=None,
+    weights=None,
 ):
     # Plot
 
-    n_percentile = 10
-    percent = np.linspace(0, 100 * (1 - 1 / n_percentile), n_percentile)[1:]
-    n_ite = len(data)
-    n_percentile = len(percent)
-    n_var = len(var)
-    data_plot = np.zeros((n_var, n_percentile))
-    data_max = np.zeros((n_var))
-    data_min = np.zeros((n_var))
-    for k in range(n_var):
-        data_plot[k] = np.percentile(data[k], percent)
-        data_max[k] = np.max(data[k])
-        data_min[k] = np.min(data[k])
+    if stats is None:
+        # data: (step, iteration) trajectories, weighted by the likelihood ratios of an importance sampling run
+        stats = StepStatistics.from_trajectories(data[:, :, np.newaxis], weights).select(0)
+    # deciles, mean, min and max per step, e.g. from the StepStatistics shared by the figures of a PLOT
+    data_plot, data_mean, data_min, data_max = stats
+    n_percentile = data_plot.shape[1]
     if display_decile:
         for k in range(n_percentile):
             fill = ax.fill_between(
@@ -120,7 +129,9 @@ def _decile(
     if display_median:
         ax.plot(var, data_plot[:, int(n_percentile / 2)], "b", alpha=0.7, label="Median")
     if display_mean:
-        ax.plot(var, np.mean(data_plot, axis=1), "r", alpha=0.7, label="Mean")
+        # mean of the trajectories at each step (weighted for importance sampling), the value of the result table; the
+        # curve used to be the mean of the deciles, which differs from it for skewed distributions
+        ax.plot(var, data_mean, "r", alpha=0.7, label="Mean")
     if xlog:
         ax.set_xscale("log")
     if display_max:
@@ -218,7 +229,30 @@ def radar_factory(num_vars, frame="circle"):
 
 
 class PLOT:
-    def __init__(self, dic, EI, EI_manu, EI_use, usage_time, fault_cause, nb_RU, nb_ite_MC, step, wcdf, EI_maintenance):
+    def __init__(
+        self,
+        dic,
+        EI,
+        EI_manu,
+        EI_use,
+        usage_time,
+        fault_cause,
+        nb_RU,
+        nb_ite_MC,
+        step,
+        wcdf,
+        EI_maintenance,
+        statistics=None,
+        weights=None,
+        step_statistics=None,
+    ):
+        # statistics: streaming.StreamingAccumulator of a run that kept no trajectories (EI arrays are then None)
+        self.statistics = statistics
+        # weights: likelihood ratio of every iteration of an importance sampling run (STAIRCASE.weights)
+        self.weights = weights
+        # step_statistics: step_statistics.StepStatistics of the total impact, computed by the first figure needing it
+        # unless given (e.g. by a previous PLOT of the same run)
+        self.step_statistics = step_statistics
         self.fig1 = self.plot_allEI_manufacturing(dic, EI, EI_manu, EI_use, usage_time, nb_RU, nb_ite_MC, step)
         self.fig2 = self.CDF(wcdf, usage_time)
         self.fig3 = self.fault_repartition(dic, fault_cause)
@@ -310,22 +344,12 @@ class PLOT:
         return fig
 
     def plot_selectEI(self, dic, EI, EI_manu, EI_use, usage_time, nb_RU, nb_ite_MC, step):
-        t = np.arange(0, usage_time, 1)
-        result_MC = EI[:, :, dic["selected_EI"]]
-        result = EI[:, :, dic["selected_EI"]]
-        result_fab = EI_manu[:, :, dic["selected_EI"]]
-        result_use = EI_use[:, :, dic["selected_EI"]]
-
-        if nb_ite_MC != 1:
-            result_MC = result_MC[:, result_MC[0, :].argsort()]
-            result_MC = pd.DataFrame(result_MC)
-
         fig, ax = plt.subplots(1, 1)
-        var = np.arange(result_MC.shape[0]) / step
+        var = np.arange(usage_time) / step
 
-        if nb_ite_MC > 1:
+        if self.statistics is not None or nb_ite_MC > 1:
             ax = _decile(
-                result_MC.T,
+                None,
                 ax,
                 var,
                 display_decile=True,
@@ -336,8 +360,12 @@ class PLOT:
                 xlabel=True,
                 ylabel=True,
                 title=False,
+                stats=self._step_statistics(EI).select(dic["selected_EI"]),
             )
         else:
+            result = EI[:, :, dic["selected_EI"]]
+            result_fab = EI_manu[:, :, dic["selected_EI"]]
+            result_use = EI_use[:, :, dic["selected_EI"]]
             fab_use = pd.concat(
                 [pd.DataFrame(result_fab.T, index=["Manufacturing"]).T, pd.DataFrame(result_use.T, index=["Use"]).T],
                 axis=1,
@@ -359,6 +387,16 @@ class PLOT:
 
         return fig
 
+    def _step_statistics(self, EI):
+        """Deciles, mean, min and max of the total impact EI per step and impact category, computed once in one pass
+        over the trajectories (or read from the streaming statistics) and shared by all the figures."""
+        if self.step_statistics is None:
+            if self.statistics is not None:
+                self.step_statistics = StepStatistics.from_accumulator(self.statistics)
+            else:
+                self.step_statistics = StepStatistics.from_trajectories(EI, self.weights)
+        return self.step_statistics
+
     def CDF(self, wcdf, usage_time):
         t = np.arange(0, usage_time, 1)
         # Créer la figure et l'axe
@@ -383,21 +421,16 @@ class PLOT:
 
         number_of_EI = len(dic["EI_name"])
 
-        EI_plot = [[[1 for y in range(usage_time)] for y in range(nb_RU)] for z in range(nb_ite_MC)]
         # result=[[1 for y in range(usage_time)] for z in range(nb_ite_MC)]
         t = np.arange(0, usage_time, 1)
 
-        column, row = nb_ite_MC, usage_time
-        result_MC = np.ones((row, column, number_of_EI))
-        result = np.ones((column, row, number_of_EI))
-        result_fab = np.ones((column, row, number_of_EI))
-        result_use = np.ones((column, row, number_of_EI))
-
-        #
-        result_MC = EI[:, :, :]
-        result = EI[:, :, :]
-        result_fab = EI_manu[:, :, :]
-        result_use = EI_use[:, :, :]
+        # deciles of every impact category, shared with plot_selectEI; a single iteration is drawn as bars
+        if self.statistics is not None or nb_ite_MC > 1:
+            stats = self._step_statistics(EI)
+        else:
+            result = EI
+            result_fab = EI_manu
+            result_use = EI_use
 
         row_fig = 0
         col_fig = 0
@@ -418,12 +451,10 @@ class PLOT:
         # hide tick and tick label of the big axis
 
         for EI in range(number_of_EI):
-            result_MC_EI = pd.DataFrame(result_MC[:, :, EI])
-
-            if nb_ite_MC > 1:
-                var = np.arange(result_MC_EI.shape[0]) / step
+            if self.statistics is not None or nb_ite_MC > 1:
+                var = np.arange(usage_time) / step
                 ax[row_fig, col_fig] = _decile(
-                    result_MC_EI.T,
+                    None,
                     ax[row_fig, col_fig],
                     var,
                     display_decile=True,
@@ -434,11 +465,12 @@ class PLOT:
                     xlabel=True,
                     ylabel=False,
                     title=False,
+                    stats=stats.select(EI),
                 )
                 ax[row_fig, col_fig].ticklabel_format(axis="y", style="sci", scilimits=(0, 0))
                 ax[row_fig, col_fig].set_title(methods[EI])
                 ax[row_fig, col_fig].grid(True)
-            if nb_ite_MC == 1:
+            else:
                 ax[row_fig, col_fig].ticklabel_format(axis="y", style="sci", scilimits=(0, 0))
                 ax[row_fig, col_fig].set_title(methods[EI])
                 ax[row_fig, col_fig].grid(True)
@@ -486,10 +518,10 @@ class PLOT:
 
         else:
             # Données
-            tableau_1d = fault_cause.flatten()
-            count_early = np.sum(tableau_1d == "Early")
-            count_random = np.sum(tableau_1d == "Random")
-            count_wearout = np.sum(tableau_1d == "Wearout")
+            if self.statistics is not None:
+                count_early, count_random, count_wearout = self.statistics.fault_count()
+            else:
+                count_early, count_random, count_wearout = count_fault_cause(fault_cause, self.weights)
             nombres = [count_early, count_random, count_wearout]
             etiquettes = ["Early fault", "Random fault", "Wearout fault"]
 
@@ -540,18 +572,31 @@ class PLOT:
 
         self.EI_manufacturing = np.sum(self.EI_manufacturing, axis=1)
 
-        self.EI_use = np.mean(EI_use[dic["service_life"] - 1, :, :], axis=0)
+        if self.statistics is not None:
+            mean = {name: self.statistics.mean(name)[end_of_life_step(dic)] for name in self.statistics.sum}
+        else:
+            # weighted by the likelihood ratios of an importance sampling run (plain means otherwise)
+            arrays = {
+                "EI_total": EI,
+                "EI_total_manu": EI_manu,
+                "EI_total_use": EI_use,
+                "EI_total_maintenance": EI_maintenance,
+            }
+            mean = {
+                name: np.average(values[end_of_life_step(dic), :, :], axis=0, weights=self.weights)
+                for name, values in arrays.items()
+            }
+
+        self.EI_use = mean["EI_total_use"]
 
-        self.EI_maintenance = np.mean(EI_maintenance[dic["service_life"] - 1, :, :], axis=0)
+        self.EI_maintenance = mean["EI_total_maintenance"]
 
-        self.EI_replacement = (
-            np.mean(EI_manu[dic["service_life"] - 1, :, :], axis=0) - self.EI_manufacturing - self.EI_maintenance
-        )
+        self.EI_replacement = mean["EI_total_manu"] - self.EI_manufacturing - self.EI_maintenance
 
         index_labels = np.array(["Manufacture", "Use", "Replacement", "Maintenance"])
 
         # EI manufacturing of total RU
-        self.EI_total = np.mean(EI[dic["service_life"] - 1, :, :], axis=0)
+        self.EI_total = mean["EI_total"]
         # Normalisation pour que chaque ligne somme à 1
         normalized_EI_manu = self.EI_manufacturing * 100 / self.EI_total
         normalized_EI_use = self.EI_use * 100 / self.EI_total
@@ -0,0 +1,142 @@
+"""PELCA (Power Electronics Life Cycle Assessment) is an open-source project aimed at assessing the environmental impact over the life cycle of modular and diagnosable power electronics systems. The integration of modularity and diagnosability aligns with circular economy principles, promoting practices such as repair and reuse. This project provides a tool to calculate the environmental impacts associated with the manufacturing, usage, and replacement of power electronics products.
+Copyright (C) Mitsubishi Electric R&D Centre Europe and SATIE 2024, author Briac Baudais baudaisbriac@gmail.com
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU Lesser General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with this program.  If not, see https://www.gnu.org/licenses/lgpl-3.0.html"""
+
+
+"""
+Expected staircase from the renewal equation of each RU, without Monte Carlo.
+
+When every fault only replaces its own RU the RUs are independent renewal processes. The expected number of faults
+(by cause) and of maintenances of each RU at every time step are then the solution of the discrete renewal equation on
+the staircase time grid, with the inter-renewal law given by the Weibull tables of the staircase, and the expected
+impacts follow linearly. The time grid, failure ages and maintenance rules are those of the Vectorized engine, so the
+result is the limit of its mean curves for an infinite number of iterations.
+"""
+
+import numpy as np
+
+from streaming import FAULT_NAMES, StreamingAccumulator, end_of_life_step
+
+
+def is_decoupled(dic):
+    """True when the replacement matrix only replaces the faulty RU, i.e. the RUs renew independently."""
+    matrix = dic["Remplacement_matrix"]
+    matrix = matrix.drop(columns=["Fault"], errors="ignore").to_numpy(dtype=float) \
+        if hasattr(matrix, "drop") else np.asarray(matrix, dtype=float)
+    return matrix.shape == (dic["nb_RU"], dic["nb_RU"]) and np.array_equal(np.clip(matrix, 0, 1), np.eye(dic["nb_RU"]))
+
+
+def _maintenance_steps(dic):
+    """Maintenance age of each RU in steps, 0 for the RUs that are never maintained."""
+    nb_RU = dic["nb_RU"]
+    if dic["Maintenance"] != "True":
+        return np.zeros(nb_RU, dtype=int)
+    ages = np.broadcast_to(np.asarray(dic["maintenance"], dtype=float), (nb_RU,))
+    whole = np.isfinite(ages) & (ages >= 1) & (ages == np.round(np.nan_to_num(ages)))
+    return np.where(whole, np.nan_to_num(ages), 0).astype(int)
+
+
+def _kernels(wcdf, prob_early, prob_random, maintenance, first):
+    """Renewal kernels of one RU from a renewal (first: the start of the service life), indexed by the number of
+    steps d since the renewal.
+
+    Returns the probability of a fault of each cause at d (d, cause), of a renewal at d (a fault, or a fault hidden by
+    the maintenance of the same step) and of a maintenance at d. A failure age K (in steps) drawn from the Weibull
+    CDF wcdf gives a fault at d = K + 1 while K is below the maintenance age M; otherwise the RU is maintained every M
+    steps and never fails again, as its failure age is kept through maintenances.
+    """
+    usage_time = len(wcdf)
+    p = np.diff(wcdf, prepend=0.0)
+    K = np.arange(usage_time)
+    M = maintenance if maintenance > 0 else usage_time + 1
+    fails = (K < M) & ((K > 0) | first)
+    d = K + 1
+    inside = d < usage_time
+    faults = np.zeros((usage_time, len(FAULT_NAMES)))
+    renewal = np.zeros(usage_time)
+    # the cause is drawn with the shares of the fault types at the age of the RU when the fault is found: K + 1, or 0
+    # when the RU was just maintained at the same step
+    index = np.where(d == M, 0, np.minimum(d, usage_time - 1))
+    early, random = prob_early[index], prob_random[index]
+    cause = np.stack([early, random, np.clip(1 - early - random, 0, None)], axis=1)
+    known = np.isfinite(cause).all(axis=1)
+    selected = fails & inside
+    faults[d[selected & known]] = p[selected & known, np.newaxis] * cause[selected & known]
+    renewal[d[selected]] = p[selected]
+
+    maintained = np.zeros(usage_time)
+    if maintenance > 0:
+        never = p[~fails].sum() + max(1 - wcdf[-1], 0)
+        if M < usage_time:
+            maintained[M] = never + (p[M - 1] if fails[M - 1] else 0)
+        maintained[2 * M :: M] = never
+    return faults, renewal, maintained
+
+
+def _convolve(density, kernel):
+    return np.convolve(density, kernel)[: len(density)]
+
+
+def expected_counts(wcdf, prob_early, prob_random, maintenance):
+    """Expected faults of each cause (step, RU, cause) and maintenances (step, RU) at each step of the staircase.
+
+    wcdf, prob_early and prob_random are the (age step, RU) combined Weibull CDF and shares of early and random faults,
+    maintenance the maintenance age of each RU in steps (0: no maintenance). The renewal density r of each RU solves
+    r[n] = h0[n] + sum_j r[j] h[n - j], h0 and h being the renewal kernels from the start and from a later renewal.
+    """
+    usage_time, nb_RU = wcdf.shape
+    faults = np.zeros((usage_time, nb_RU, len(FAULT_NAMES)))
+    maintenances = np.zeros((usage_time, nb_RU))
+    for RU in range(nb_RU):
+        args = (wcdf[:, RU], prob_early[:, RU], prob_random[:, RU], maintenance[RU])
+        faults_first, renewal_first, maintained_first = _kernels(*args, first=True)
+        faults_later, renewal_later, maintained_later = _kernels(*args, first=False)
+        density = renewal_first.copy()
+        for n in range(2, usage_time):
+            density[n] += density[1:n] @ renewal_later[n - 1 : 0 : -1]
+        for cause in range(len(FAULT_NAMES)):
+            faults[:, RU, cause] = faults_first[:, cause] + _convolve(density, faults_later[:, cause])
+        maintenances[:, RU] = maintained_first + _convolve(density, maintained_later)
+    return faults, maintenances
+
+
+def expected_statistics(staircase, dic):
+    """Expected staircase as a streaming.StreamingAccumulator of one iteration holding the expected values, so that
+    it is saved and plotted like the Statistics output (the deciles then collapse on the mean)."""
+    nb_RU = dic["nb_RU"]
+    (weibull_Efault, weibull_Rfault, weibull_Wfault,
+     prob_weibull_Efault, prob_weibull_Rfault, _) = staircase._weibull_tables(dic)
+    wcdf = 1 - (1 - weibull_Efault) * (1 - weibull_Rfault) * (1 - weibull_Wfault)
+    with np.errstate(invalid="ignore"):
+        faults, maintenances = expected_counts(wcdf, np.asarray(prob_weibull_Efault), np.asarray(prob_weibull_Rfault),
+                                               _maintenance_steps(dic))
+    replacements = faults.sum(axis=2)
+    EI_maintenance = np.cumsum(maintenances @ staircase.EI_manufacturing.T, axis=0)
+    EI = {"EI_total_maintenance": EI_maintenance}
+    EI["EI_total_manu"] = staircase.EI_manufacturing_total + np.cumsum(replacements @ staircase.EI_manufacturing.T,
+                                                                       axis=0) + EI_maintenance
+    EI["EI_total_use"] = staircase._EI_use_cumulative()
+    EI["EI_total"] = EI["EI_total_manu"] + EI["EI_total_use"]
+
+    usage_time, n_EI = EI["EI_total"].shape
+    statistics = StreamingAccumulator(usage_time, nb_RU, n_EI, end_of_life_step(dic))
+    statistics.count = 1
+    for name, values in EI.items():
+        statistics.sum[name] = values
+    statistics.min = EI["EI_total"].copy()
+    statistics.max = EI["EI_total"].copy()
+    for step, sketch in enumerate(statistics.sketch):
+        sketch.add(EI["EI_total"][step])
+        statistics.moments[step].update(EI["EI_total"][step][np.newaxis])
+    for name, sketch in statistics.final.items():
+        sketch.add(EI[name][statistics.final_step])
+        statistics.final_moments[name].update(EI[name][statistics.final_step][np.newaxis])
+    statistics.number_of_fault = np.cumsum(replacements, axis=0)
+    statistics.RU_age = np.full((usage_time, nb_RU), np.nan)  # not given by the renewal equation
+    statistics.fault_cause = faults
+    return statistics
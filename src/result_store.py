@@ -0,0 +1,200 @@
+"""PELCA (Power Electronics Life Cycle Assessment) is an open-source project aimed at assessing the environmental impact over the life cycle of modular and diagnosable power electronics systems. The integration of modularity and diagnosability aligns with circular economy principles, promoting practices such as repair and reuse. This project provides a tool to calculate the environmental impacts associated with the manufacturing, usage, and replacement of power electronics products.
+Copyright (C) Mitsubishi Electric R&D Centre Europe and SATIE 2024, author Briac Baudais baudaisbriac@gmail.com
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU Lesser General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with this program.  If not, see https://www.gnu.org/licenses/lgpl-3.0.html"""
+
+"""
+Chunked, compressed, columnar store of the staircase outputs.
+
+A store is a folder holding metadata.json and one sub-folder per output. A (step, iteration, column) output is cut in
+blocks of steps x iterations, each block a compressed .npz file with one member per column (impact category or RU),
+so that reading one impact category over a range of steps only decompresses the blocks and members it covers. A
+table of records (the fault event list) is cut in blocks of rows with one member per field, the range of steps of
+each block kept in the metadata so that reading a range of steps only decompresses the blocks overlapping it.
+"""
+
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+STORE_VERSION = 1
+
+
+def _slice(selection, length):
+    if selection is None:
+        return range(length)
+    if isinstance(selection, slice):
+        return range(*selection.indices(length))
+    if np.ndim(selection) == 0:
+        index = range(length)[selection]
+        return range(index, index + 1)
+    return None
+
+
+def write_store(path, arrays, metadata=None, columns=None, step_chunk=16, iteration_chunk=10000):
+    """Write the arrays ({name: array}) to the store folder path, replacing any previous store.
+
+    Arrays of shape (step, iteration, column) are cut in blocks of step_chunk x iteration_chunk, one-dimensional
+    record arrays in blocks of iteration_chunk rows (best sorted by step, as the fault event lists are, for the reads
+    of a range of steps). columns gives the labels of the last axis of each array
+    ({name: list}), metadata any information of the run (JSON types). Memory-mapped arrays are read block by block.
+    """
+    temporary = path + ".tmp"
+    if os.path.exists(temporary):
+        shutil.rmtree(temporary)
+    os.makedirs(temporary)
+    columns = columns or {}
+    content = {"version": STORE_VERSION, "created": time.strftime("%Y-%m-%d %H:%M:%S"), "run": metadata or {}}
+    content["arrays"] = {}
+    for name, array in arrays.items():
+        os.mkdir(os.path.join(temporary, name))
+        step_ranges = []
+        if array.dtype.names:
+            chunks = [iteration_chunk]
+            for start in range(0, max(len(array), 1), iteration_chunk):
+                block = array[start : start + iteration_chunk]
+                members = {field: block[field] for field in array.dtype.names}
+                _save_block(temporary, name, f"r{start // iteration_chunk:08d}", members)
+                if "step" in array.dtype.names:
+                    # [first, last] step of the block, [0, -1] for an empty one
+                    step_ranges.append([int(block["step"].min()), int(block["step"].max())] if len(block) else [0, -1])
+            labels = list(array.dtype.names)
+        else:
+            chunks = [step_chunk, iteration_chunk]
+            labels = list(columns.get(name, range(array.shape[-1])))
+            for step in range(0, array.shape[0], step_chunk):
+                for start in range(0, array.shape[1], iteration_chunk):
+                    block = np.asarray(array[step : step + step_chunk, start : start + iteration_chunk])
+                    members = {f"c{column}": block[..., column] for column in range(array.shape[-1])}
+                    _save_block(temporary, name, f"s{step // step_chunk:05d}_i{start // iteration_chunk:06d}", members)
+        content["arrays"][name] = {
+            "layout": "records" if array.dtype.names else "blocks",
+            "shape": list(array.shape),
+            "dtype": np.lib.format.dtype_to_descr(array.dtype),
+            "chunks": chunks,
+            "columns": [str(label) for label in labels],
+        }
+        if step_ranges:
+            content["arrays"][name]["step_ranges"] = step_ranges
+    with open(os.path.join(temporary, "metadata.json"), "w") as f:
+        json.dump(content, f, indent=1)
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(temporary, path)
+
+
+def _save_block(path, name, block, members):
+    with open(os.path.join(path, name, block + ".npz"), "wb") as f:
+        np.savez_compressed(f, **members)
+
+
+def _dtype(info):
+    descr = info["dtype"]
+    return np.lib.format.descr_to_dtype(descr if isinstance(descr, str) else [tuple(field) for field in descr])
+
+
+class ResultStore:
+    """Read access to a store written by write_store."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "metadata.json")) as f:
+            content = json.load(f)
+        if content["version"] != STORE_VERSION:
+            raise ValueError(f"Unsupported result store version {content['version']}")
+        self.created = content["created"]
+        self.metadata = content["run"]
+        self.arrays = content["arrays"]
+
+    @property
+    def names(self):
+        return list(self.arrays)
+
+    def shape(self, name):
+        return tuple(self.arrays[name]["shape"])
+
+    def columns(self, name):
+        return self.arrays[name]["columns"]
+
+    def _column_indices(self, name, columns):
+        labels = self.columns(name)
+        if columns is None:
+            return list(range(len(labels)))
+        columns = [columns] if isinstance(columns, (str, int, np.integer)) else columns
+        return [labels.index(column) if isinstance(column, str) else int(column) for column in columns]
+
+    def read(self, name, steps=None, iterations=None, columns=None):
+        """Part of an output as an array of shape (step, iteration, column).
+
+        steps and iterations are an index or a slice (all by default), columns a label or index or a list of them.
+        Only the blocks and members covering the selection are decompressed.
+        """
+        info = self.arrays[name]
+        if info["layout"] == "records":
+            return self.read_records(name, steps=steps, columns=columns)
+        shape = info["shape"]
+        step_chunk, iteration_chunk = info["chunks"]
+        step_range, iteration_range = _slice(steps, shape[0]), _slice(iterations, shape[1])
+        if step_range is None or iteration_range is None:
+            raise TypeError("steps and iterations must be an index or a slice")
+        column_indices = self._column_indices(name, columns)
+        result = np.empty((len(step_range), len(iteration_range), len(column_indices)), dtype=_dtype(info))
+        if not result.size:
+            return result
+        step_blocks = sorted({step // step_chunk for step in step_range})
+        iteration_blocks = sorted({iteration // iteration_chunk for iteration in iteration_range})
+        steps_index, iterations_index = np.asarray(step_range), np.asarray(iteration_range)
+        for step_block in step_blocks:
+            in_steps = steps_index // step_chunk == step_block
+            for iteration_block in iteration_blocks:
+                in_iterations = iterations_index // iteration_chunk == iteration_block
+                with np.load(os.path.join(self.path, name, f"s{step_block:05d}_i{iteration_block:06d}.npz")) as block:
+                    for position, column in enumerate(column_indices):
+                        values = block[f"c{column}"]
+                        result[np.ix_(in_steps, in_iterations, [position])] = values[
+                            np.ix_(
+                                steps_index[in_steps] - step_block * step_chunk,
+                                iterations_index[in_iterations] - iteration_block * iteration_chunk,
+                            )
+                        ][..., None]
+        return result
+
+    def read_records(self, name, steps=None, columns=None):
+        """Records of a table (fault event list) as a structured array, restricted to steps (index or slice) if the
+        table has a step field and to the fields in columns.
+
+        With steps, only the blocks whose range of steps overlaps the selection are decompressed (all of them for a
+        store written without the step ranges).
+        """
+        info = self.arrays[name]
+        dtype = _dtype(info)
+        fields = list(dtype.names) if columns is None else ([columns] if isinstance(columns, str) else list(columns))
+        parts = {field: [] for field in set(fields) | ({"step"} if steps is not None else set())}
+        blocks = sorted(os.listdir(os.path.join(self.path, name)))
+        step_range = None
+        if steps is not None and "step_ranges" in info:
+            step_range = _slice(steps, max(last for _, last in info["step_ranges"]) + 1)
+            first, last = (min(step_range), max(step_range)) if len(step_range) else (0, -1)
+            blocks = [block for block, (start, end) in zip(blocks, info["step_ranges"])
+                      if start <= last and end >= first]
+        for block in blocks:
+            with np.load(os.path.join(self.path, name, block)) as values:
+                for field in parts:
+                    parts[field].append(values[field])
+        parts = {field: np.concatenate(values) if values else np.zeros(0, dtype[field]) for field, values in parts.items()}
+        keep = slice(None)
+        if steps is not None:
+            if step_range is None:
+                step_range = _slice(steps, int(parts["step"].max(initial=-1)) + 1)
+            keep = np.isin(parts["step"], np.asarray(step_range))
+        records = np.empty(len(parts[fields[0]][keep]) if fields else 0, dtype=[(field, dtype[field]) for field in fields])
+        for field in fields:
+            records[field] = parts[field][keep]
+        return records
@@ -0,0 +1,251 @@
+"""PELCA (Power Electronics Life Cycle Assessment) is an open-source project aimed at assessing the environmental impact over the life cycle of modular and diagnosable power electronics systems. The integration of modularity and diagnosability aligns with circular economy principles, promoting practices such as repair and reuse. This project provides a tool to calculate the environmental impacts associated with the manufacturing, usage, and replacement of power electronics products.
+Copyright (C) Mitsubishi Electric R&D Centre Europe and SATIE 2024, author Briac Baudais baudaisbriac@gmail.com
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU Lesser General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with this program.  If not, see https://www.gnu.org/licenses/lgpl-3.0.html"""
+
+
+"""
+Global sensitivity analysis of the staircase model: which Weibull parameter, maintenance age or usage parameter
+drives the lifecycle impacts.
+
+The analysis is described by a JSON specification, with the parameter names of sweep.py and their ranges:
+
+    {
+        "method": "sobol",                  # "sobol": Saltelli design, first-order and total Sobol indices
+                                            # "morris": elementary effects (mu*, sigma), cheaper screening
+        "samples": 64,                      # sobol: first base sample (power of 2); morris: trajectories per round
+        "max_evaluations": 4096,            # budget of staircase runs
+        "tolerance": 0.02,                  # stop when no index moves more than this between two rounds
+        "levels": 4,                        # morris: number of levels of the grid
+        "seed": 0,
+        "parameters": {
+            "beta_wearout[0]": [6, 10],
+            "sigma_wearout[1]": [10, 20],
+            "maintenance[0]": [5, 10],
+            "num_hourPerYear": [2000, 5000]
+        }
+    }
+
+The output of the model is the mean total impact of each impact category at the end of the service life. Every
+evaluation runs the staircase of the workbook (its engine and number of iterations, the Renewal engine gives exact
+means) with the same random seed, so that the Monte Carlo noise does not hide the effects of the parameters. The
+design grows by rounds, doubling the Sobol base sample or adding Morris trajectories, until the indices are stable
+within the tolerance or the budget is spent.
+
+Usage: python sensitivity.py input.xlsx spec.json indices.csv [--workers 8]
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import dictionary
+from staircase import STAIRCASE, end_of_life_step, read_staircase_inputs
+from sweep import apply_point, typed_point, write_table
+
+
+def _points(names, bounds, unit):
+    """Design points ({parameter name: value}) of a (point, parameter) sample of the unit hypercube."""
+    values = bounds[:, 0] + unit * (bounds[:, 1] - bounds[:, 0])
+    return [typed_point(names, row) for row in values]
+
+
+def _evaluate(dic, EI_manufacturing, EI_use, beta_sigma_ERW, point, seed):
+    """Mean total impact of each impact category at the end of the service life for one design point."""
+    dic, beta_sigma_ERW = apply_point(dic, beta_sigma_ERW, point)
+    dic.update(output="Statistics", save_trajectories="False", workers=0)
+    statistics = STAIRCASE.from_arrays(dic, EI_manufacturing, EI_use, beta_sigma_ERW, rng=seed).statistics
+    return statistics.mean("EI_total")[end_of_life_step(dic)]
+
+
+class _Model:
+    """Staircase of an input workbook as a function of the design points, evaluated in a process pool."""
+
+    def __init__(self, dic, EI_manufacturing, EI_use, beta_sigma_ERW, seed, executor=None):
+        self.inputs = (dic, EI_manufacturing, EI_use, beta_sigma_ERW)
+        self.seed = seed
+        self.executor = executor
+        self.evaluations = 0
+
+    def __call__(self, points):
+        """(point, impact) array of the outputs of a list of design points."""
+        arguments = [self.inputs + (point, self.seed) for point in points]
+        self.evaluations += len(points)
+        if self.executor is None:
+            return np.array([_evaluate(*argument) for argument in arguments])
+        return np.array(list(self.executor.map(_evaluate, *zip(*arguments))))
+
+
+def sobol_indices(f_A, f_B, f_AB):
+    """First-order (Saltelli 2010) and total (Jansen) Sobol indices, arrays of shape (parameter, output).
+
+    f_A and f_B are the (sample, output) outputs of the two base samples, f_AB the (parameter, sample, output) outputs
+    of A with the column of each parameter taken from B.
+    """
+    variance = np.var(np.concatenate([f_A, f_B]), axis=0)
+    variance = np.where(variance > 0, variance, np.nan)
+    first = np.mean(f_B * (f_AB - f_A), axis=1) / variance
+    total = 0.5 * np.mean((f_A - f_AB) ** 2, axis=1) / variance
+    return first, total
+
+
+def morris_trajectories(n_trajectories, n_parameters, levels, rng):
+    """Morris one-at-a-time trajectories in the unit hypercube, array (trajectory, step, parameter) of
+    n_parameters + 1 points each, and the signed step of the parameter changed at each step (trajectory, parameter)
+    with the order in which the parameters are changed."""
+    delta = levels / (2 * (levels - 1))
+    grid = np.arange(levels) / (levels - 1)
+    trajectories = np.empty((n_trajectories, n_parameters + 1, n_parameters))
+    steps = np.empty((n_trajectories, n_parameters))
+    order = np.empty((n_trajectories, n_parameters), dtype=int)
+    for trajectory in range(n_trajectories):
+        x = rng.choice(grid, n_parameters)
+        trajectories[trajectory, 0] = x
+        order[trajectory] = rng.permutation(n_parameters)
+        for position, parameter in enumerate(order[trajectory]):
+            step = delta if x[parameter] + delta <= 1 + 1e-12 else -delta
+            x = x.copy()
+            x[parameter] += step
+            trajectories[trajectory, position + 1] = x
+            steps[trajectory, position] = step
+    return trajectories, steps, order
+
+
+def morris_indices(outputs, steps, order):
+    """mu, mu* and sigma of the elementary effects, arrays of shape (parameter, output), from the (trajectory, step,
+    output) outputs of Morris trajectories."""
+    effects = np.diff(outputs, axis=1) / steps[:, :, np.newaxis]
+    by_parameter = np.empty_like(effects)
+    for trajectory in range(len(order)):
+        by_parameter[trajectory, order[trajectory]] = effects[trajectory]
+    return by_parameter.mean(axis=0), np.abs(by_parameter).mean(axis=0), by_parameter.std(axis=0, ddof=1)
+
+
+def _sobol(model, names, bounds, spec):
+    from scipy.stats import qmc  # scipy.stats is slow to import
+
+    n_parameters = len(names)
+    sampler = qmc.Sobol(d=2 * n_parameters, scramble=True, seed=spec.get("seed"))
+    size = int(spec.get("samples", 64))
+    f_A, f_B, f_AB = [], [], []
+    history, previous = [], None
+    while True:
+        base = sampler.random(size)
+        A, B = base[:, :n_parameters], base[:, n_parameters:]
+        AB = np.repeat(A[np.newaxis], n_parameters, axis=0)
+        for parameter in range(n_parameters):
+            AB[parameter, :, parameter] = B[:, parameter]
+        outputs = model(_points(names, bounds, np.concatenate([A, B, AB.reshape(-1, n_parameters)])))
+        f_A.append(outputs[:size])
+        f_B.append(outputs[size : 2 * size])
+        f_AB.append(outputs[2 * size :].reshape(n_parameters, size, -1))
+        indices = sobol_indices(np.concatenate(f_A), np.concatenate(f_B), np.concatenate(f_AB, axis=1))
+        change = np.inf if previous is None else np.nanmax(np.abs(np.stack(indices) - np.stack(previous)))
+        history.append({"evaluations": model.evaluations, "samples": sum(len(f) for f in f_A), "max change": change})
+        previous = indices
+        # the next round doubles the base sample, (parameters + 2) evaluations per sample
+        size = sum(len(f) for f in f_A)
+        if change < spec.get("tolerance", 0.02) or model.evaluations + size * (n_parameters + 2) > spec.get(
+                "max_evaluations", 4096):
+            break
+    return {"S1": indices[0], "ST": indices[1]}, history
+
+
+def _morris(model, names, bounds, spec):
+    n_parameters = len(names)
+    rng = np.random.default_rng(spec.get("seed"))
+    size = int(spec.get("samples", 10))
+    outputs, steps, order = [], [], []
+    history, previous = [], None
+    while True:
+        trajectories, new_steps, new_order = morris_trajectories(size, n_parameters, int(spec.get("levels", 4)), rng)
+        new_outputs = model(_points(names, bounds, trajectories.reshape(-1, n_parameters)))
+        outputs.append(new_outputs.reshape(size, n_parameters + 1, -1))
+        steps.append(new_steps)
+        order.append(new_order)
+        indices = morris_indices(np.concatenate(outputs), np.concatenate(steps), np.concatenate(order))
+        # mu* relative to the largest mu* of each output, so that the tolerance does not depend on the units
+        scale = np.nanmax(indices[1], axis=0)
+        scale = np.where(scale > 0, scale, 1)
+        change = np.inf if previous is None else np.nanmax(np.abs(indices[1] - previous) / scale)
+        history.append({"evaluations": model.evaluations, "samples": sum(len(o) for o in outputs), "max change": change})
+        previous = indices[1]
+        if change < spec.get("tolerance", 0.02) or model.evaluations + size * (n_parameters + 1) > spec.get(
+                "max_evaluations", 4096):
+            break
+    return {"mu": indices[0], "mu_star": indices[1], "sigma": indices[2]}, history
+
+
+def analyse(model, names, bounds, EI_name, spec):
+    """Sensitivity indices of model (see _Model) over the parameters names of ranges bounds (parameter, [min, max]).
+
+    Returns the index table, one row per impact category and parameter, and the convergence history, one row per
+    round with the number of evaluations and the largest change of an index since the previous round.
+    """
+    method = spec.get("method", "sobol")
+    if method == "sobol":
+        indices, history = _sobol(model, names, bounds, spec)
+    elif method == "morris":
+        indices, history = _morris(model, names, bounds, spec)
+    else:
+        raise ValueError(f"Unknown sensitivity method '{method}'")
+    rows = []
+    for output, EI in enumerate(EI_name):
+        for parameter, name in enumerate(names):
+            rows.append(dict({"impact": EI, "parameter": name},
+                             **{index: values[parameter, output] for index, values in indices.items()}))
+    return pd.DataFrame(rows), pd.DataFrame(history)
+
+
+def run_sensitivity(path_input, name_input, spec, workers=None):
+    """Sensitivity analysis of the staircase of an input workbook (LCA calculated first if needed).
+
+    The LCA results and the fault table are read once and every round of design points runs in a process pool of
+    workers processes (all the cores by default, the current process with 1). Returns the index table and the
+    convergence history of analyse.
+    """
+    names = list(spec["parameters"])
+    bounds = np.array([spec["parameters"][name] for name in names], dtype=float)
+    typed_point(names, bounds[:, 0])  # unknown parameter names fail before the LCA
+    dic = dictionary._init_dic(path_input, name_input)
+    if dic["LCA"] == "yes":
+        import LCA
+
+        LCA.EI_calculation(dic, path_input, name_input)
+    EI_manufacturing, EI_use, beta_sigma_ERW = read_staircase_inputs(path_input, name_input, dic)
+    seed = np.random.SeedSequence(spec.get("seed")).entropy
+    if workers == 1:
+        model = _Model(dic, EI_manufacturing, EI_use, beta_sigma_ERW, seed)
+        return analyse(model, names, bounds, dic["EI_name"], spec)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        model = _Model(dic, EI_manufacturing, EI_use, beta_sigma_ERW, seed, executor)
+        return analyse(model, names, bounds, dic["EI_name"], spec)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sensitivity analysis of the PELCA staircase")
+    parser.add_argument("input", help="input workbook (.xlsx)")
+    parser.add_argument("spec", help="JSON sensitivity specification")
+    parser.add_argument("output", help="index table (.csv or .parquet)")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes (all the cores by default)")
+    args = parser.parse_args()
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+    path_input, name_input = os.path.split(os.path.abspath(args.input))
+    indices, history = run_sensitivity(path_input, name_input, spec, args.workers)
+    write_table(indices, args.output)
+    print(history.to_string(index=False))
+    print(f"{len(indices)} indices written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,10 +16,77 @@ Created on 2024
 import numpy as np
 import pandas as pd
 import sys
-from scipy.stats import weibull_min
-import matplotlib.pyplot as plt
-import random
 import os
+import hashlib
+import heapq
+import json
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+from renewal import expected_statistics, is_decoupled
+from result_store import write_store
+from streaming import EI_NAMES, FAULT_NAMES, RunningMoments, StreamingAccumulator, TrajectoryWriter, end_of_life_step
+from weibull_cache import WeibullCache, weibull_key
+
+# fault_cause holds one uint8 code per (step, iteration, RU): 0 when the RU has no fault, 1 + the index in FAULT_NAMES
+# otherwise. With dic["fault_cause_format"] set to "Events" it is instead a FAULT_EVENT_DTYPE array of the faults only.
+FAULT_CAUSES = np.array(("",) + FAULT_NAMES)
+EARLY, RANDOM, WEAROUT = 1, 2, 3
+FAULT_EVENT_DTYPE = np.dtype([("step", np.int32), ("iteration", np.int32), ("RU", np.int32), ("cause", np.uint8)])
+# independently randomized blocks of a Latin hypercube or Sobol' sample, to estimate its standard error
+SAMPLING_REPLICATES = 8
+
+
+def encode_fault_cause(fault_cause):
+    """uint8 codes of an array of fault cause names ("", "Early", "Random" or "Wearout")."""
+    fault_cause = np.asarray(fault_cause)
+    codes = np.zeros(fault_cause.shape, dtype=np.uint8)
+    for code, cause in enumerate(FAULT_NAMES, start=1):
+        codes[fault_cause == cause] = code
+    return codes
+
+
+def decode_fault_cause(fault_cause):
+    """Fault cause names of uint8 codes, or of the "cause" field of a fault event list."""
+    codes = fault_cause["cause"] if fault_cause.dtype.names else fault_cause
+    return FAULT_CAUSES[codes]
+
+
+def fault_cause_events(fault_cause):
+    """Sparse fault event list (FAULT_EVENT_DTYPE) of a dense (step, iteration, RU) code array."""
+    step, iteration, RU = np.nonzero(fault_cause)
+    events = np.empty(len(step), dtype=FAULT_EVENT_DTYPE)
+    events["step"], events["iteration"], events["RU"] = step, iteration, RU
+    events["cause"] = fault_cause[step, iteration, RU]
+    return events
+
+
+def fault_cause_dense(events, shape):
+    """Dense (step, iteration, RU) code array of a fault event list."""
+    fault_cause = np.zeros(shape, dtype=np.uint8)
+    fault_cause[events["step"], events["iteration"], events["RU"]] = events["cause"]
+    return fault_cause
+
+
+def count_fault_cause(fault_cause, weights=None):
+    """Number of Early, Random and Wearout faults of a dense code array or a fault event list.
+
+    With the likelihood-ratio weights of the iterations of an importance sampling run, the weighted numbers scaled
+    to the number of iterations (floats).
+    """
+    if fault_cause.dtype.names:
+        iteration_weights = None if weights is None else weights[fault_cause["iteration"]]
+        counts = np.bincount(fault_cause["cause"], weights=iteration_weights, minlength=len(FAULT_CAUSES))
+    else:
+        # step by step, so that a memory-mapped array is never loaded whole
+        counts = np.zeros(len(FAULT_CAUSES), dtype=np.int64 if weights is None else float)
+        for codes in fault_cause:
+            code_weights = None if weights is None else np.broadcast_to(weights[:, np.newaxis], codes.shape).ravel()
+            counts += np.bincount(codes.ravel(), weights=code_weights, minlength=len(FAULT_CAUSES)).astype(counts.dtype)
+    if weights is not None:
+        counts = counts * len(weights) / np.sum(weights)
+    return counts[1:]
 
 
 def _wcdf(self,year,dic,nb_RU,weibull_Efault,weibull_Rfault,weibull_Wfault):
@@ -45,45 +112,171 @@ def _wcdf(self,year,dic,nb_RU,weibull_Efault,weibull_Rfault,weibull_Wfault):
     
     return wcdf
 
+def _inverse_wcdf(wcdf, u, RU):
+    """Failure age step of each draw: first age index whose combined CDF reaches u (len(wcdf) if never reached).
+
+    wcdf is the (age step, RU) combined CDF table, u and RU are matching 1D arrays of uniform draws and RU indices.
+    """
+    age_fault = np.empty(len(u), dtype=int)
+    for ru in np.unique(RU):
+        sel = RU == ru
+        age_fault[sel] = np.searchsorted(wcdf[:, ru], u[sel], side="left")
+    return age_fault
+
+def _next_failure_age(wcdf, age, u, RU):
+    """Failure age step drawn from the Weibull law conditioned on the RU having survived up to its current age."""
+    survived = wcdf[age, RU]
+    return _inverse_wcdf(wcdf, survived + u * (1 - survived), RU)
+
+def _importance_uniforms(wcdf, u, RU, share):
+    """Uniform draws u of failure times biased toward failure, and their likelihood ratios.
+
+    For each RU whose probability F of failing within the wcdf table is below share, the draws are mapped by inverse
+    CDF onto the density share / F below F and (1 - share) / (1 - F) above, so that a share of them fail within the
+    table; the likelihood ratio of a draw is the uniform density over the biased one. The other draws are unchanged,
+    with a ratio of 1.
+    """
+    F = wcdf[-1, RU]
+    biased = (F > 0) & (F < share)
+    x = np.array(u, dtype=float)
+    ratio = np.ones(len(x))
+    failed = biased & (x < share)
+    survived = biased & (x >= share)
+    x[failed] = x[failed] * F[failed] / share
+    ratio[failed] = F[failed] / share
+    x[survived] = F[survived] + (x[survived] - share) * (1 - F[survived]) / (1 - share)
+    ratio[survived] = (1 - F[survived]) / (1 - share)
+    return x, ratio
+
+def _initial_uniforms(dic, rng, nb_ite_MC, nb_RU):
+    """Uniform draws of the first failure time and of the first fault type of every iteration and RU, two
+    (iteration, RU) arrays, with the sampling strategy of dic["sampling"].
+
+    "Random": independent draws. "Antithetic": iterations 2k and 2k + 1 use u and 1 - u. "Latin hypercube" and
+    "Sobol": the iterations are cut in SAMPLING_REPLICATES blocks, each an independently randomized Latin hypercube
+    or scrambled Sobol' sample of the 2 x nb_RU dimensions, so that the standard error can be estimated from the
+    block means (see sampling_standard_error). The draws of the RUs renewed later in the service life stay
+    independent.
+    """
+    sampling = dic.get("sampling", "Random")
+    if sampling == "Random":
+        return rng.random((nb_ite_MC, nb_RU)), rng.random((nb_ite_MC, nb_RU))
+    if sampling == "Antithetic":
+        half = rng.random(((nb_ite_MC + 1) // 2, 2 * nb_RU))
+        u = np.stack([half, 1 - half], axis=1).reshape(-1, 2 * nb_RU)[:nb_ite_MC]
+    else:
+        from scipy.stats import qmc  # scipy.stats is slow to import
+
+        u = np.empty((nb_ite_MC, 2 * nb_RU))
+        blocks = np.array_split(np.arange(nb_ite_MC), SAMPLING_REPLICATES)
+        for block, child in zip(blocks, rng.spawn(len(blocks))):
+            if sampling == "Latin hypercube":
+                design = qmc.LatinHypercube(d=2 * nb_RU, seed=child)
+            else:
+                design = qmc.Sobol(d=2 * nb_RU, scramble=True, seed=child)
+            with warnings.catch_warnings():
+                # the balance of a Sobol' sample is best for a power of 2 points, any block size is accepted
+                warnings.simplefilter("ignore", UserWarning)
+                u[block] = design.random(len(block))
+    return u[:, :nb_RU], u[:, nb_RU:]
+
+
+def sampling_standard_error(values, sampling="Random", replicates=SAMPLING_REPLICATES):
+    """Standard error of the mean over the iterations (first axis) of values simulated with a sampling strategy.
+
+    Antithetic pairs are averaged first, stratified samples are estimated from the means of their independently
+    randomized blocks, random samples from the standard deviation.
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if sampling == "Antithetic" and n >= 4:
+        pairs = values[: n - n % 2].reshape((-1, 2) + values.shape[1:]).mean(axis=1)
+        return pairs.std(axis=0, ddof=1) / np.sqrt(len(pairs))
+    if sampling in ("Latin hypercube", "Sobol") and n >= 2 * replicates:
+        means = np.stack([values[block].mean(axis=0) for block in np.array_split(np.arange(n), replicates)])
+        return means.std(axis=0, ddof=1) / np.sqrt(replicates)
+    return values.std(axis=0, ddof=1) / np.sqrt(n)
+
+
+def _count_dtype(dic):
+    """dtype of the replacement and maintenance counts: one byte per step, iteration and RU when the replacement
+    matrix only replaces whole RUs, float when it holds fractions of RUs."""
+    matrix = dic["Remplacement_matrix"]
+    matrix = matrix.drop(columns=["Fault"], errors="ignore") if isinstance(matrix, pd.DataFrame) else pd.DataFrame(matrix)
+    values = np.clip(matrix.to_numpy(dtype=float), 0, 1)
+    return np.uint8 if np.isin(values, (0, 1)).all() else float
+
+
+def read_staircase_inputs(path_input,name_input,dic):
+    """LCA results (EI_manufacturing, EI_use) and fault table (beta_sigma_ERW) of a staircase, as taken by
+    STAIRCASE.from_arrays. Sets dic["maintenance"]."""
+    excel = pd.ExcelFile(os.path.join(dic["LCA_path"],dic["filename_result_EI"]))
+    
+    # EI manufacturing of each RU
+    df_manufacturing =pd.read_excel(excel, sheet_name='Manufacturing', index_col=0)
+    df_manufacturing = df_manufacturing.drop(columns=['Unit'])
+    
+    #losses of each RU
+    df_EI_use_onestep=pd.read_excel(excel, sheet_name='Use', index_col=0)
+    df_EI_use_onestep = df_EI_use_onestep.drop(columns=['Unit'])
+    excel.close()
+
+    
+    if len(dic.get("faults", ())):
+        # fault table already parsed with the configuration, see config.load_config
+        data=dic["faults"]
+    else:
+        with pd.ExcelFile(os.path.join(path_input,name_input)) as excel:
+            data=pd.read_excel(excel, sheet_name='Faults & Maintenance', index_col=0, skiprows=[0,1,2])
+    # Extract the 6th column (index 5) into a variable named 'maintenance'
+    dic["maintenance"] = data.iloc[:, 6].to_numpy()
+    # Drop the 6th column (index 5) from the DataFrame and convert it to a NumPy array for 'beta_sigma_ERW'
+    beta_sigma_ERW = data.drop(data.columns[6], axis=1).to_numpy()
+
+    return df_manufacturing.to_numpy(), df_EI_use_onestep.to_numpy(), beta_sigma_ERW
+
 class STAIRCASE():
     
     #%%
-    def __init__(self,path_input,name_input,dic):
+    def __init__(self,path_input,name_input,dic,rng=None):
+      EI_manufacturing, EI_use, beta_sigma_ERW = read_staircase_inputs(path_input, name_input, dic)
+      self._setup(dic, EI_manufacturing, EI_use, beta_sigma_ERW)
+      self.creation(dic, rng)
+
+    @classmethod
+    def from_arrays(cls, dic, EI_manufacturing, EI_use, beta_sigma_ERW, rng=None):
+        """Build a staircase from in-memory LCA results and fault parameters instead of the Excel files.
+
+        EI_manufacturing and EI_use are (impact category, RU) tables as found in the "Manufacturing" and "Use"
+        sheets of the LCA result file, beta_sigma_ERW is the fault table of the "Faults & Maintenance" sheet
+        without the maintenance column. dic["maintenance"] must already be set. rng is passed to creation.
+        """
+        staircase = cls.__new__(cls)
+        staircase._setup(dic, np.asarray(EI_manufacturing, dtype=float), np.asarray(EI_use, dtype=float),
+                         np.asarray(beta_sigma_ERW, dtype=float))
+        staircase.creation(dic, rng)
+        return staircase
+
+    def _setup(self, dic, EI_manufacturing, EI_use, beta_sigma_ERW):
       self.usage_time =dic["service_life"]*dic["step"] # in month
       epsilon = 1e-10 #allow to avoid to divide by 0 during .../wcdf_sum
       self.t = np.linspace(epsilon, dic["service_life"], self.usage_time)
-      
-      excel = pd.ExcelFile(os.path.join(dic["LCA_path"],dic["filename_result_EI"]))
-      
-      # EI manufacturing of each RU
-      df_manufacturing =pd.read_excel(excel, sheet_name='Manufacturing', index_col=0)
-      df_manufacturing = df_manufacturing.drop(columns=['Unit'])
-      self.EI_manufacturing = df_manufacturing.to_numpy()
+
+      self.EI_manufacturing = EI_manufacturing
+      self.inputs = (EI_manufacturing, EI_use, beta_sigma_ERW)  # shipped to the worker processes of _creation_parallel
+      self.weights = None  # likelihood ratio of every iteration with importance sampling
       
       # EI manufacturing of total RU
       self.EI_manufacturing_total = self.EI_manufacturing.sum(axis=1)
       
       #losses of each RU
-      df_EI_use_onestep=pd.read_excel(excel, sheet_name='Use', index_col=0)
-      df_EI_use_onestep = df_EI_use_onestep.drop(columns=['Unit'])
-      self.EI_use_onestep = df_EI_use_onestep.to_numpy()*dic["num_hourPerYear"]/dic["step"]
+      self.EI_use_onestep = EI_use*dic["num_hourPerYear"]/dic["step"]
       
       #total losses
       self.EI_use_onestep_total =self.EI_use_onestep.sum(axis=1)
 
       # Number of component - remplacement unite
       dic["nb_RU"]=self.EI_manufacturing.shape[1]
-      excel.close()
-
-      
-      excel = pd.ExcelFile(os.path.join(path_input,name_input))
-      data=pd.read_excel(excel, sheet_name='Faults & Maintenance', index_col=0, skiprows=[0,1,2])
-      # Extract the 6th column (index 5) into a variable named 'maintenance'
-      dic["maintenance"] = data.iloc[:, 6].to_numpy()
-      # Drop the 6th column (index 5) from the DataFrame and convert it to a NumPy array for 'beta_sigma_ERW'
-      beta_sigma_ERW = data.drop(data.columns[6], axis=1).to_numpy()
-      excel.close()
-
 
       if beta_sigma_ERW.shape[0] != dic["nb_RU"]:
         print(f"Error: number of RU's faults ({beta_sigma_ERW.shape[0]}) is different from the expected number of RU {dic['nb_RU']}.")
@@ -100,30 +293,33 @@ class STAIRCASE():
       dic["beta_early"] = [sigma for sigma in beta_sigma_ERW[:, 1]]
       dic["beta_random"] = [sigma for sigma in beta_sigma_ERW[:, 3]]
       dic["beta_wearout"] = [sigma for sigma in beta_sigma_ERW[:, 5]]
-            
-      self.creation(dic)  
 
     #%%
-    def creation(self,dic):
+    def _weibull_tables(self, dic):
+        """Weibull CDF of each fault type and share of each type in the total, per RU age step (rows) and RU (columns).
+
+        With dic["weibull_cache"] set to a folder the tables are read from (or added to) the on-disk WeibullCache of
+        dic["weibull_cache_size"] MB, as read-only memory-mapped arrays.
+        """
+        if dic.get("weibull_cache"):
+            cache = WeibullCache(dic["weibull_cache"], float(dic.get("weibull_cache_size", 256)) * 2**20)
+            key = weibull_key(dic, self.t)
+            tables = cache.get(key)
+            if tables is None:
+                tables = cache.put(key, np.stack(self._compute_weibull_tables(dic)))
+        else:
+            tables = self._compute_weibull_tables(dic)
+        weibull_Efault, weibull_Rfault, weibull_Wfault = tables[:3]
+        wcdf=1-(1-weibull_Efault)*(1-weibull_Rfault)*(1-weibull_Wfault)
+        self.wcdf_total=1-np.prod(1 - wcdf, axis=1)
+        return tuple(tables)
+
+    def _compute_weibull_tables(self, dic):
+        from scipy.stats import weibull_min  # scipy.stats is slow to import and not needed on a Weibull cache hit
+
         nb_RU=dic["nb_RU"]
-        nb_ite_MC=dic["nb_ite_MC"]
         t=self.t
 
-        if dic["pre_set_fail"]==False:
-            random_fault_time=np.array([[random.uniform(0, 1) for y in range(nb_ite_MC)] for y in range(nb_RU)], dtype='float').T
-            random_fault_type=np.array([[random.uniform(0, 1) for y in range(nb_ite_MC)] for y in range(nb_RU)], dtype='float').T
-       
-        self.RU_age =np.array([[[0 for i in range(nb_RU)] for z in range(nb_ite_MC)] for y in range(self.usage_time)])
-        self.driver_age =np.array([[[0 for i in range(nb_RU)] for z in range(nb_ite_MC)] for y in range(self.usage_time)])
-        self.EI_total=np.array([[self.EI_manufacturing_total for z in range(nb_ite_MC)] for y in range(self.usage_time)], dtype='float')
-        self.EI_total_manu=np.array([[self.EI_manufacturing_total for z in range(nb_ite_MC)] for y in range(self.usage_time)], dtype='float')
-        self.EI_total_maintenance=np.array([[self.EI_manufacturing_total*0 for z in range(nb_ite_MC)] for y in range(self.usage_time)], dtype='float')
-        self.EI_total_use=np.array([[self.EI_manufacturing_total*0 for z in range(nb_ite_MC)] for y in range(self.usage_time)], dtype='float')
-        
-        self.number_of_fault=np.array([[[0 for i in range(nb_RU)] for z in range(nb_ite_MC)] for y in range(self.usage_time)])
-
-        self.fault_cause =np.array([[["" for i in range(nb_RU)] for z in range(nb_ite_MC)] for y in range(self.usage_time)], dtype="<U10")
-      
         weibull_Efault=np.array([[0 for i in range(nb_RU)] for z in t], dtype='float')
         weibull_Rfault=np.array([[0 for i in range(nb_RU)] for z in t], dtype='float')
         weibull_Wfault=np.array([[0 for i in range(nb_RU)] for z in t], dtype='float')
@@ -134,11 +330,6 @@ class STAIRCASE():
         
         time=np.array([t+1 for i in range(nb_RU)]).T
         
-        (row_r,col_r)=dic["Remplacement_matrix"].shape
-        remplacement=np.array([[[0 for y in range(col_r)] for z in range(row_r)] for i in range(nb_ite_MC)] , dtype='float')
-        remplacement_or=np.array([[0 for y in range(nb_RU)] for i in range(nb_ite_MC)] , dtype='float')
-
-        
         if dic["Early_failure"]=='True':
             weibull_Efault=np.array(weibull_min.cdf(time-1,dic["beta_early"][:], scale=dic["sigma_early"][:]),ndmin=2, dtype='float')
             
@@ -150,9 +341,6 @@ class STAIRCASE():
         
         wcdf_sum=np.sum([weibull_Efault,weibull_Rfault,weibull_Wfault],axis=0)
         
-        wcdf=1-(1-weibull_Efault)*(1-weibull_Rfault)*(1-weibull_Wfault)
-        self.wcdf_total=1-np.prod(1 - wcdf, axis=1)
-        
         if dic["Early_failure"]=='True':
             prob_weibull_Efault=weibull_Efault/wcdf_sum
         if dic["Random_failure"]=='True' :   
@@ -160,7 +348,240 @@ class STAIRCASE():
 
         if dic["Wearout_failure"]=='True':
             prob_weibull_Wfault=np.divide(weibull_Wfault,wcdf_sum)
-            
+
+        return weibull_Efault, weibull_Rfault, weibull_Wfault, prob_weibull_Efault, prob_weibull_Rfault, prob_weibull_Wfault
+
+    #%%
+    def creation(self,dic,rng=None):
+        """Run the Monte Carlo staircase with the engine selected in dic["engine"] (the historical step loop by default).
+
+        With dic["output"] set to "Statistics" only running statistics are kept, see _creation_streaming. With
+        dic["fault_cause_format"] set to "Events" fault_cause is the sparse list of faults (FAULT_EVENT_DTYPE). With
+        dic["output"] set to "Memory-mapped" the trajectories are numpy.memmap arrays backed by files, see
+        _creation_memmap. With dic["workers"] set to 1 or more the iterations are sharded over worker processes, see
+        _creation_parallel. The Renewal engine computes the expected staircase without Monte Carlo when the RUs are
+        independent, see _creation_renewal, and falls back on the Vectorized engine otherwise. With
+        dic["importance_sampling"] above 0 the failures are drawn biased toward failure by the Vectorized engine and
+        every iteration carries a likelihood-ratio weight in self.weights, see _steps_vectorized; the statistics of
+        the run are then weighted.
+
+        All the variates are drawn from rng, a numpy.random.Generator or a seed. By default it is seeded with
+        dic["seed"] (the "Random seed" row of the Staircase sheet), fresh entropy when no seed is given; the seed
+        actually used is kept in self.seed to reproduce the run.
+        """
+        self.statistics = None
+        self.convergence = None
+        self.weights = None
+        if dic.get("engine", "Loop") == "Renewal" and dic["pre_set_fail"]==False:
+            if is_decoupled(dic):
+                self._creation_renewal(dic)
+                return
+            print("The replacement matrix couples RUs, the Vectorized Monte Carlo engine is used instead of Renewal.")
+            dic = dict(dic, engine="Vectorized")
+        adaptive = (float(dic.get("target_precision", 0)) > 0 or float(dic.get("time_budget", 0)) > 0) \
+            and dic.get("output", "Trajectories") in ("Trajectories", "Statistics") and dic["pre_set_fail"]==False
+        if float(dic.get("importance_sampling", 0)) > 0 and dic["pre_set_fail"]==False:
+            if adaptive or dic.get("output", "Trajectories") != "Trajectories":
+                print("Importance sampling needs the Trajectories output and a fixed number of iterations, the failures"
+                      " are drawn without bias.")
+                dic = dict(dic, importance_sampling=0)
+            elif dic.get("engine", "Loop") != "Vectorized":
+                print("Importance sampling uses the Vectorized engine.")
+                dic = dict(dic, engine="Vectorized")
+        reuse = dic.get("reuse_faults", "False") == "True" and dic.get("output", "Trajectories") == "Trajectories" \
+            and dic["pre_set_fail"]==False and not adaptive
+        if reuse and os.path.exists(self._fault_sample_path(dic)):
+            print("Fault samples reused, only the impacts are calculated.")
+            self._weibull_tables(dic)  # wcdf_total
+            self.load_fault_samples(self._fault_sample_path(dic))
+            self._fault_cause_format(dic)
+            return
+        rng = np.random.default_rng(dic.get("seed") if rng is None else rng)
+        self.seed = rng.bit_generator.seed_seq.entropy
+        if adaptive:
+            self._creation_adaptive(dic, rng)
+        elif int(dic.get("workers", 0)) > 0 and dic["pre_set_fail"]==False:
+            self._creation_parallel(dic, rng)
+        elif dic.get("output", "Trajectories") == "Statistics" and dic["pre_set_fail"]==False:
+            self._creation_streaming(dic, rng)
+        elif dic.get("output", "Trajectories") == "Memory-mapped" and dic["pre_set_fail"]==False:
+            self._creation_memmap(dic, rng)
+        elif dic.get("engine", "Loop") == "Vectorized" and dic["pre_set_fail"]==False:
+            self._creation_vectorized(dic, rng)
+        elif dic.get("engine", "Loop") == "Event" and dic["pre_set_fail"]==False:
+            self._creation_event(dic, rng)
+        else:
+            self._creation_loop(dic, rng)
+        if reuse:
+            self.save_fault_samples(self._fault_sample_path(dic))
+        self._fault_cause_format(dic)
+
+    def _fault_cause_format(self, dic):
+        if dic.get("fault_cause_format", "Dense") == "Events" and self.fault_cause is not None \
+                and not self.fault_cause.dtype.names:
+            self.fault_cause = fault_cause_events(self.fault_cause)
+
+    def _creation_renewal(self, dic):
+        """Expected staircase of the renewal equation of each RU (see renewal), without Monte Carlo: only the
+        expected values are kept, in self.statistics as with the Statistics output."""
+        self.seed = None
+        self.statistics = expected_statistics(self, dic)
+        self.EI_total = self.EI_total_manu = self.EI_total_use = self.EI_total_maintenance = None
+        self.RU_age = self.driver_age = self.number_of_fault = self.fault_cause = None
+
+    #%%
+    def _creation_parallel(self, dic, rng):
+        """Monte Carlo staircase sharded over dic["workers"] processes.
+
+        The iterations are cut into shards of dic["batch_size"] iterations, shard i being driven by the i-th generator
+        spawned from rng (the i-th child of its numpy.random.SeedSequence). The shard results are merged in shard
+        order, so a given seed and batch size give bit-identical outputs whatever the number of workers. With 1 worker
+        the shards run in the current process.
+        """
+        nb_ite_MC = dic["nb_ite_MC"]
+        batch_size = int(dic.get("batch_size", 1000))
+        workers = int(dic["workers"])
+        starts = list(range(0, nb_ite_MC, batch_size))
+        shards = [(dict(dic, nb_ite_MC=min(batch_size, nb_ite_MC - start)), start, child)
+                  for start, child in zip(starts, rng.spawn(len(starts)))]
+        self._weibull_tables(dic)  # wcdf_total of the main process
+
+        streaming = dic.get("output", "Trajectories") == "Statistics"
+        memmap = dic.get("output", "Trajectories") == "Memory-mapped"
+        if memmap or (streaming and dic.get("save_trajectories", "False") == "True"):
+            # files created once here, each shard then writes its own iterations
+            TrajectoryWriter(*self._trajectory_layout(dic)).close()
+        arguments = [(shard_dic, start, nb_ite_MC, child, *self.inputs) for shard_dic, start, child in shards]
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(_run_shard, *zip(*arguments))
+                self._merge_shards(dic, starts, results, streaming or memmap)
+        else:
+            self._merge_shards(dic, starts, (_run_shard(*argument) for argument in arguments), streaming or memmap)
+        if memmap:
+            self.statistics = None
+            self._open_trajectories(dic)
+
+    def _creation_adaptive(self, dic, rng):
+        """Monte Carlo staircase run by batches of dic["batch_size"] iterations until the mean total impact of every
+        impact category at the end of the service life is known within dic["target_precision"] (relative half-width
+        of its 95 % confidence interval), dic["time_budget"] seconds have passed or dic["nb_ite_MC"] iterations are
+        done, whichever comes first (0 disables a criterion).
+
+        The batches are the shards of _creation_parallel, batch i drawn from the i-th generator spawned from rng and
+        dic["workers"] batches run at a time, so a run with the same seed repeats the same first batches. The mean
+        and confidence interval are tracked with mergeable running moments (streaming.RunningMoments) and the state
+        after each round is kept in self.convergence; dic["nb_ite_MC"] is set to the number of iterations run.
+        """
+        nb_ite_MC = dic["nb_ite_MC"]
+        batch_size = int(dic.get("batch_size", 1000))
+        workers = int(dic.get("workers", 0))
+        target = float(dic.get("target_precision", 0))
+        budget = float(dic.get("time_budget", 0))
+        streaming = dic.get("output", "Trajectories") == "Statistics"
+        final = end_of_life_step(dic)
+        EI_name = dic.get("EI_name", range(len(self.EI_manufacturing_total)))
+        self._weibull_tables(dic)  # wcdf_total of the main process
+
+        starts = list(range(0, nb_ite_MC, batch_size))
+        children = rng.spawn(len(starts))
+        batch_dic = dict(dic, save_trajectories="False")
+        moments = RunningMoments(len(self.EI_manufacturing_total))
+        results, trace = [], []
+        start_time = time.perf_counter()
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            while len(results) < len(starts):
+                batch = range(len(results), min(len(results) + max(workers, 1), len(starts)))
+                arguments = [(dict(batch_dic, nb_ite_MC=min(batch_size, nb_ite_MC - starts[i])), starts[i], nb_ite_MC,
+                              children[i], *self.inputs) for i in batch]
+                if executor is None:
+                    round_results = [_run_shard(*argument) for argument in arguments]
+                else:
+                    round_results = list(executor.map(_run_shard, *zip(*arguments)))
+                for result in round_results:
+                    if streaming:
+                        moments.merge(RunningMoments.from_accumulator(result))
+                    else:
+                        moments.update(result["EI_total"][final])
+                results.extend(round_results)
+                precision = moments.relative_half_width()
+                elapsed = time.perf_counter() - start_time
+                row = {"iterations": moments.count, "time (s)": elapsed, "relative precision": precision.max()}
+                for index, name in enumerate(EI_name):
+                    row[f"{name} mean"] = moments.mean[index]
+                    row[f"{name} half-width"] = moments.half_width()[index]
+                trace.append(row)
+                # at least two batches, so that the first confidence interval is not trusted alone
+                if len(results) >= 2 and ((target > 0 and precision.max() <= target) or (budget > 0 and elapsed >= budget)):
+                    break
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        dic["nb_ite_MC"] = moments.count
+        self._merge_shards(dic, starts[: len(results)], results, streaming)
+        self.convergence = pd.DataFrame(trace)
+        print(f"Adaptive staircase: {moments.count} iterations, relative precision {trace[-1]['relative precision']:.3g}"
+              f" in {trace[-1]['time (s)']:.1f} s.")
+
+    def _merge_shards(self, dic, starts, results, streaming):
+        nb_ite_MC = dic["nb_ite_MC"]
+        self.statistics = None
+        self.EI_total = self.EI_total_manu = self.EI_total_use = self.EI_total_maintenance = None
+        self.RU_age = self.driver_age = self.number_of_fault = self.fault_cause = None
+        self.replacement_count = self.maintenance_count = self.weights = None
+        fault_events = []
+        for start, result in zip(starts, results):
+            if streaming:
+                self.statistics = result if self.statistics is None else self.statistics.merge(result)
+                continue
+            for name, values in result.items():
+                if name == "weights":
+                    # one likelihood ratio per iteration, with importance sampling only
+                    if values is not None:
+                        if self.weights is None:
+                            self.weights = np.empty(nb_ite_MC)
+                        self.weights[start : start + len(values)] = values
+                    continue
+                if name == "fault_cause" and values.dtype.names:
+                    values["iteration"] += start
+                    fault_events.append(values)
+                    continue
+                if getattr(self, name) is None:
+                    setattr(self, name, np.empty((values.shape[0], nb_ite_MC) + values.shape[2:], dtype=values.dtype))
+                getattr(self, name)[:, start : start + values.shape[1]] = values
+        if fault_events:
+            self.fault_cause = np.sort(np.concatenate(fault_events), order=["step", "iteration", "RU"])
+        if not streaming:
+            self.driver_age = np.zeros_like(self.RU_age)
+
+    #%%
+    def _creation_loop(self,dic,rng=None):
+        rng = np.random.default_rng() if rng is None else rng
+        nb_RU=dic["nb_RU"]
+        nb_ite_MC=dic["nb_ite_MC"]
+        t=self.t
+
+        if dic["pre_set_fail"]==False:
+            random_fault_time, random_fault_type = _initial_uniforms(dic, rng, nb_ite_MC, nb_RU)
+       
+        self.RU_age =np.array([[[0 for i in range(nb_RU)] for z in range(nb_ite_MC)] for y in range(self.usage_time)])
+        self.driver_age =np.array([[[0 for i in range(nb_RU)] for z in range(nb_ite_MC)] for y in range(self.usage_time)])
+
+        self.fault_cause =np.zeros((self.usage_time, nb_ite_MC, nb_RU), dtype=np.uint8)
+        # replaced and maintained RUs of each step, the impacts are projected from them at the end
+        self.replacement_count=np.zeros((self.usage_time, nb_ite_MC, nb_RU), dtype=_count_dtype(dic))
+        self.maintenance_count=np.zeros((self.usage_time, nb_ite_MC, nb_RU), dtype=_count_dtype(dic))
+      
+        (row_r,col_r)=dic["Remplacement_matrix"].shape
+        remplacement=np.array([[[0 for y in range(col_r)] for z in range(row_r)] for i in range(nb_ite_MC)] , dtype='float')
+        remplacement_or=np.array([[0 for y in range(nb_RU)] for i in range(nb_ite_MC)] , dtype='float')
+
+        
+        (weibull_Efault, weibull_Rfault, weibull_Wfault,
+         prob_weibull_Efault, prob_weibull_Rfault, prob_weibull_Wfault) = self._weibull_tables(dic)
+
         wcdf_year=np.array([[0 for y in range(nb_ite_MC)] for y in range(nb_RU)], dtype='float').T
         
         for year in range(1,self.usage_time):
@@ -172,12 +593,11 @@ class STAIRCASE():
                 if year in dic["year_pre_set_fail"]:
                     indice_tuple=np.where(year==dic["year_pre_set_fail"])
                     indice = indice_tuple[0][0]
-                    self.fault_cause[year,0,dic["UR_set_fail"][indice]]=dic["typefault_pre_set_fail"][indice]
+                    self.fault_cause[year,0,dic["UR_set_fail"][indice]]=encode_fault_cause(dic["typefault_pre_set_fail"][indice])
                     remplacement[0,dic["UR_set_fail"][indice],:]=dic["Remplacement_matrix"].loc[dic["Remplacement_matrix"]["Fault"] == dic["typefault_pre_set_fail"][indice]].drop(["Fault"], axis=1).reset_index(drop=True).loc[dic["UR_set_fail"][indice]]
                 
             else:
                 #part maintenance
-                EI_maintenance=0
                 if dic["Maintenance"]=="True":
                     
                     # Mise à jour de la matrice remplacement et remise à zéro des composants lors de la maintenance
@@ -186,7 +606,7 @@ class STAIRCASE():
                 
                     # Remettre l'âge des composants à zéro (RU) pour ceux qui ont subi une maintenance
                     self.RU_age[year,:,:]=np.round((1-remplacement_or[:,:nb_RU]))*self.RU_age[year,:,:]
-                    EI_maintenance=self.EI_manufacturing.dot(remplacement_or.T).T
+                    self.maintenance_count[year,:,:]=remplacement_or[:,:nb_RU]
     
                     remplacement_or=remplacement_or*0
 
@@ -205,54 +625,548 @@ class STAIRCASE():
                 
                 # Find the type of the fault for each RU
                 Fault_E=np.where(random_fault_type[Fault] <= prob_weibull_Efault[self.RU_age[year,Fault[0],Fault[1]],Fault[1]])
-                self.fault_cause[year,Fault[0][Fault_E],Fault[1][Fault_E]]="Early"
+                self.fault_cause[year,Fault[0][Fault_E],Fault[1][Fault_E]]=EARLY
                 remplacement[Fault[0][Fault_E],Fault[1][Fault_E],:]=dic["Remplacement_matrix"].loc[Fault[1][Fault_E]]
                 
                 down=prob_weibull_Efault[self.RU_age[year,Fault[0],Fault[1]],Fault[1]]
                 up=down+prob_weibull_Rfault[age_component, Fault[1]]
                 Fault_R=np.where((random_fault_type[Fault] >down) & (random_fault_type[Fault] <=up))
-                self.fault_cause[year,Fault[0][Fault_R],Fault[1][Fault_R]]="Random"
+                self.fault_cause[year,Fault[0][Fault_R],Fault[1][Fault_R]]=RANDOM
                 remplacement[Fault[0][Fault_R],Fault[1][Fault_R],:]=dic["Remplacement_matrix"].loc[Fault[1][Fault_R]]
                 
                 down=up
                 Fault_W=np.where((random_fault_type[Fault] >down))
-                self.fault_cause[year,Fault[0][Fault_W],Fault[1][Fault_W]]="Wearout"
+                self.fault_cause[year,Fault[0][Fault_W],Fault[1][Fault_W]]=WEAROUT
                 remplacement[Fault[0][Fault_W],Fault[1][Fault_W],:]=dic["Remplacement_matrix"].loc[Fault[1][Fault_W]]
                 
                 #new random number for new component
-                random_fault_time[Fault]=[random.uniform(0, 1) for y in Fault[1]]
-                random_fault_type[Fault]=[random.uniform(0, 1) for y in Fault[1]] 
+                random_fault_time[Fault]=rng.random(len(Fault[1]))
+                random_fault_type[Fault]=rng.random(len(Fault[1]))
             
             #Remplacement vector (RV)
             remplacement_or=remplacement.sum(axis=1)
             # Limiter les valeurs de remplacement_or à un maximum de 1
             remplacement_or = np.clip(remplacement_or, 0, 1)
-            
-            
-            #Impact calculation
-            self.EI_total_manu[year,:,:]=self.EI_total_manu[year-1,:,:]+self.EI_manufacturing.dot(remplacement_or.T).T+EI_maintenance
-            self.EI_total_use[year,:,:]= self.EI_total_use[year-1,:,:]+self.EI_use_onestep_total
-            self.EI_total[year,:,:]= self.EI_total_use[year,:,:]+self.EI_total_manu[year,:,:]
-            self.EI_total_maintenance[year,:,:]=self.EI_total_maintenance[year-1,:,:]+EI_maintenance
+            self.replacement_count[year,:,:]=remplacement_or[:,:nb_RU]
             
             #Calcul de l'âge moyen pondéré par rapport à la matrice de rempacement, arrondis à l'entier le plus proche
             self.RU_age[year,:,:]=np.round((1-remplacement_or[:,:nb_RU]))*self.RU_age[year,:,:]
-            
-            self.number_of_fault[year,:,:]= self.number_of_fault[year-1,:,:]+remplacement_or[:,:nb_RU]
         
             #initialise
             wcdf_oldyear[Fault[0][Fault_W],Fault[1][Fault_W]]=0
             remplacement=remplacement*0
             remplacement_or=remplacement_or*0
 
+        #Impact calculation
+        self._project_impacts()
+
         
+    #%%
+    def _steps_vectorized(self, dic, rng):
+        """Batched version of the time loop of _creation_loop, yielding the state of every step from 1.
+
+        The failure age step of every RU is drawn once by inverting the combined Weibull CDF, so each time step only
+        compares integer ages with these failure ages for all Monte Carlo iterations at once. The replacement
+        matrix is applied as a matrix product instead of per fault pandas lookups.
+
+        Each step yields (year, RU ages, replacement vector RV*, maintenance vector, faults, fault causes) where the
+        vectors are (iteration, RU) arrays, the faults are the (iteration, RU) indices of np.nonzero and the causes
+        the matching array of fault cause codes (0 when no fault type could be identified).
+
+        With dic["importance_sampling"] above 0 the failure time draws are biased toward failure (see
+        _importance_uniforms) and self.weights holds the likelihood ratio of every iteration, the product of the
+        ratios of its draws; it is None otherwise.
+        """
+        nb_RU = dic["nb_RU"]
+        nb_ite_MC = dic["nb_ite_MC"]
+
+        (weibull_Efault, weibull_Rfault, weibull_Wfault,
+         prob_weibull_Efault, prob_weibull_Rfault, prob_weibull_Wfault) = self._weibull_tables(dic)
+        wcdf = 1 - (1 - weibull_Efault) * (1 - weibull_Rfault) * (1 - weibull_Wfault)
+        remplacement_matrix = dic["Remplacement_matrix"].to_numpy(dtype=float)
+        maintenance = np.asarray(dic["maintenance"], dtype=float)
+
+        iteration, RU = np.indices((nb_ite_MC, nb_RU)).reshape(2, -1)
+        random_fault_time, random_fault_type = _initial_uniforms(dic, rng, nb_ite_MC, nb_RU)
+        share = float(dic.get("importance_sampling", 0))
+        self.weights = None
+        if share > 0:
+            u, ratio = _importance_uniforms(wcdf, random_fault_time.ravel(), RU, share)
+            random_fault_time = u.reshape(nb_ite_MC, nb_RU)
+            self.weights = ratio.reshape(nb_ite_MC, nb_RU).prod(axis=1)
+        age_fault = _inverse_wcdf(wcdf, random_fault_time.ravel(), RU).reshape(nb_ite_MC, nb_RU)
+        age = np.zeros((nb_ite_MC, nb_RU), dtype=int)
+
+        for year in range(1, self.usage_time):
+            age_old = age
+            age = age_old + 1
+
+            maintenance_or = np.zeros((nb_ite_MC, nb_RU))
+            if dic["Maintenance"] == "True":
+                maintenance_or[age == maintenance] = 1
+                age[age == maintenance] = 0
+
+            # a RU fails when the age reached at the previous step is its failure age; an RU renewed at the previous
+            # step (age 0) cannot fail again straight away, as in _creation_loop
+            Fault = np.nonzero((age_old == age_fault) & ((age_fault > 0) | (year == 1)))
+            age_component = age[Fault]
+            type_draw = random_fault_type[Fault]
+            down = prob_weibull_Efault[age_component, Fault[1]]
+            up = down + prob_weibull_Rfault[age_component, Fault[1]]
+            cause = np.select([type_draw <= down, (type_draw > down) & (type_draw <= up), type_draw > up],
+                              [EARLY, RANDOM, WEAROUT], 0).astype(np.uint8)
+
+            faulty = np.zeros((nb_ite_MC, nb_RU))
+            faulty[Fault[0][cause > 0], Fault[1][cause > 0]] = 1
+            remplacement_or = np.clip(faulty @ remplacement_matrix, 0, 1)
+            age[np.round(1 - remplacement_or[:, :nb_RU]) == 0] = 0
+
+            yield year, age, remplacement_or, maintenance_or, Fault, cause
+
+            # new failure age and fault type for the new components
+            u = rng.random(len(Fault[1]))
+            if share > 0:
+                u, ratio = _importance_uniforms(wcdf, u, Fault[1], share)
+                np.multiply.at(self.weights, Fault[0], ratio)
+            age_fault[Fault] = _inverse_wcdf(wcdf, u, Fault[1])
+            random_fault_type[Fault] = rng.random(len(Fault[1]))
+
+    def _creation_vectorized(self, dic, rng=None):
+        rng = np.random.default_rng() if rng is None else rng
+        nb_RU = dic["nb_RU"]
+        nb_ite_MC = dic["nb_ite_MC"]
+        usage_time = self.usage_time
+
+        self.RU_age = np.zeros((usage_time, nb_ite_MC, nb_RU), dtype=int)
+        self.driver_age = np.zeros((usage_time, nb_ite_MC, nb_RU), dtype=int)
+        self.fault_cause = np.zeros((usage_time, nb_ite_MC, nb_RU), dtype=np.uint8)
+        self.replacement_count = np.zeros((usage_time, nb_ite_MC, nb_RU), dtype=_count_dtype(dic))
+        self.maintenance_count = np.zeros((usage_time, nb_ite_MC, nb_RU), dtype=_count_dtype(dic))
+
+        for year, age, remplacement_or, maintenance_or, Fault, cause in self._steps_vectorized(dic, rng):
+            self.fault_cause[year, Fault[0], Fault[1]] = cause
+            self.RU_age[year] = age
+            self.replacement_count[year] = remplacement_or[:, :nb_RU]
+            self.maintenance_count[year] = maintenance_or
+
+        self._project_impacts()
+
+    def _project_impacts(self):
+        """Impacts and cumulated faults of every iteration from the replacement and maintenance counts
+        (self.replacement_count and self.maintenance_count, (step, iteration, RU)).
+
+        The engines only record which RUs are replaced or maintained at each step. The counts are cumulated along the
+        steps (small integer arrays, one value per RU), and the cumulated impacts of all the steps and iterations are
+        then one matrix product of the stacked cumulated counts with the manufacturing impacts of the RUs.
+        """
+        nb_RU = self.replacement_count.shape[-1]
+        shape = self.replacement_count.shape[:2]
+        counts = np.cumsum(np.stack((self.replacement_count, self.maintenance_count)), axis=1, dtype=float)
+        self.number_of_fault = counts[0].astype(int)
+        EI_replacement, self.EI_total_maintenance = (counts.reshape(-1, nb_RU) @ self.EI_manufacturing.T).reshape(
+            (2,) + shape + (-1,))
+        del counts
+        self.EI_total_manu = EI_replacement
+        self.EI_total_manu += self.EI_manufacturing_total
+        self.EI_total_manu += self.EI_total_maintenance
+        # use phase does not depend on faults: same cumulative sum for every iteration
+        EI_use = self._EI_use_cumulative()[:, np.newaxis, :]
+        self.EI_total_use = np.empty_like(self.EI_total_manu)
+        self.EI_total_use[:] = EI_use
+        self.EI_total = self.EI_total_manu + EI_use
+
+    def reproject(self, dic, EI_manufacturing=None, EI_use=None):
+        """Impacts of the same sampled faults with other impact factors or use phase parameters.
+
+        EI_manufacturing and EI_use (impact category, RU) replace the LCA results of the staircase when given and
+        dic["num_hourPerYear"] is read again; the faults, replacements and maintenances are not sampled again, so the
+        new impacts only cost a matrix product over the stored counts.
+        """
+        if EI_manufacturing is not None:
+            self.EI_manufacturing = np.asarray(EI_manufacturing, dtype=float)
+            self.EI_manufacturing_total = self.EI_manufacturing.sum(axis=1)
+        EI_use = self.inputs[1] if EI_use is None else np.asarray(EI_use, dtype=float)
+        self.inputs = (self.EI_manufacturing, EI_use, self.inputs[2])
+        self.EI_use_onestep = EI_use * dic["num_hourPerYear"] / dic["step"]
+        self.EI_use_onestep_total = self.EI_use_onestep.sum(axis=1)
+        self._project_impacts()
+        return self
+
+    def _fault_sample_path(self, dic):
+        """File of the faults sampled for the inputs they depend on: the fault table, replacement matrix, maintenance
+        ages, fault and maintenance options, time grid, number of iterations, engine and seed. The impact factors and
+        the annual usage time are not part of it."""
+        remplacement_matrix = dic["Remplacement_matrix"]
+        remplacement_matrix = remplacement_matrix.drop(columns=["Fault"], errors="ignore") \
+            if isinstance(remplacement_matrix, pd.DataFrame) else pd.DataFrame(remplacement_matrix)
+        key = {
+            "faults": np.asarray(self.inputs[2], dtype=float).tolist(),
+            "Remplacement_matrix": remplacement_matrix.to_numpy(dtype=float).tolist(),
+            "maintenance": np.asarray(dic["maintenance"], dtype=float).tolist() if dic["Maintenance"] == "True" else None,
+            "batch_size": int(dic.get("batch_size", 1000)) if int(dic.get("workers", 0)) > 0 else None,
+            "seed": None if dic.get("seed") is None else int(dic["seed"]),
+        }
+        for name in ["service_life", "step", "nb_ite_MC"]:
+            key[name] = int(dic[name])
+        for name in ["Early_failure", "Random_failure", "Wearout_failure", "Maintenance"]:
+            key[name] = str(dic[name])
+        key["engine"] = dic.get("engine", "Loop")
+        key["sampling"] = dic.get("sampling", "Random")
+        key["importance_sampling"] = float(dic.get("importance_sampling", 0))
+        digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()[:32]
+        return os.path.join(dic["LCA_path"], "fault_samples", digest + ".npz")
+
+    def save_fault_samples(self, path):
+        """Write the sampled replacement and maintenance counts, RU ages, fault causes and importance sampling weights
+        to path (.npz)."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        weights = {} if self.weights is None else {"weights": self.weights}
+        with open(path + ".tmp", "wb") as f:
+            np.savez_compressed(f, replacement_count=self.replacement_count, maintenance_count=self.maintenance_count,
+                                RU_age=self.RU_age, fault_cause=self.fault_cause, seed=np.array(str(self.seed)), **weights)
+        os.replace(path + ".tmp", path)
+
+    def load_fault_samples(self, path):
+        """Read the samples written by save_fault_samples and calculate their impacts with the current LCA results."""
+        with np.load(path) as samples:
+            self.replacement_count = samples["replacement_count"]
+            self.maintenance_count = samples["maintenance_count"]
+            self.RU_age = samples["RU_age"]
+            self.fault_cause = samples["fault_cause"]
+            self.weights = samples["weights"] if "weights" in samples.files else None
+            seed = str(samples["seed"])
+        self.seed = None if seed == "None" else int(seed)
+        self.driver_age = np.zeros_like(self.RU_age)
+        self._project_impacts()
+
+    def _EI_use_cumulative(self):
+        """Use phase impact accumulated at each step, (step, impact category)."""
+        return np.arange(self.usage_time)[:, np.newaxis] * self.EI_use_onestep_total
+
+    #%%
+    def _creation_streaming(self, dic, rng=None, offset=0, nb_ite_total=None):
+        """Monte Carlo staircase keeping only running statistics (self.statistics) instead of the trajectories.
+
+        The iterations are simulated by batches of dic["batch_size"]. With the Vectorized engine only the current step
+        of a batch is in memory; the other engines simulate a batch at a time. Full trajectories are written to .npy
+        files in dic["LCA_path"]/trajectories only when dic["save_trajectories"] is "True"; a shard of a parallel run
+        writes its iterations from offset into the existing files of nb_ite_total iterations.
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        nb_RU = dic["nb_RU"]
+        nb_ite_MC = dic["nb_ite_MC"]
+        n_EI = len(self.EI_manufacturing_total)
+        batch_size = int(dic.get("batch_size", 1000))
+        self.statistics = StreamingAccumulator(self.usage_time, nb_RU, n_EI, end_of_life_step(dic))
+
+        writer = None
+        if dic.get("save_trajectories", "False") == "True":
+            mode = "w+" if nb_ite_total is None else "r+"
+            writer = TrajectoryWriter(*self._trajectory_layout(dic, nb_ite_total), mode=mode)
+
+        for start in range(0, nb_ite_MC, batch_size):
+            batch_dic = dict(dic, nb_ite_MC=min(batch_size, nb_ite_MC - start))
+            for year, EI, number_of_fault, RU_age, fault_cause in self._batch_steps(batch_dic, rng):
+                self.statistics.update(year, EI, number_of_fault, RU_age, fault_cause)
+                if writer is not None:
+                    for name, values in list(EI.items()) + [("number_of_fault", number_of_fault), ("RU_age", RU_age),
+                                                            ("fault_cause", fault_cause)]:
+                        writer.write(name, year, offset + start, values)
+        if writer is not None:
+            writer.close()
+
+        self.EI_total = self.EI_total_manu = self.EI_total_use = self.EI_total_maintenance = None
+        self.RU_age = self.driver_age = self.number_of_fault = self.fault_cause = None
+
+    def _creation_memmap(self, dic, rng=None, offset=0, nb_ite_total=None):
+        """Monte Carlo staircase whose trajectories are numpy.memmap arrays instead of in-memory arrays.
+
+        The iterations are simulated by batches of dic["batch_size"] as in _creation_streaming and every step of a
+        batch is written to the .npy files of dic["LCA_path"]/trajectories, which are then mapped read-only, so the
+        size of the trajectories is bounded by the disk rather than the memory. A shard of a parallel run writes its
+        iterations from offset into the existing files of nb_ite_total iterations and maps nothing.
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        nb_ite_MC = dic["nb_ite_MC"]
+        batch_size = int(dic.get("batch_size", 1000))
+        mode = "w+" if nb_ite_total is None else "r+"
+        writer = TrajectoryWriter(*self._trajectory_layout(dic, nb_ite_total), mode=mode)
+        for start in range(0, nb_ite_MC, batch_size):
+            batch_dic = dict(dic, nb_ite_MC=min(batch_size, nb_ite_MC - start))
+            for year, EI, number_of_fault, RU_age, fault_cause in self._batch_steps(batch_dic, rng):
+                for name, values in list(EI.items()) + [("number_of_fault", number_of_fault), ("RU_age", RU_age),
+                                                        ("fault_cause", fault_cause)]:
+                    writer.write(name, year, offset + start, values)
+        writer.close()
+        self.statistics = None
+        if nb_ite_total is None:
+            self._open_trajectories(dic)
+
+    def _open_trajectories(self, dic):
+        """Map the trajectory files read-only as the outputs of the staircase."""
+        path, shapes, _ = self._trajectory_layout(dic)
+        for name in shapes:
+            setattr(self, name, np.load(os.path.join(path, name + ".npy"), mmap_mode="r"))
+        self.driver_age = None
+
+    def _trajectory_layout(self, dic, nb_ite_MC=None):
+        """Folder, shapes and dtypes of the trajectory files written with dic["save_trajectories"]."""
+        nb_ite_MC = dic["nb_ite_MC"] if nb_ite_MC is None else nb_ite_MC
+        nb_RU = dic["nb_RU"]
+        shapes = {name: (self.usage_time, nb_ite_MC, len(self.EI_manufacturing_total)) for name in EI_NAMES}
+        shapes.update({name: (self.usage_time, nb_ite_MC, nb_RU) for name in ["number_of_fault", "RU_age", "fault_cause"]})
+        dtypes = {name: float for name in EI_NAMES}
+        dtypes.update({"number_of_fault": int, "RU_age": int, "fault_cause": np.uint8})
+        return os.path.join(dic["LCA_path"], "trajectories"), shapes, dtypes
+
+    def _batch_steps(self, dic, rng):
+        """Outputs of one batch of iterations, step by step: (year, EI outputs by name, number_of_fault, RU_age,
+        fault_cause)."""
+        nb_ite_MC = dic["nb_ite_MC"]
+        nb_RU = dic["nb_RU"]
+        engine = dic.get("engine", "Loop")
+        if engine != "Vectorized":
+            if engine == "Event":
+                self._creation_event(dic, rng)
+            else:
+                self._creation_loop(dic, rng)
+            for year in range(self.usage_time):
+                EI = {name: getattr(self, name)[year] for name in EI_NAMES}
+                yield year, EI, self.number_of_fault[year], self.RU_age[year], self.fault_cause[year]
+            return
+
+        EI_use = self._EI_use_cumulative()
+        EI_total_manu = np.tile(self.EI_manufacturing_total, (nb_ite_MC, 1))
+        EI_total_maintenance = np.zeros_like(EI_total_manu)
+        number_of_fault = np.zeros((nb_ite_MC, nb_RU), dtype=int)
+        age = np.zeros((nb_ite_MC, nb_RU), dtype=int)
+        fault_cause = np.zeros((nb_ite_MC, nb_RU), dtype=np.uint8)
+        year = 0
+        steps = self._steps_vectorized(dic, rng)
+        while True:
+            EI_total_use = np.broadcast_to(EI_use[year], EI_total_manu.shape)
+            EI = {"EI_total": EI_total_use + EI_total_manu, "EI_total_manu": EI_total_manu,
+                  "EI_total_use": EI_total_use, "EI_total_maintenance": EI_total_maintenance}
+            yield year, EI, number_of_fault, age, fault_cause
+            try:
+                year, age, remplacement_or, maintenance_or, Fault, cause = next(steps)
+            except StopIteration:
+                return
+            EI_maintenance = maintenance_or @ self.EI_manufacturing.T
+            EI_total_manu = EI_total_manu + remplacement_or @ self.EI_manufacturing.T + EI_maintenance
+            EI_total_maintenance = EI_total_maintenance + EI_maintenance
+            number_of_fault = number_of_fault + remplacement_or[:, :nb_RU].astype(int)
+            fault_cause = np.zeros((nb_ite_MC, nb_RU), dtype=np.uint8)
+            fault_cause[Fault] = cause
+
+    #%%
+    def _creation_event(self, dic, rng=None):
+        """Discrete-event version of _creation_loop.
+
+        Each RU gets its next failure step drawn from the Weibull law conditioned on its current age, and the next
+        faults of all RUs are kept in a priority queue, so the simulation only visits the steps of each iteration where
+        a fault fires: its cost grows with the number of faults rather than with the number of time steps. Events of
+        RUs replaced in the meantime are invalidated with a per RU version counter.
+
+        Maintenance is not queued: between two replacements of a RU it happens every maintenance age steps, and it
+        renews the age without drawing a new failure age, so a RU fails only if its failure step comes no later than
+        its next maintenance. The maintenances of a RU are generated when the RU is touched by a fault, and those after
+        its last replacement in one vectorized pass at the end of the run.
+
+        The outputs are the dense (step, iteration, RU) arrays of the other engines, filled from the event lists by
+        _apply_events with vectorized operations; their size, not the simulation, grows with the number of steps.
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        nb_RU = dic["nb_RU"]
+        nb_ite_MC = dic["nb_ite_MC"]
+        usage_time = self.usage_time
+
+        (weibull_Efault, weibull_Rfault, weibull_Wfault,
+         prob_weibull_Efault, prob_weibull_Rfault, prob_weibull_Wfault) = self._weibull_tables(dic)
+        wcdf = 1 - (1 - weibull_Efault) * (1 - weibull_Rfault) * (1 - weibull_Wfault)
+        remplacement_matrix = dic["Remplacement_matrix"].to_numpy(dtype=float)
+        # maintenance happens when the age in steps equals the maintenance age, so only whole positive ages can fire
+        maintenance = np.asarray(dic["maintenance"], dtype=float)
+        maintenance_age = np.zeros(nb_RU, dtype=int)
+        if dic["Maintenance"] == "True":
+            whole = np.isfinite(maintenance) & (maintenance >= 1) & (maintenance == np.round(maintenance))
+            maintenance_age[whole] = maintenance[whole]
+
+        birth = np.zeros((nb_ite_MC, nb_RU), dtype=int)  # step of the last renewal (maintenance or replacement)
+        version = np.zeros((nb_ite_MC, nb_RU), dtype=int)
+        iteration, RU = np.indices((nb_ite_MC, nb_RU)).reshape(2, -1)
+        random_fault_time, random_fault_type = _initial_uniforms(dic, rng, nb_ite_MC, nb_RU)
+        age_fault = _next_failure_age(wcdf, np.zeros_like(RU), random_fault_time.ravel(), RU)
+        age_fault = age_fault.reshape(nb_ite_MC, nb_RU)
+
+        def fault_step(it, ru):
+            # the fault is detected the step after the RU reaches its failure age, unless a maintenance renews the RU
+            # first (a maintenance and a fault of the same step both happen); a renewed RU cannot fail at age 0
+            age = age_fault[it, ru]
+            if (age > 0 or birth[it, ru] == 0) and (maintenance_age[ru] == 0 or age + 1 <= maintenance_age[ru]):
+                step = birth[it, ru] + age + 1
+                if step < usage_time:
+                    return step
+            return None
+
+        # maintenances as (step, iteration, RU) indices, applied before the faults of the same step
+        maintained = ([], [], [])
+
+        def maintain(it, ru, step):
+            # maintenances of the RU since its last renewal, up to step included
+            if maintenance_age[ru]:
+                steps = range(birth[it, ru] + maintenance_age[ru], step + 1, maintenance_age[ru])
+                if steps:
+                    maintained[0].extend(steps)
+                    maintained[1].extend([it] * len(steps))
+                    maintained[2].extend([ru] * len(steps))
+                    birth[it, ru] = steps[-1]
+
+        first_fault = [(fault_step(it, ru), it, ru) for it, ru in zip(iteration.tolist(), RU.tolist())]
+        queue = [(step, it, ru, 0) for step, it, ru in first_fault if step is not None]
+        heapq.heapify(queue)
+
+        # events applied to the dense outputs once the simulation is over
+        remplacement_events, cause_events = [], []
+        while queue:
+            step, it = queue[0][:2]
+            failed = []
+            while queue and queue[0][:2] == (step, it):
+                _, _, ru, event_version = heapq.heappop(queue)
+                if event_version == version[it, ru]:
+                    failed.append(ru)
+            if not failed:
+                continue
+
+            faulty = np.zeros(nb_RU)
+            for ru in failed:
+                maintain(it, ru, step)
+                age_component = step - birth[it, ru]
+                type_draw = random_fault_type[it, ru]
+                down = prob_weibull_Efault[age_component, ru]
+                up = down + prob_weibull_Rfault[age_component, ru]
+                # NaN shares (no fault type enabled) give no cause and no replacement, as in _creation_loop
+                cause = EARLY if type_draw <= down else RANDOM if type_draw <= up else \
+                    WEAROUT if type_draw > up else 0
+                if cause:
+                    cause_events.append((step, it, ru, cause))
+                    faulty[ru] = 1
+            remplacement_or = np.clip(faulty @ remplacement_matrix, 0, 1)
+            remplacement_events.append((step, it, remplacement_or))
+            replaced = np.flatnonzero(np.round(1 - remplacement_or[:nb_RU]) == 0).tolist()
+            for ru in replaced:
+                maintain(it, ru, step)
+            birth[it, replaced] = step
+
+            # new failure age and fault type for the new components
+            for ru, u in zip(failed, rng.random(len(failed))):
+                survived = wcdf[step - birth[it, ru], ru]
+                age_fault[it, ru] = np.searchsorted(wcdf[:, ru], survived + u * (1 - survived), side="left")
+                random_fault_type[it, ru] = rng.random()
+
+            for ru in replaced:
+                version[it, ru] += 1
+            for ru in sorted(set(failed) | set(replaced)):
+                step_next = fault_step(it, ru)
+                if step_next is not None:
+                    heapq.heappush(queue, (step_next, it, ru, version[it, ru]))
+
+        # maintenances after the last replacement of every RU, all the iterations at once
+        period = np.broadcast_to(maintenance_age, birth.shape)
+        steps = birth + period
+        while (period > 0).any():
+            due = (period > 0) & (steps < usage_time)
+            if not due.any():
+                break
+            it, ru = np.nonzero(due)
+            maintained[0].extend(steps[due].tolist())
+            maintained[1].extend(it.tolist())
+            maintained[2].extend(ru.tolist())
+            steps = steps + period
+
+        self._apply_events(dic, remplacement_events, maintained, cause_events)
+
+    def _apply_events(self, dic, remplacement_events, maintained, cause_events):
+        """Dense (step, iteration, RU) outputs from the list of replacement and fault events and the (step, iteration,
+        RU) indices of the maintenances."""
+        nb_RU = dic["nb_RU"]
+        shape = (self.usage_time, dic["nb_ite_MC"])
+        remplacement = np.zeros(shape + (nb_RU,), dtype=_count_dtype(dic))
+        maintenance = np.zeros(shape + (nb_RU,), dtype=_count_dtype(dic))
+        if remplacement_events:
+            step, it, vector = zip(*remplacement_events)
+            remplacement[list(step), list(it)] = np.array(vector)[:, :nb_RU]
+        maintenance[tuple(np.asarray(index, dtype=int) for index in maintained)] = 1
+
+        # dense as with the other engines, _batch_steps reads it step by step; the Events format is applied once the
+        # run is over (_fault_cause_format, _run_shard)
+        self.fault_cause = fault_cause_dense(np.array(cause_events, dtype=FAULT_EVENT_DTYPE), shape + (nb_RU,))
+
+        self.replacement_count = remplacement
+        self.maintenance_count = maintenance
+        self._project_impacts()
+
+        # age in steps since the last renewal (maintenance or replacement)
+        steps = np.arange(self.usage_time)[:, np.newaxis, np.newaxis]
+        renewal = (maintenance > 0) | (np.round(1 - remplacement) == 0)
+        last_renewal = np.maximum.accumulate(np.where(renewal, steps, 0), axis=0)
+        self.RU_age = steps - last_renewal
+        self.driver_age = np.zeros_like(self.RU_age)
+
+    def save_store(self, dic, path=None):
+        """Write the trajectories and the fault causes to a result store (see result_store), by default
+        "Results PELCA/<staircase result filename>.pelca". Returns its path."""
+        if path is None:
+            path = os.path.join(dic["LCA_path"], os.path.splitext(dic["filename_result_staircase"])[0] + ".pelca")
+        arrays = {name: getattr(self, name) for name in EI_NAMES + ("number_of_fault", "RU_age", "fault_cause")}
+        RU_names = list(dic.get("RU_activities") or range(dic["nb_RU"]))
+        columns = {name: dic["EI_name"] for name in EI_NAMES}
+        columns.update(number_of_fault=RU_names, RU_age=RU_names, fault_cause=RU_names)
+        metadata = {
+            "service_life": int(dic["service_life"]),
+            "step": int(dic["step"]),
+            "num_hourPerYear": float(dic["num_hourPerYear"]),
+            "nb_ite_MC": int(dic["nb_ite_MC"]),
+            "engine": dic.get("engine", "Loop"),
+            "seed": None if self.seed is None else int(self.seed),
+            "EI_name": list(dic["EI_name"]),
+            "LCIA_unit": list(dic["LCIA_unit"]),
+            "RU": [str(name) for name in RU_names],
+            "fault_cause_labels": FAULT_CAUSES.tolist(),
+        }
+        write_store(path, arrays, metadata, columns)
+        return path
+
+    def standard_error(self, dic, step=None):
+        """Standard error of the mean total impact of each impact category at a step (by default the one of the
+        result table), for the sampling strategy of the run. The Statistics output keeps no trajectories, its standard
+        error is the one of independent draws, an upper bound for the stratified samplings. With importance sampling
+        it is the standard error of the weighted mean."""
+        step = end_of_life_step(dic) if step is None else step
+        if self.weights is not None:
+            values = np.asarray(self.EI_total[step], dtype=float)
+            mean = np.average(values, axis=0, weights=self.weights)
+            return np.sqrt(np.sum(self.weights[:, np.newaxis] ** 2 * (values - mean) ** 2, axis=0)) / np.sum(self.weights)
+        if self.statistics is not None:
+            if step != self.statistics.final_step:
+                return self.statistics.std(step) / np.sqrt(self.statistics.count)
+            return self.statistics.final_std("EI_total") / np.sqrt(self.statistics.count)
+        return sampling_standard_error(self.EI_total[step], dic.get("sampling", "Random"))
+
     def get_variables(self, dic):
         
         index_labels = np.array(['Manufacture', 'Use', 'Replacement', 'Maintenance'])
         manufacturing = self.EI_manufacturing_total
-        use=np.mean(self.EI_total_use[dic["service_life"]-1,:,:],axis=0)
-        maintenance=np.mean(self.EI_total_maintenance[dic["service_life"]-1,:,:],axis=0)
-        replacement=np.mean(self.EI_total_manu[dic["service_life"]-1,:,:],axis=0)-manufacturing-maintenance
+        final = end_of_life_step(dic)
+        if self.statistics is not None:
+            use=self.statistics.mean("EI_total_use")[final]
+            maintenance=self.statistics.mean("EI_total_maintenance")[final]
+            replacement=self.statistics.mean("EI_total_manu")[final]-manufacturing-maintenance
+        else:
+            # weighted by the likelihood ratios of an importance sampling run (plain means otherwise)
+            use=np.average(self.EI_total_use[final,:,:],axis=0,weights=self.weights)
+            maintenance=np.average(self.EI_total_maintenance[final,:,:],axis=0,weights=self.weights)
+            replacement=np.average(self.EI_total_manu[final,:,:],axis=0,weights=self.weights)-manufacturing-maintenance
 
         # Créer un DataFrame avec les données
         data = {
@@ -261,7 +1175,8 @@ class STAIRCASE():
             'Manufacture': manufacturing,
             'Use': use,
             'Replacement': replacement,
-            'Maintenance': maintenance
+            'Maintenance': maintenance,
+            'Standard error': self.standard_error(dic)
         }
         
         df = pd.DataFrame(data)
@@ -270,9 +1185,46 @@ class STAIRCASE():
         excel_path = os.path.join(dic["path_result_EI"], dic["directory"], dic["filename_result_staircase"])
         
         # Écrire le DataFrame dans un fichier Excel
-        df.to_excel(excel_path, index=False)
+        if self.convergence is None:
+            df.to_excel(excel_path, index=False)
+        else:
+            # trace of an adaptive run, after the result table
+            with pd.ExcelWriter(excel_path) as writer:
+                df.to_excel(writer, index=False)
+                self.convergence.to_excel(writer, sheet_name="Convergence", index=False)
         
         print(f"The data were written to the Excel file: : {excel_path}")
 
+        if dic.get("result_store", "False") == "True":
+            if self.EI_total is None:
+                print("Result store not written: the Statistics output keeps no trajectories.")
+            else:
+                print(f"The trajectories were written to the result store: {self.save_store(dic)}")
+
         return self.EI_total, self.EI_total_manu, self.EI_total_use, self.usage_time, self.number_of_fault, self.wcdf_total, self.fault_cause, self.RU_age, self.EI_total_maintenance      
-           
\ No newline at end of file
+           
+
+
+def _run_shard(dic, start, nb_ite_total, rng, EI_manufacturing, EI_use, beta_sigma_ERW):
+    """One shard of STAIRCASE._creation_parallel, run in a worker process: the running statistics with Statistics
+    output, nothing with Memory-mapped output (written to the trajectory files), else the trajectories by name."""
+    staircase = STAIRCASE.__new__(STAIRCASE)
+    staircase._setup(dic, EI_manufacturing, EI_use, beta_sigma_ERW)
+    engine = dic.get("engine", "Loop")
+    if dic.get("output", "Trajectories") == "Statistics":
+        staircase._creation_streaming(dic, rng, offset=start, nb_ite_total=nb_ite_total)
+        return staircase.statistics
+    if dic.get("output", "Trajectories") == "Memory-mapped":
+        staircase._creation_memmap(dic, rng, offset=start, nb_ite_total=nb_ite_total)
+        return None
+    if engine == "Vectorized":
+        staircase._creation_vectorized(dic, rng)
+    elif engine == "Event":
+        staircase._creation_event(dic, rng)
+    else:
+        staircase._creation_loop(dic, rng)
+    if dic.get("fault_cause_format", "Dense") == "Events" and not staircase.fault_cause.dtype.names:
+        staircase.fault_cause = fault_cause_events(staircase.fault_cause)
+    return {name: getattr(staircase, name)
+            for name in EI_NAMES + ("number_of_fault", "RU_age", "fault_cause", "replacement_count", "maintenance_count",
+                                    "weights")}
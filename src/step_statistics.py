@@ -0,0 +1,126 @@
+"""PELCA (Power Electronics Life Cycle Assessment) is an open-source project aimed at assessing the environmental impact over the life cycle of modular and diagnosable power electronics systems. The integration of modularity and diagnosability aligns with circular economy principles, promoting practices such as repair and reuse. This project provides a tool to calculate the environmental impacts associated with the manufacturing, usage, and replacement of power electronics products.
+Copyright (C) Mitsubishi Electric R&D Centre Europe and SATIE 2024, author Briac Baudais baudaisbriac@gmail.com
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU Lesser General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with this program.  If not, see https://www.gnu.org/licenses/lgpl-3.0.html"""
+
+
+"""
+Per step statistics of the total impact for the staircase plots.
+
+The deciles, mean, minimum and maximum of every (step, impact category) are computed in one vectorized pass over the
+iterations of the trajectories, a block of steps at a time so that memory-mapped trajectories are never loaded whole,
+with the likelihood-ratio weights of an importance sampling run, or read from the quantile sketches of a
+streaming.StreamingAccumulator. A StepStatistics is computed once per run and shared by all the figures.
+"""
+
+import numpy as np
+
+# deciles drawn by plotting._decile, 10 % to 90 %
+PERCENT = np.linspace(0, 90, 10)[1:]
+# values of a block of steps sorted at once (about 32 MB of floats)
+BLOCK_SIZE = 1 << 22
+
+
+def weighted_percentile(values, percent, weights=None):
+    """Percentiles over the first axis of values, as np.percentile, with iterations weighted by weights (the
+    likelihood ratios of an importance sampling run).
+
+    The weighted percentiles interpolate the values sorted along the first axis at the midpoints of their cumulated
+    weights, for all the other axes at once. Returns an array of shape (len(percent),) + values.shape[1:].
+    """
+    values = np.asarray(values, dtype=float)
+    percent = np.atleast_1d(percent)
+    if weights is None:
+        return np.percentile(values, percent, axis=0)
+    order = np.argsort(np.moveaxis(values, 0, -1), axis=-1)
+    sorted_values = np.take_along_axis(np.moveaxis(values, 0, -1), order, axis=-1)
+    return np.moveaxis(_sorted_percentile(sorted_values, np.asarray(weights, dtype=float)[order], percent), -1, 0)
+
+
+def _linear_percentile(sorted_values, percent):
+    """Percentiles of values sorted along the last axis, with the linear interpolation of np.percentile, as an array
+    of shape values.shape[:-1] + (len(percent),)."""
+    n = sorted_values.shape[-1]
+    position = np.asarray(percent) / 100 * (n - 1)
+    below = np.floor(position).astype(int)
+    above = np.minimum(below + 1, n - 1)
+    fraction = position - below
+    return sorted_values[..., below] * (1 - fraction) + sorted_values[..., above] * fraction
+
+
+def _sorted_percentile(sorted_values, sorted_weights, percent):
+    """weighted_percentile of values sorted along the last axis, with their weights in the same order, as an array of
+    shape values.shape[:-1] + (len(percent),)."""
+    shape, n = sorted_values.shape[:-1], sorted_values.shape[-1]
+    if n == 1:
+        return np.repeat(sorted_values, len(percent), axis=-1)
+    cumulated = np.cumsum(sorted_weights, axis=-1)
+    position = (100 * (cumulated - sorted_weights / 2) / cumulated[..., -1:]).reshape(-1, n)
+    sorted_values = sorted_values.reshape(-1, n)
+    # the midpoints of all the columns searched at once: shifted by 200 per column they stay sorted once flattened
+    offset = 200 * np.arange(len(position))[:, np.newaxis]
+    above = np.searchsorted((position + offset).ravel(), (np.asarray(percent) + offset).ravel())
+    above = np.clip(above.reshape(len(position), -1) - offset // 200 * n, 1, n - 1)
+    below = above - 1
+    p0, p1 = np.take_along_axis(position, below, axis=1), np.take_along_axis(position, above, axis=1)
+    v0, v1 = np.take_along_axis(sorted_values, below, axis=1), np.take_along_axis(sorted_values, above, axis=1)
+    # the end values outside of the midpoints, as np.interp
+    fraction = np.clip((np.asarray(percent) - p0) / np.where(p1 > p0, p1 - p0, 1), 0, 1)
+    return (v0 + fraction * (v1 - v0)).reshape(shape + (len(percent),))
+
+
+class StepStatistics:
+    """Percentiles (step, percent, impact), mean, minimum and maximum (step, impact) of the total impact."""
+
+    def __init__(self, percentile, mean, minimum, maximum, percent=PERCENT):
+        self.percent = np.asarray(percent)
+        self.percentile = percentile
+        self.mean = mean
+        self.min = minimum
+        self.max = maximum
+
+    @classmethod
+    def from_trajectories(cls, values, weights=None, percent=PERCENT, block_size=BLOCK_SIZE):
+        """Statistics of (step, iteration, impact) trajectories, weighted by the likelihood ratio of every iteration
+        with importance sampling. The steps are read block_size values at a time."""
+        n_step, n_ite, n_EI = values.shape
+        percent = np.asarray(percent)
+        percentile = np.empty((n_step, len(percent), n_EI))
+        mean, minimum, maximum = np.empty((3, n_step, n_EI))
+        block_steps = max(1, block_size // max(n_ite * n_EI, 1))
+        for start in range(0, n_step, block_steps):
+            block = np.asarray(values[start : start + block_steps], dtype=float)
+            steps = slice(start, start + len(block))
+            # one sort of the iterations gives the extremes and all the percentiles (faster than the partitions of
+            # np.percentile for several percentiles), iterations last so that each sorted row is contiguous
+            by_EI = np.moveaxis(block, 1, -1)
+            if weights is None:
+                sorted_values = np.sort(by_EI, axis=-1)
+                result = _linear_percentile(sorted_values, percent)
+                mean[steps] = block.mean(axis=1)
+            else:
+                order = np.argsort(by_EI, axis=-1)
+                sorted_values = np.take_along_axis(by_EI, order, axis=-1)
+                result = _sorted_percentile(sorted_values, np.asarray(weights, dtype=float)[order], percent)
+                mean[steps] = np.average(block, axis=1, weights=weights)
+            percentile[steps] = np.moveaxis(result, -1, 1)
+            minimum[steps], maximum[steps] = sorted_values[..., 0], sorted_values[..., -1]
+        return cls(percentile, mean, minimum, maximum, percent)
+
+    @classmethod
+    def from_accumulator(cls, statistics, percent=PERCENT):
+        """Statistics of a run that kept no trajectories, from a streaming.StreamingAccumulator: percentiles of its
+        quantile sketches, exact mean, minimum and maximum."""
+        return cls(statistics.percentile(percent), statistics.mean("EI_total"), statistics.min, statistics.max, percent)
+
+    @property
+    def median(self):
+        return self.percentile[:, int(len(self.percent) / 2)]
+
+    def select(self, EI):
+        """(percentiles, mean, minimum, maximum) per step of one impact category, as drawn by plotting._decile."""
+        return self.percentile[:, :, EI], self.mean[:, EI], self.min[:, EI], self.max[:, EI]
@@ -0,0 +1,279 @@
+"""PELCA (Power Electronics Life Cycle Assessment) is an open-source project aimed at assessing the environmental impact over the life cycle of modular and diagnosable power electronics systems. The integration of modularity and diagnosability aligns with circular economy principles, promoting practices such as repair and reuse. This project provides a tool to calculate the environmental impacts associated with the manufacturing, usage, and replacement of power electronics products.
+Copyright (C) Mitsubishi Electric R&D Centre Europe and SATIE 2024, author Briac Baudais baudaisbriac@gmail.com
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU Lesser General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with this program.  If not, see https://www.gnu.org/licenses/lgpl-3.0.html"""
+
+"""
+Running statistics of the staircase Monte Carlo, so that the (step, iteration, ...) trajectories do not have to be
+kept in memory.
+"""
+
+import os
+
+import numpy as np
+
+FAULT_NAMES = ("Early", "Random", "Wearout")
+EI_NAMES = ("EI_total", "EI_total_manu", "EI_total_use", "EI_total_maintenance")
+
+
+def end_of_life_step(dic):
+    """Index of the last step of the service life (service_life years of step steps), the one reported by the result
+    table, the plots, the adaptive stop, the sweeps and the sensitivity analysis."""
+    return dic["service_life"] * dic["step"] - 1
+
+
+class QuantileSketch:
+    """Relative error quantile sketch (DDSketch), one independent sketch per column.
+
+    Values are counted in logarithmic buckets of ratio gamma = (1 + a) / (1 - a), so every quantile is returned with a
+    relative error below the accuracy a whatever the number of values. Sketches with the same accuracy merge exactly by
+    adding their bucket counts.
+    """
+
+    def __init__(self, n_columns, relative_accuracy=0.01):
+        self.n_columns = n_columns
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.count = 0
+        self.zero = np.zeros(n_columns, dtype=np.int64)
+        self.min = np.full(n_columns, np.inf)
+        self.max = np.full(n_columns, -np.inf)
+        # [key of the first bucket, bucket counts] of each column, for the positive and the negative values
+        self.positive = [[0, np.zeros(0, dtype=np.int64)] for _ in range(n_columns)]
+        self.negative = [[0, np.zeros(0, dtype=np.int64)] for _ in range(n_columns)]
+
+    def _key(self, values):
+        return np.ceil(np.log(values) / np.log(self.gamma)).astype(np.int64)
+
+    def _value(self, key):
+        return 2 * self.gamma**key / (self.gamma + 1)
+
+    @staticmethod
+    def _add_to_store(store, offset, counts):
+        if not len(counts):
+            return
+        store_offset, store_counts = store
+        if not len(store_counts):
+            store[0], store[1] = offset, counts.copy()
+            return
+        start = min(store_offset, offset)
+        end = max(store_offset + len(store_counts), offset + len(counts))
+        if start != store_offset or end != store_offset + len(store_counts):
+            grown = np.zeros(end - start, dtype=np.int64)
+            grown[store_offset - start : store_offset - start + len(store_counts)] = store_counts
+            store_offset, store_counts = start, grown
+        store_counts[offset - store_offset : offset - store_offset + len(counts)] += counts
+        store[0], store[1] = store_offset, store_counts
+
+    def _add_keys(self, store, keys):
+        if len(keys):
+            offset = keys.min()
+            self._add_to_store(store, offset, np.bincount(keys - offset))
+
+    def add(self, values):
+        """Add a (n, n_columns) array of values."""
+        values = np.asarray(values, dtype=float).reshape(-1, self.n_columns)
+        if not len(values):
+            return
+        self.count += len(values)
+        self.min = np.minimum(self.min, values.min(axis=0))
+        self.max = np.maximum(self.max, values.max(axis=0))
+        for column in range(self.n_columns):
+            value = values[:, column]
+            self.zero[column] += np.count_nonzero(value == 0)
+            self._add_keys(self.positive[column], self._key(value[value > 0]))
+            self._add_keys(self.negative[column], self._key(-value[value < 0]))
+
+    def merge(self, other):
+        if other.n_columns != self.n_columns or other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Only sketches with the same columns and accuracy can be merged")
+        self.count += other.count
+        self.zero += other.zero
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        for column in range(self.n_columns):
+            self._add_to_store(self.positive[column], *other.positive[column])
+            self._add_to_store(self.negative[column], *other.negative[column])
+        return self
+
+    def quantile(self, q):
+        """Quantiles q (in [0, 1]) of each column, array of shape (len(q), n_columns)."""
+        q = np.atleast_1d(np.asarray(q, dtype=float))
+        result = np.full((len(q), self.n_columns), np.nan)
+        if not self.count:
+            return result
+        for column in range(self.n_columns):
+            negative_offset, negative_counts = self.negative[column]
+            positive_offset, positive_counts = self.positive[column]
+            negative_keys = negative_offset + np.arange(len(negative_counts))
+            positive_keys = positive_offset + np.arange(len(positive_counts))
+            # buckets in increasing order of value: largest negative magnitudes first, then zero, then positives
+            values = np.concatenate(
+                [-self._value(negative_keys[::-1]), [0.0], self._value(positive_keys)]
+            )
+            counts = np.concatenate([negative_counts[::-1], [self.zero[column]], positive_counts])
+            bucket = np.searchsorted(np.cumsum(counts), q * (self.count - 1), side="right")
+            result[:, column] = np.clip(values[bucket], self.min[column], self.max[column])
+        return result
+
+
+class StreamingAccumulator:
+    """Running aggregates of the staircase outputs, independent of the number of Monte Carlo iterations.
+
+    Per step it keeps the sums of the impacts, replacement counts and RU ages (hence their means), the running moments
+    (RunningMoments), minimum, maximum and a quantile sketch of the total impact, and the number of faults of each RU by
+    cause. At the final step the distribution of every impact output is sketched, with its running moments for the
+    standard deviation.
+    """
+
+    def __init__(self, usage_time, nb_RU, n_EI, final_step, relative_accuracy=0.01):
+        self.usage_time = usage_time
+        self.final_step = final_step
+        self.count = 0
+        self.sum = {name: np.zeros((usage_time, n_EI)) for name in EI_NAMES}
+        # mean and sum of squared deviations merged batch by batch, not rebuilt from a sum of squares that cancels
+        # for impacts with a large mean and a small spread
+        self.moments = [RunningMoments(n_EI) for _ in range(usage_time)]
+        self.min = np.full((usage_time, n_EI), np.inf)
+        self.max = np.full((usage_time, n_EI), -np.inf)
+        self.sketch = [QuantileSketch(n_EI, relative_accuracy) for _ in range(usage_time)]
+        self.final = {name: QuantileSketch(n_EI, relative_accuracy) for name in EI_NAMES}
+        self.final_moments = {name: RunningMoments(n_EI) for name in EI_NAMES}
+        self.number_of_fault = np.zeros((usage_time, nb_RU))
+        self.RU_age = np.zeros((usage_time, nb_RU))
+        self.fault_cause = np.zeros((usage_time, nb_RU, len(FAULT_NAMES)), dtype=np.int64)
+
+    def update(self, step, EI, number_of_fault, RU_age, fault_cause=None):
+        """Add one step of a batch of iterations.
+
+        EI maps the names of EI_NAMES to (iteration, impact) arrays, number_of_fault and RU_age are (iteration, RU)
+        arrays and fault_cause is a (iteration, RU) array of uint8 fault cause codes (0 when no fault, 1 + the index in
+        FAULT_NAMES otherwise). The batch size is counted at step 0.
+        """
+        if step == 0:
+            self.count += len(RU_age)
+        for name in EI_NAMES:
+            self.sum[name][step] += EI[name].sum(axis=0)
+        total = EI["EI_total"]
+        self.moments[step].update(total)
+        self.min[step] = np.minimum(self.min[step], total.min(axis=0))
+        self.max[step] = np.maximum(self.max[step], total.max(axis=0))
+        self.sketch[step].add(total)
+        if step == self.final_step:
+            for name in EI_NAMES:
+                self.final[name].add(EI[name])
+                self.final_moments[name].update(EI[name])
+        self.number_of_fault[step] += number_of_fault.sum(axis=0)
+        self.RU_age[step] += RU_age.sum(axis=0)
+        if fault_cause is not None:
+            for code in range(len(FAULT_NAMES)):
+                self.fault_cause[step, :, code] += np.count_nonzero(fault_cause == code + 1, axis=0)
+
+    def merge(self, other):
+        """Add the aggregates of another accumulator of the same staircase (e.g. another batch of iterations)."""
+        self.count += other.count
+        for name in EI_NAMES:
+            self.sum[name] += other.sum[name]
+            self.final[name].merge(other.final[name])
+            self.final_moments[name].merge(other.final_moments[name])
+        for moments, other_moments in zip(self.moments, other.moments):
+            moments.merge(other_moments)
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        for sketch, other_sketch in zip(self.sketch, other.sketch):
+            sketch.merge(other_sketch)
+        self.number_of_fault += other.number_of_fault
+        self.RU_age += other.RU_age
+        self.fault_cause += other.fault_cause
+        return self
+
+    def mean(self, name):
+        """Mean over the iterations of an impact output (EI_NAMES), number_of_fault or RU_age, per step."""
+        total = self.sum[name] if name in self.sum else getattr(self, name)
+        return total / self.count
+
+    def std(self, step):
+        """Standard deviation of the total impact at a step."""
+        return np.sqrt(self.moments[step].M2 / self.count)
+
+    def final_std(self, name):
+        return np.sqrt(self.final_moments[name].M2 / self.count)
+
+    def percentile(self, percent):
+        """Percentiles of the total impact, array of shape (step, len(percent), impact)."""
+        return np.stack([sketch.quantile(np.asarray(percent) / 100) for sketch in self.sketch])
+
+    def fault_count(self):
+        """Number of faults of each cause (FAULT_NAMES order) over all steps, iterations and RUs."""
+        return self.fault_cause.sum(axis=(0, 1))
+
+
+class RunningMoments:
+    """Running count, mean and sum of squared deviations (Welford) of vectors of values, one per column.
+
+    Batches are added with Chan's combination of their moments, so the moments of several batches or of accumulators
+    built in other processes merge exactly, whatever the order.
+    """
+
+    def __init__(self, n_columns, count=0, mean=None, M2=None):
+        self.count = count
+        self.mean = np.zeros(n_columns) if mean is None else np.asarray(mean, dtype=float)
+        self.M2 = np.zeros(n_columns) if M2 is None else np.asarray(M2, dtype=float)
+
+    @classmethod
+    def from_accumulator(cls, statistics, name="EI_total"):
+        """Moments of an output of a StreamingAccumulator at its final step."""
+        moments = statistics.final_moments[name]
+        return cls(len(moments.mean), moments.count, moments.mean.copy(), moments.M2.copy())
+
+    def update(self, values):
+        """Add a (n, n_columns) array of values."""
+        values = np.asarray(values, dtype=float)
+        if len(values):
+            mean = values.mean(axis=0)
+            self.merge(RunningMoments(len(mean), len(values), mean, ((values - mean) ** 2).sum(axis=0)))
+        return self
+
+    def merge(self, other):
+        count = self.count + other.count
+        if other.count:
+            delta = other.mean - self.mean
+            self.mean = self.mean + delta * other.count / count
+            self.M2 = self.M2 + other.M2 + delta**2 * self.count * other.count / count
+            self.count = count
+        return self
+
+    def variance(self):
+        return self.M2 / max(self.count - 1, 1)
+
+    def half_width(self, z=1.96):
+        """Half-width of the confidence interval of the mean (95 % by default)."""
+        return z * np.sqrt(self.variance() / max(self.count, 1))
+
+    def relative_half_width(self, z=1.96):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.mean != 0, self.half_width(z) / np.abs(self.mean), np.where(self.M2 > 0, np.inf, 0.0))
+
+
+class TrajectoryWriter:
+    """Full (step, iteration, ...) trajectories written to .npy files batch by batch instead of kept in memory."""
+
+    def __init__(self, path, shapes, dtypes, mode="w+"):
+        """mode "w+" creates the files, "r+" writes into files already created with the same shapes."""
+        os.makedirs(path, exist_ok=True)
+        self.arrays = {
+            name: np.lib.format.open_memmap(os.path.join(path, name + ".npy"), mode=mode, dtype=dtypes[name], shape=shape)
+            for name, shape in shapes.items()
+        }
+
+    def write(self, name, step, start, values):
+        self.arrays[name][step, start : start + len(values)] = values
+
+    def close(self):
+        for array in self.arrays.values():
+            array.flush()
+        self.arrays = {}
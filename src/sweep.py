@@ -0,0 +1,185 @@
+"""PELCA (Power Electronics Life Cycle Assessment) is an open-source project aimed at assessing the environmental impact over the life cycle of modular and diagnosable power electronics systems. The integration of modularity and diagnosability aligns with circular economy principles, promoting practices such as repair and reuse. This project provides a tool to calculate the environmental impacts associated with the manufacturing, usage, and replacement of power electronics products.
+Copyright (C) Mitsubishi Electric R&D Centre Europe and SATIE 2024, author Briac Baudais baudaisbriac@gmail.com
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU Lesser General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with this program.  If not, see https://www.gnu.org/licenses/lgpl-3.0.html"""
+
+"""
+Parameter sweep of the staircase model without the GUI.
+
+The sweep is described by a JSON specification:
+
+    {
+        "method": "grid",                   # "grid": every combination of the values, "lhs": Latin hypercube
+        "samples": 50,                      # number of points of a Latin hypercube
+        "seed": 0,
+        "parameters": {
+            "service_life": [20, 30],       # grid: list of values, lhs: [min, max]
+            "step": [1, 12],
+            "num_hourPerYear": [2000, 5000],
+            "beta_wearout[0]": [6, 10],     # Weibull beta/sigma of RU 0 (early, random or wearout)
+            "maintenance[1]": [5, 10]       # maintenance age of RU 1
+        }
+    }
+
+Usage: python sweep.py input.xlsx spec.json results.csv [--workers 8]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import dictionary
+from staircase import STAIRCASE, end_of_life_step, read_staircase_inputs
+
+SCALAR_PARAMETERS = ("service_life", "step", "num_hourPerYear")
+INTEGER_PARAMETERS = ("service_life", "step", "maintenance")
+# column of each Weibull parameter in the fault table of the "Faults & Maintenance" sheet
+FAULT_TABLE_COLUMNS = {
+    "sigma_early": 0,
+    "beta_early": 1,
+    "sigma_random": 2,
+    "beta_random": 3,
+    "sigma_wearout": 4,
+    "beta_wearout": 5,
+}
+PERCENTILES = (10, 50, 90)
+
+
+def _parse_name(name):
+    """(parameter, RU index or None) of a sweep parameter name such as "step" or "beta_wearout[0]"."""
+    match = re.fullmatch(r"(\w+?)(?:\[(\d+)\])?", name)
+    parameter, RU = match.group(1), match.group(2)
+    if parameter in SCALAR_PARAMETERS and RU is None:
+        return parameter, None
+    if (parameter in FAULT_TABLE_COLUMNS or parameter == "maintenance") and RU is not None:
+        return parameter, int(RU)
+    raise ValueError(f"Unknown sweep parameter '{name}'")
+
+
+def typed_point(names, values):
+    """Design point {parameter name: value} of raw values, rounded to int for the integer parameters.
+
+    Raises ValueError for an unknown parameter name.
+    """
+    point = {}
+    for name, value in zip(names, values):
+        point[name] = int(round(value)) if _parse_name(name)[0] in INTEGER_PARAMETERS else float(value)
+    return point
+
+
+def design_points(spec):
+    """List of {parameter name: value} of the sweep specification."""
+    names = list(spec["parameters"])
+    for name in names:
+        _parse_name(name)
+    if spec.get("method", "grid") == "grid":
+        return [dict(zip(names, values)) for values in itertools.product(*spec["parameters"].values())]
+    if spec["method"] != "lhs":
+        raise ValueError(f"Unknown sweep method '{spec['method']}'")
+    from scipy.stats import qmc
+
+    bounds = np.array([spec["parameters"][name] for name in names], dtype=float)
+    sample = qmc.LatinHypercube(d=len(names), seed=spec.get("seed")).random(int(spec["samples"]))
+    sample = qmc.scale(sample, bounds[:, 0], bounds[:, 1])
+    return [typed_point(names, row) for row in sample]
+
+
+def apply_point(dic, beta_sigma_ERW, point):
+    """Copies of dic and of the fault table with the values of a design point."""
+    dic = dict(dic, maintenance=np.array(dic["maintenance"], dtype=float))
+    beta_sigma_ERW = np.array(beta_sigma_ERW, dtype=float)
+    for name, value in point.items():
+        parameter, RU = _parse_name(name)
+        if RU is None:
+            dic[parameter] = value
+        elif parameter == "maintenance":
+            dic["maintenance"][RU] = value
+        else:
+            beta_sigma_ERW[RU, FAULT_TABLE_COLUMNS[parameter]] = value
+    if "maintenance" in {_parse_name(name)[0] for name in point}:
+        dic["Maintenance"] = "True"
+    return dic, beta_sigma_ERW
+
+
+def _run_point(dic, EI_manufacturing, EI_use, beta_sigma_ERW, point, rng):
+    """Summary of the staircase of one design point, one row of the result table."""
+    dic, beta_sigma_ERW = apply_point(dic, beta_sigma_ERW, point)
+    # the points are already spread over the processes, each staircase only keeps its running statistics
+    dic.update(output="Statistics", save_trajectories="False", workers=0)
+    statistics = STAIRCASE.from_arrays(dic, EI_manufacturing, EI_use, beta_sigma_ERW, rng=rng).statistics
+    row = dict(point)
+    final = end_of_life_step(dic)
+    percentiles = statistics.sketch[final].quantile(np.asarray(PERCENTILES) / 100)
+    for index, EI in enumerate(dic["EI_name"]):
+        row[f"{EI} mean"] = statistics.mean("EI_total")[final, index]
+        row[f"{EI} std"] = statistics.std(final)[index]
+        for percent, values in zip(PERCENTILES, percentiles):
+            row[f"{EI} p{percent}"] = values[index]
+        for name, label in [("EI_total_manu", "manufacturing"), ("EI_total_use", "use"),
+                            ("EI_total_maintenance", "maintenance")]:
+            row[f"{EI} {label} mean"] = statistics.mean(name)[final, index]
+    row["faults mean"] = statistics.mean("number_of_fault")[final].sum()
+    return row
+
+
+def run_sweep(path_input, name_input, spec, workers=None):
+    """Run the staircase of every point of the sweep specification on the inputs of an input workbook.
+
+    The LCA results and the fault table are read once (the LCA is calculated first if needed) and the points are
+    run in a process pool of workers processes (all the cores by default). Each point draws from its own child of
+    numpy.random.SeedSequence(spec["seed"]), so the table does not depend on the number of workers. Returns a
+    DataFrame with one row per point: the parameter values then the summary of the final step for each impact.
+    """
+    dic = dictionary._init_dic(path_input, name_input)
+    if dic["LCA"] == "yes":
+        import LCA
+
+        LCA.EI_calculation(dic, path_input, name_input)
+    EI_manufacturing, EI_use, beta_sigma_ERW = read_staircase_inputs(path_input, name_input, dic)
+    points = design_points(spec)
+    rngs = [np.random.default_rng(child) for child in np.random.SeedSequence(spec.get("seed")).spawn(len(points))]
+    arguments = [(dic, EI_manufacturing, EI_use, beta_sigma_ERW, point, rng) for point, rng in zip(points, rngs)]
+    if workers == 1:
+        rows = [_run_point(*argument) for argument in arguments]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rows = list(executor.map(_run_point, *zip(*arguments)))
+    return pd.DataFrame(rows)
+
+
+def write_table(table, path):
+    """Write the result table as Parquet (.parquet, needs pyarrow) or CSV."""
+    if path.endswith(".parquet"):
+        table.to_parquet(path, index=False)
+    else:
+        table.to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parameter sweep of the PELCA staircase")
+    parser.add_argument("input", help="input workbook (.xlsx)")
+    parser.add_argument("spec", help="JSON sweep specification")
+    parser.add_argument("output", help="result table (.csv or .parquet)")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes (all the cores by default)")
+    args = parser.parse_args()
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+    path_input, name_input = os.path.split(os.path.abspath(args.input))
+    table = run_sweep(path_input, name_input, spec, args.workers)
+    write_table(table, args.output)
+    print(f"{len(table)} points written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import sys
+import unittest
+from unittest import mock
+
+import numpy as np
+from scipy import sparse
+
+# brightway2 is replaced by a mock while LCA is imported (only those modules, the ones imported with LCA stay loaded),
+# each test sets the part of its API that LCA uses
+BRIGHTWAY_MODULES = ("brightway2", "bw2data", "bw2data.errors")
+_previous = {name: sys.modules.get(name) for name in BRIGHTWAY_MODULES}
+sys.modules.update({name: mock.MagicMock() for name in BRIGHTWAY_MODULES})
+try:
+    import LCA
+finally:
+    for name, module in _previous.items():
+        if module is None:
+            del sys.modules[name]
+        else:
+            sys.modules[name] = module
+
+
+class Activity(dict):
+    """Activity of a brightway database: its fields and its key."""
+
+    def __init__(self, database, code, **fields):
+        super().__init__(fields, database=database, code=code)
+        self.key = (database, code)
+
+    def __hash__(self):
+        return hash(self.key)
+
+
+class MatrixLCA:
+    """bw.LCA of a synthetic technosphere of three products (a, b and c of database "db") and two elementary flows."""
+
+    technosphere = np.array([[1, -0.5, 0], [-0.2, 1, -1], [0, -0.1, 1]])
+    biosphere = np.array([[1, 2, 0], [0, 0.5, 3]])
+    factors = {"GWP": [1.0, 0.0], "ADP": [0.3, 2.0], "water": [0.0, 5.0]}
+
+    def __init__(self, demand, method):
+        self.product_dict = {("db", code): row for row, code in enumerate("abc")}
+        self.switch_method(method)
+
+    def load_lci_data(self):
+        self.technosphere_matrix = sparse.csr_matrix(self.technosphere)
+        self.biosphere_matrix = sparse.csr_matrix(self.biosphere)
+
+    def switch_method(self, method):
+        self.characterization_matrix = sparse.diags(self.factors[method])
+
+    @classmethod
+    def score(cls, code, method):
+        """Score of one unit of a product for one method, solved alone."""
+        demand = np.zeros(3)
+        demand["abc".index(code)] = 1
+        return np.asarray(cls.factors[method]) @ cls.biosphere @ np.linalg.solve(cls.technosphere, demand)
+
+
+class RandomMonteCarloLCA:
+    """bw.MonteCarloLCA drawing, at each iteration, an inventory of the two elementary flows of MatrixLCA for three
+    activities uniformly between 0.9 and 1.1."""
+
+    def __init__(self, demand, seed=None):
+        self.rng = np.random.default_rng(seed)
+
+    def lci(self):
+        pass
+
+    def switch_method(self, method):
+        self.characterization_matrix = sparse.diags(MatrixLCA.factors[method])
+
+    def __next__(self):
+        self.inventory = sparse.csr_matrix(self.rng.uniform(0.9, 1.1, (2, 3)))
+
+
+class TestScores(unittest.TestCase):
+    def test_multi_method_scores(self):
+        activities = [Activity("db", "c"), Activity("db", "a"), Activity("db", "b")]
+        methods = ["GWP", "ADP", "water"]
+        with mock.patch.object(LCA.bw, "LCA", MatrixLCA):
+            scores = LCA.multi_method_scores(activities, methods)
+        expected = [[MatrixLCA.score(act["code"], method) for act in activities] for method in methods]
+        np.testing.assert_allclose(scores, expected, rtol=1e-12)
+
+
+class Databases(dict):
+    """bw.databases: the metadata of each database."""
+
+    def flush(self):
+        pass
+
+
+class TestWarmStart(unittest.TestCase):
+    dic = {"proj_name": "project", "database_ecoinvent": "ecoinvent", "inventory_name": "inventory",
+           "import_hash": "sheets"}
+
+    def setUp(self):
+        self.bw = mock.MagicMock(methods=["method"], migrations=[])
+        self.bw.databases = Databases(biosphere3={"modified": "1"}, ecoinvent={"modified": "2"}, inventory={})
+        self.bw.create_core_migrations.side_effect = lambda: self.bw.migrations.append(LCA.CORE_MIGRATION)
+
+    def setup_project(self, **options):
+        """Number of imports of the inventory by setup_project."""
+        imports = self.bw.ExcelImporter.call_count
+        with mock.patch.object(LCA, "bw", self.bw):
+            LCA.setup_project(dict(self.dic, **options), "folder", "input.xlsx")
+        return self.bw.ExcelImporter.call_count - imports
+
+    def test_warm_start(self):
+        self.assertEqual(self.setup_project(), 1)  # no import hash yet
+        self.assertEqual(self.setup_project(), 0)
+        self.bw.bw2setup.assert_not_called()
+        self.bw.SingleOutputEcospold2Importer.assert_not_called()
+        self.bw.create_core_migrations.assert_called_once()
+
+    def test_changed_inventory(self):
+        self.setup_project()
+        self.assertEqual(self.setup_project(import_hash="changed sheets"), 1)
+        self.assertEqual(self.setup_project(import_hash="changed sheets"), 0)
+        # a new version of the background databases also imports the inventory again
+        self.bw.databases["ecoinvent"]["modified"] = "3"
+        self.assertEqual(self.setup_project(import_hash="changed sheets"), 1)
+
+
+class TestMonteCarlo(unittest.TestCase):
+    dic = {"proj_name": "project", "iterations": 200, "MC_chunk": 20, "MC_workers": 1, "MC_tolerance": 0, "seed": 0}
+
+    def samples(self, **options):
+        with mock.patch.object(LCA, "bw", mock.MagicMock(MonteCarloLCA=RandomMonteCarloLCA)):
+            return LCA.monte_carlo_samples(dict(self.dic, **options), {("db", "a"): 1}, ["GWP", "ADP"])
+
+    def test_converged(self):
+        self.assertFalse(LCA.converged(np.array([[10.0]]), 0.1))  # no standard error from a single sample
+        self.assertTrue(LCA.converged(np.array([[5.0, 5.0, 5.0]]), 0))
+        # mean 10, standard error sqrt(8 / 3) / 2 = 0.816
+        results = np.array([[10.0, 12.0, 8.0, 10.0]])
+        self.assertTrue(LCA.converged(results, 0.1))
+        self.assertFalse(LCA.converged(results, 0.05))
+        # every method must be converged
+        self.assertFalse(LCA.converged(np.vstack([results, [1.0, 3.0, -1.0, 1.0]]), 0.1))
+
+    def test_samples(self):
+        results = self.samples()
+        self.assertEqual(results.shape, (2, 200))
+        # 3 activities of one unit: 3 for GWP, 3 * (0.3 + 2) for ADP
+        np.testing.assert_allclose(results.mean(axis=1), [3, 6.9], rtol=0.01)
+        np.testing.assert_array_equal(self.samples(), results)  # chunks seeded from dic["seed"]
+
+    def test_early_stop(self):
+        # standard error of the first chunk about 0.1 / sqrt(20), below 1 % of the means
+        results = self.samples(MC_tolerance=0.01)
+        self.assertEqual(results.shape, (2, 20))
+        np.testing.assert_array_equal(results, self.samples()[:, :20])
+
+    def test_functional_unit(self):
+        dic = {"num_hourPerYear": 1000.5, "service_life": 10, "use_activities": ["Electricity per hour"]}
+        activities = [Activity("db", "a", name="Capacitor"), Activity("db", "b", name="Electricity per hour")]
+        self.assertEqual(LCA.monte_carlo_functional_unit(dic, activities), {("db", "a"): 1, ("db", "b"): 10005.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
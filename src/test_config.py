@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import config
+from config import CACHE_FOLDER, PelcaConfig, load_config, read_workbook
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Input", "Input - Example.xlsx")
+
+
+class TestConfig(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.name = "input.xlsx"
+        shutil.copy(EXAMPLE, os.path.join(self.folder, self.name))
+        config._memo.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+        config._memo.clear()
+
+    def test_typed_values(self):
+        loaded = load_config(self.folder, self.name)
+        self.assertIsInstance(loaded.service_life, int)
+        self.assertIsInstance(loaded.Maintenance, bool)
+        self.assertIn(loaded.engine, ("Loop", "Vectorized", "Event"))
+        self.assertEqual(len(loaded.Remplacement_matrix), len(loaded.faults))
+        self.assertEqual(len(loaded.RU_activities), len(loaded.faults))
+        dic = loaded.to_dic()
+        self.assertIn(dic["Maintenance"], ("True", "False"))
+        self.assertEqual(dic["EI_name"], loaded.LCIA["Acronym"].tolist())
+
+    def test_same_tables_as_excel(self):
+        loaded = load_config(self.folder, self.name)
+        path = os.path.join(self.folder, self.name)
+        faults = pd.read_excel(path, sheet_name="Faults & Maintenance", index_col=0, skiprows=[0, 1, 2])
+        np.testing.assert_array_equal(loaded.faults.to_numpy(dtype=float), faults.to_numpy(dtype=float))
+        matrix = pd.read_excel(
+            path, sheet_name="Replac. Matrix", header=None, skiprows=[0, 1, 2, 3], usecols=lambda x: x != 0
+        )
+        np.testing.assert_array_equal(loaded.Remplacement_matrix.to_numpy(), matrix.to_numpy())
+
+    def test_json_round_trip(self):
+        loaded = load_config(self.folder, self.name)
+        reloaded = PelcaConfig.from_json(loaded.to_json())
+        self.assertEqual(reloaded.service_life, loaded.service_life)
+        self.assertEqual(reloaded.RU_activities, loaded.RU_activities)
+        pd.testing.assert_frame_equal(reloaded.LCIA, loaded.LCIA, check_dtype=False)
+        np.testing.assert_array_equal(reloaded.faults.to_numpy(), loaded.faults.to_numpy())
+
+    def test_memoised_until_modified(self):
+        first = load_config(self.folder, self.name)
+        self.assertIs(load_config(self.folder, self.name), first)
+        self.assertTrue(os.path.exists(os.path.join(self.folder, CACHE_FOLDER, self.name + ".json")))
+        # a new process only reads the cache file
+        config._memo.clear()
+        self.assertEqual(load_config(self.folder, self.name).inventory_hash, first.inventory_hash)
+        # a touched but unchanged workbook keeps its configuration
+        os.utime(os.path.join(self.folder, self.name), (0, 0))
+        self.assertEqual(load_config(self.folder, self.name).inventory_hash, first.inventory_hash)
+
+    def test_invalid_option(self):
+        sheets = read_workbook(os.path.join(self.folder, self.name))
+        staircase = sheets["Staircase"]
+        row = staircase.index[staircase[0] == "Service life (year)"][0]
+        staircase.loc[row, 1] = 0
+        with self.assertRaisesRegex(ValueError, "Service life"):
+            PelcaConfig.from_sheets(sheets)
@@ -0,0 +1,27 @@
+import importlib.util
+import unittest
+
+from benchmark_imports import HEAVY_MODULES, import_times, total_time
+
+# cold import budget of a staircase run, far above the measured time so that only a regression trips it
+IMPORT_BUDGET = 2.0
+
+
+def _report(times):
+    slowest = sorted(times.items(), key=lambda item: -item[1][1])[:10]
+    return "\n".join(f"{module}: {cumulative / 1000:.1f} ms" for module, (_, cumulative) in slowest)
+
+
+class TestImportTime(unittest.TestCase):
+    def test_staircase_run_imports(self):
+        modules = ["pelca", "dictionary", "staircase", "sweep"]
+        times = import_times(modules)
+        heavy = [module for module in HEAVY_MODULES if module in times]
+        self.assertEqual(heavy, [], "heavy modules imported by a staircase run:\n" + _report(times))
+        self.assertLess(total_time(times, modules), IMPORT_BUDGET, "slowest imports:\n" + _report(times))
+
+    @unittest.skipUnless(importlib.util.find_spec("customtkinter"), "customtkinter is not installed")
+    def test_gui_opens_without_brightway(self):
+        times = import_times(["pelcaGUI"])
+        self.assertNotIn("brightway2", times, _report(times))
+        self.assertNotIn("matplotlib.pyplot", times, _report(times))
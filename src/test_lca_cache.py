@@ -0,0 +1,54 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from lca_cache import LCAResultCache, exchanges_hash, workbook_hash
+
+METHOD = ("EF v3.0", "climate change", "global warming potential (GWP100)")
+
+
+class TestLCAResultCache(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "lca_cache.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_round_trip(self):
+        cache = LCAResultCache(self.path)
+        cache.put("abc", METHOD, ["v1"], 2.5)
+        cache.save()
+        cache = LCAResultCache(self.path)
+        self.assertEqual(cache.get("abc", METHOD, ["v1"]), 2.5)
+        self.assertIsNone(cache.get("abc", METHOD, ["v2"]))
+        self.assertIsNone(cache.get("abd", METHOD, ["v1"]))
+
+    def test_exchanges_hash(self):
+        exchanges = [
+            {"input": ("db", "a"), "amount": 1.0, "type": "production"},
+            {"input": ("ei", "steel"), "amount": 0.2, "type": "technosphere", "unit": "kilogram"},
+        ]
+        self.assertEqual(exchanges_hash(exchanges), exchanges_hash(exchanges[::-1]))
+        changed = [dict(exchanges[0]), dict(exchanges[1], amount=0.3)]
+        self.assertNotEqual(exchanges_hash(exchanges), exchanges_hash(changed))
+        # a change of a foreground input changes the hash of the activities using it
+        self.assertNotEqual(
+            exchanges_hash(exchanges, lambda key: "x" if key[0] == "ei" else None),
+            exchanges_hash(exchanges, lambda key: "y" if key[0] == "ei" else None),
+        )
+
+    def test_workbook_hash(self):
+        path = os.path.join(self.folder, "input.xlsx")
+        for amount, expected_same in [(1, True), (2, False)]:
+            with pd.ExcelWriter(path) as writer:
+                pd.DataFrame([["Activity", "IGBT"], ["amount", amount]]).to_excel(
+                    writer, sheet_name="Inventory - Manufacturing", index=False, header=False
+                )
+                pd.DataFrame([["Service life (year)", 30]]).to_excel(writer, sheet_name="Staircase", index=False)
+            if amount == 1:
+                reference = workbook_hash(path)
+            self.assertEqual(workbook_hash(path) == reference, expected_same)
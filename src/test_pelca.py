@@ -0,0 +1,64 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from config import load_config
+from pelca import main, run_pipeline
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Input", "Input - Example.xlsx")
+
+
+def set_row(sheet, name, value):
+    for row in sheet.iter_rows():
+        if row[0].value == name:
+            row[1].value = value
+            return
+    raise KeyError(name)
+
+
+class TestPipeline(unittest.TestCase):
+    """Staircase of the example workbook on LCA results written by the test, so that brightway is not needed."""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.name = "input.xlsx"
+        workbook = openpyxl.load_workbook(EXAMPLE)
+        set_row(workbook["LCA"], "LCA result path", self.folder)
+        set_row(workbook["Staircase"], "Monte Carlo (number of iteration)", 50)
+        set_row(workbook["Staircase"], "Service life (year)", 10)
+        workbook.save(os.path.join(self.folder, self.name))
+
+        config = load_config(self.folder, self.name)
+        LCA_path = os.path.join(self.folder, "Results PELCA")
+        os.mkdir(LCA_path)
+        nb_RU = len(config.faults)
+        index = pd.Index(config.LCIA["Acronym"], name="Method")
+        with pd.ExcelWriter(os.path.join(LCA_path, config.filename_result_EI)) as writer:
+            for sheet, scale in [("Manufacturing", 1.0), ("Use", 1e-3)]:
+                frame = pd.DataFrame(scale * np.ones((len(index), nb_RU)), index=index,
+                                     columns=[f"RU {i}" for i in range(nb_RU)])
+                frame.insert(0, "Unit", config.LCIA["Unit"].tolist())
+                frame.to_excel(writer, sheet_name=sheet)
+        with open(os.path.join(LCA_path, config.filename_result_EI + ".inventory_hash"), "w") as f:
+            f.write(config.inventory_hash)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_staircase_without_brightway(self):
+        summary = run_pipeline(self.folder, self.name, plots=os.path.join(self.folder, "plots"))
+        self.assertFalse(summary["LCA calculated"])
+        self.assertTrue(os.path.exists(summary["results"][0]))
+        self.assertEqual(len(summary["figures"]), 6)
+        self.assertNotIn("brightway2", sys.modules)
+        self.assertNotIn("customtkinter", sys.modules)
+
+    def test_cli_reports_failures(self):
+        self.assertEqual(main(["run", os.path.join(self.folder, self.name), "--workers", "1"]), 0)
+        self.assertEqual(main(["run", os.path.join(self.folder, "missing.xlsx"), "--workers", "1"]), 1)
@@ -0,0 +1,45 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from renewal import is_decoupled
+from staircase import STAIRCASE, count_fault_cause
+from test_staircase import BETA_SIGMA_ERW, EI_MANUFACTURING, EI_USE, make_dic
+
+
+class TestRenewal(unittest.TestCase):
+    nb_ite_MC = 5000
+
+    def compare(self, maintenance, step):
+        dic = dict(make_dic("Vectorized", self.nb_ite_MC, maintenance), step=step,
+                   Remplacement_matrix=pd.DataFrame(np.eye(2)), maintenance=np.array([7.0, 5.0]) * step)
+        monte_carlo = STAIRCASE.from_arrays(dic, EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW, rng=1)
+        expected = STAIRCASE.from_arrays(dict(dic, engine="Renewal"), EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW)
+        self.assertIsNone(expected.EI_total)
+        for name in ["EI_total", "EI_total_manu", "EI_total_use", "EI_total_maintenance", "number_of_fault"]:
+            values = getattr(monte_carlo, name)
+            mean = expected.statistics.mean(name)
+            # Monte Carlo mean within 5 standard errors of the expectation, at the steps where faults were sampled
+            standard_error = values.std(axis=1) / np.sqrt(self.nb_ite_MC)
+            sampled = standard_error > 1e-12 * np.abs(mean)
+            np.testing.assert_array_less(np.abs(values.mean(axis=1) - mean)[sampled], 5 * standard_error[sampled],
+                                         err_msg=name)
+        np.testing.assert_allclose(expected.statistics.mean("EI_total_use"), monte_carlo.EI_total_use[:, 0])
+        counts = count_fault_cause(monte_carlo.fault_cause) / self.nb_ite_MC
+        np.testing.assert_allclose(expected.statistics.fault_count(), counts, atol=5 * np.sqrt(counts.max() / self.nb_ite_MC))
+
+    def test_matches_monte_carlo(self):
+        self.compare("False", 1)
+        self.compare("False", 4)
+
+    def test_matches_monte_carlo_with_maintenance(self):
+        self.compare("True", 1)
+        self.compare("True", 4)
+
+    def test_coupled_RUs_fall_back_on_monte_carlo(self):
+        dic = dict(make_dic("Renewal", 100), nb_RU=2)
+        self.assertFalse(is_decoupled(dic))
+        staircase = STAIRCASE.from_arrays(dic, EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW, rng=0)
+        self.assertIsNone(staircase.statistics)
+        self.assertEqual(staircase.EI_total.shape, (30, 100, 2))
@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from result_store import ResultStore, write_store
+from staircase import FAULT_EVENT_DTYPE, STAIRCASE
+from test_staircase import BETA_SIGMA_ERW, EI_MANUFACTURING, EI_USE, make_dic
+
+
+class TestResultStore(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "run.pelca")
+        rng = np.random.default_rng(0)
+        self.EI = rng.random((37, 1234, 3))
+        self.events = np.zeros(50, FAULT_EVENT_DTYPE)
+        self.events["step"] = np.sort(rng.integers(0, 37, 50))
+        self.events["cause"] = rng.integers(1, 4, 50)
+        write_store(
+            self.path,
+            {"EI_total": self.EI, "fault_cause": self.events},
+            {"seed": 0},
+            columns={"EI_total": ["GWP", "ODP", "ADP"]},
+            step_chunk=8,
+            iteration_chunk=500,
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_full_read(self):
+        store = ResultStore(self.path)
+        self.assertEqual(store.metadata, {"seed": 0})
+        self.assertEqual(store.shape("EI_total"), self.EI.shape)
+        np.testing.assert_array_equal(store.read("EI_total"), self.EI)
+        np.testing.assert_array_equal(store.read("fault_cause"), self.events)
+
+    def test_partial_read(self):
+        store = ResultStore(self.path)
+        part = store.read("EI_total", steps=slice(5, 20), iterations=slice(400, 1100), columns="ODP")
+        np.testing.assert_array_equal(part, self.EI[5:20, 400:1100, [1]])
+        np.testing.assert_array_equal(store.read("EI_total", steps=-1)[0], self.EI[-1])
+        np.testing.assert_array_equal(store.read("fault_cause", steps=slice(0, 10)), self.events[self.events["step"] < 10])
+
+    def test_records_step_range(self):
+        # blocks of 10 events sorted by step: a range of steps only decompresses the blocks overlapping it
+        path = os.path.join(self.folder, "events.pelca")
+        write_store(path, {"fault_cause": self.events}, iteration_chunk=10)
+        store = ResultStore(path)
+        with mock.patch("result_store.np.load", wraps=np.load) as load:
+            part = store.read("fault_cause", steps=slice(0, 10))
+        np.testing.assert_array_equal(part, self.events[self.events["step"] < 10])
+        self.assertLess(load.call_count, 5)
+        with mock.patch("result_store.np.load", wraps=np.load) as load:
+            last = store.read("fault_cause", steps=-1)
+        np.testing.assert_array_equal(last, self.events[self.events["step"] == self.events["step"].max()])
+        self.assertEqual(load.call_count, 1)
+        np.testing.assert_array_equal(store.read("fault_cause", steps=slice(40, 50)), self.events[:0])
+
+    def test_staircase_store(self):
+        dic = dict(make_dic("Vectorized", 120), EI_name=["GWP", "ODP"], LCIA_unit=["kg", "kg"], LCA_path=self.folder,
+                   filename_result_staircase="staircase.xlsx")
+        staircase = STAIRCASE.from_arrays(dic, EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW, rng=0)
+        store = ResultStore(staircase.save_store(dic))
+        self.assertEqual(store.metadata["seed"], 0)
+        np.testing.assert_array_equal(store.read("EI_total_use", columns="GWP")[..., 0], staircase.EI_total_use[..., 0])
+        np.testing.assert_array_equal(store.read("fault_cause"), staircase.fault_cause)
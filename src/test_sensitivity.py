@@ -0,0 +1,65 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from sensitivity import _Model, analyse
+from staircase import STAIRCASE, end_of_life_step
+from test_staircase import BETA_SIGMA_ERW, EI_MANUFACTURING, EI_USE, make_dic
+
+
+class LinearModel:
+    """y = 4 x0 + 2 x1 + 0 x2 on [0, 1]^3, first-order = total Sobol indices 0.8, 0.2 and 0."""
+
+    names = ["num_hourPerYear", "beta_wearout[0]", "sigma_early[1]"]
+
+    evaluations = 0
+
+    def __call__(self, points):
+        self.evaluations += len(points)
+        x = np.array([[point[name] for name in self.names] for point in points])
+        return (x @ np.array([4.0, 2.0, 0.0]))[:, np.newaxis]
+
+
+class TestSensitivity(unittest.TestCase):
+    bounds = np.array([[0, 1], [0, 1], [0, 1]], dtype=float)
+
+    def test_sobol_indices(self):
+        spec = {"method": "sobol", "samples": 64, "max_evaluations": 20000, "tolerance": 0.01, "seed": 0}
+        indices, history = analyse(LinearModel(), LinearModel.names, self.bounds, ["y"], spec)
+        np.testing.assert_allclose(indices["S1"], [0.8, 0.2, 0], atol=0.05)
+        np.testing.assert_allclose(indices["ST"], [0.8, 0.2, 0], atol=0.05)
+        # stopped by the tolerance before the budget, each round doubling the base sample
+        self.assertLess(history["max change"].iloc[-1], 0.01)
+        self.assertLess(history["evaluations"].iloc[-1], 20000)
+        self.assertEqual(list(history["samples"][:3]), [64, 128, 256])
+
+    def test_morris_indices(self):
+        spec = {"method": "morris", "samples": 10, "levels": 4, "max_evaluations": 400, "seed": 0}
+        indices, history = analyse(LinearModel(), LinearModel.names, self.bounds, ["y"], spec)
+        np.testing.assert_allclose(indices["mu_star"], [4, 2, 0], atol=1e-9)
+        np.testing.assert_allclose(indices["sigma"], [0, 0, 0], atol=1e-9)
+        self.assertEqual(len(history), 2)  # the elementary effects of a linear model do not change
+
+    def test_staircase(self):
+        dic = dict(make_dic("Renewal", 1), Remplacement_matrix=pd.DataFrame(np.eye(2)), EI_name=["GWP", "ADP"])
+        model = _Model(dic, EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW, seed=0)
+        spec = {"method": "sobol", "samples": 16, "max_evaluations": 200, "seed": 0}
+        bounds = np.array([[10, 20], [100, 101], [500, 1000]], dtype=float)
+        indices, history = analyse(model, ["sigma_wearout[1]", "sigma_early[0]", "num_hourPerYear"], bounds,
+                                   dic["EI_name"], spec)
+        self.assertLessEqual(model.evaluations, 200)
+        ST = indices.set_index(["impact", "parameter"])["ST"]
+        # the wearout of the capacitor drives the replacements, the use phase the rest
+        self.assertGreater(ST["GWP", "sigma_wearout[1]"], ST["GWP", "sigma_early[0]"])
+        self.assertGreater(ST["GWP", "num_hourPerYear"], ST["GWP", "sigma_early[0]"])
+        self.assertLess(ST["ADP", "sigma_early[0]"], 0.05)
+
+    def test_end_of_life(self):
+        # with several steps per year, the output is the last step of the service life, service_life * step - 1
+        dic = dict(make_dic("Renewal", 1), Remplacement_matrix=pd.DataFrame(np.eye(2)), EI_name=["GWP", "ADP"], step=4)
+        model = _Model(dic, EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW, seed=0)
+        statistics = STAIRCASE.from_arrays(dic, EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW).statistics
+        np.testing.assert_array_equal(model([{"num_hourPerYear": dic["num_hourPerYear"]}])[0],
+                                      statistics.mean("EI_total")[-1])
+        self.assertEqual(end_of_life_step(dic), len(statistics.mean("EI_total")) - 1)
@@ -0,0 +1,369 @@
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from staircase import (
+    FAULT_EVENT_DTYPE,
+    STAIRCASE,
+    count_fault_cause,
+    decode_fault_cause,
+    encode_fault_cause,
+    fault_cause_dense,
+    fault_cause_events,
+    _initial_uniforms,
+    sampling_standard_error,
+)
+
+# Two RU system of the example: IGBT module and DC bus capacitor, a capacitor fault replaces both RUs
+EI_MANUFACTURING = np.array([[10.0, 5.0], [2.0, 3.0]])
+EI_USE = np.array([[0.01, 0.02], [0.001, 0.0]])
+BETA_SIGMA_ERW = np.array([[100, 0.6, 3000, 1, 40, 8], [100, 0.6, 3000, 1, 12, 8]], dtype=float)
+
+
+def make_dic(engine, nb_ite_MC, maintenance="False"):
+    return {
+        "service_life": 30,
+        "step": 1,
+        "num_hourPerYear": 666,
+        "nb_ite_MC": nb_ite_MC,
+        "Early_failure": "True",
+        "Random_failure": "True",
+        "Wearout_failure": "True",
+        "Maintenance": maintenance,
+        "maintenance": np.array([7.0, 5.0]),
+        "pre_set_fail": False,
+        "Remplacement_matrix": pd.DataFrame([[1, 1], [0, 1]]),
+        "engine": engine,
+    }
+
+
+class TestStaircaseEngines(unittest.TestCase):
+    nb_ite_MC = 2000
+
+    def run_engines(self, maintenance, engine="Vectorized"):
+        loop = STAIRCASE.from_arrays(
+            make_dic("Loop", self.nb_ite_MC, maintenance), EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW, rng=0
+        )
+        dic = make_dic(engine, self.nb_ite_MC, maintenance)
+        staircase = STAIRCASE.__new__(STAIRCASE)
+        staircase._setup(dic, EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW)
+        if engine == "Event":
+            staircase._creation_event(dic, rng=np.random.default_rng(0))
+        else:
+            staircase._creation_vectorized(dic, rng=np.random.default_rng(0))
+        return loop, staircase
+
+    def assert_same_distribution(self, loop, vectorized):
+        for name in ["EI_total", "EI_total_manu", "EI_total_use", "EI_total_maintenance", "number_of_fault", "RU_age"]:
+            a = getattr(loop, name)[-1]
+            b = getattr(vectorized, name)[-1]
+            self.assertEqual(a.shape, b.shape)
+            # difference of two independent means within 5 standard errors
+            tolerance = 5 * np.sqrt((a.var(axis=0) + b.var(axis=0)) / self.nb_ite_MC) + 1e-9
+            np.testing.assert_array_less(np.abs(a.mean(axis=0) - b.mean(axis=0)), tolerance, err_msg=name)
+
+    def test_vectorized_matches_loop(self):
+        self.assert_same_distribution(*self.run_engines("False"))
+
+    def test_vectorized_matches_loop_with_maintenance(self):
+        self.assert_same_distribution(*self.run_engines("True"))
+
+    def test_event_matches_loop(self):
+        self.assert_same_distribution(*self.run_engines("False", "Event"))
+
+    def test_event_matches_loop_with_maintenance(self):
+        self.assert_same_distribution(*self.run_engines("True", "Event"))
+
+    def test_vectorized_reproduces_loop_with_same_seed(self):
+        # both engines draw the same variates in the same order from the generator
+        for maintenance in ["False", "True"]:
+            loop, vectorized = (
+                STAIRCASE.from_arrays(make_dic(engine, 300, maintenance), EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW, rng=4)
+                for engine in ["Loop", "Vectorized"]
+            )
+            for name in ["number_of_fault", "RU_age", "fault_cause"]:
+                np.testing.assert_array_equal(getattr(loop, name), getattr(vectorized, name), err_msg=name)
+            np.testing.assert_allclose(loop.EI_total, vectorized.EI_total)
+
+    def test_seed_reproducible(self):
+        first, second = (
+            STAIRCASE.from_arrays(dict(make_dic("Loop", 100), seed=11), EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW)
+            for _ in range(2)
+        )
+        self.assertEqual(first.seed, 11)
+        np.testing.assert_array_equal(first.EI_total, second.EI_total)
+
+    def test_deterministic_use_phase(self):
+        loop, vectorized = self.run_engines("False")
+        np.testing.assert_allclose(loop.EI_total_use, vectorized.EI_total_use)
+
+
+class TestStaircaseStreaming(unittest.TestCase):
+    def test_streaming_matches_trajectories(self):
+        dic = make_dic("Vectorized", 500, "True")
+        dense = STAIRCASE.__new__(STAIRCASE)
+        dense._setup(dic, EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW)
+        dense._creation_vectorized(dic, rng=np.random.default_rng(3))
+
+        dic = dict(make_dic("Vectorized", 500, "True"), output="Statistics", batch_size=500)
+        streaming = STAIRCASE.__new__(STAIRCASE)
+        streaming._setup(dic, EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW)
+        streaming._creation_streaming(dic, rng=np.random.default_rng(3))
+
+        statistics = streaming.statistics
+        self.assertIsNone(streaming.EI_total)
+        self.assertEqual(statistics.count, 500)
+        for name in ["EI_total", "EI_total_manu", "EI_total_use", "EI_total_maintenance", "number_of_fault", "RU_age"]:
+            np.testing.assert_allclose(statistics.mean(name), getattr(dense, name).mean(axis=1), err_msg=name)
+        np.testing.assert_array_equal(statistics.max, dense.EI_total.max(axis=1))
+        np.testing.assert_array_equal(
+            statistics.fault_count(), [np.sum(dense.fault_cause == code) for code in [1, 2, 3]]
+        )
+
+    def test_final_step_distribution(self):
+        # with several steps per year, the distributions of the result table are the ones of the last step
+        dic = dict(make_dic("Vectorized", 500, "True"), step=4)
+        dense = STAIRCASE.__new__(STAIRCASE)
+        dense._setup(dic, EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW)
+        dense._creation_vectorized(dic, rng=np.random.default_rng(3))
+
+        dic = dict(dic, output="Statistics", batch_size=500)
+        streaming = STAIRCASE.__new__(STAIRCASE)
+        streaming._setup(dic, EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW)
+        streaming._creation_streaming(dic, rng=np.random.default_rng(3))
+
+        statistics = streaming.statistics
+        self.assertEqual(statistics.final_step, dense.usage_time - 1)
+        for name in ["EI_total", "EI_total_use"]:
+            final = getattr(dense, name)[-1]
+            np.testing.assert_allclose(statistics.final_std(name), final.std(axis=0), rtol=1e-9, err_msg=name)
+            np.testing.assert_allclose(statistics.final[name].quantile([0.5])[0], np.quantile(final, 0.5, axis=0),
+                                       rtol=0.03, err_msg=name)
+
+
+class TestFaultCause(unittest.TestCase):
+    def test_codes_round_trip(self):
+        names = np.array([["", "Early"], ["Wearout", "Random"]])
+        codes = encode_fault_cause(names)
+        self.assertEqual(codes.dtype, np.uint8)
+        np.testing.assert_array_equal(decode_fault_cause(codes), names)
+
+    def test_events_round_trip(self):
+        dic = make_dic("Vectorized", 200)
+        staircase = STAIRCASE.__new__(STAIRCASE)
+        staircase._setup(dic, EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW)
+        staircase._creation_vectorized(dic, rng=np.random.default_rng(1))
+        dense = staircase.fault_cause
+        events = fault_cause_events(dense)
+        self.assertEqual(events.dtype, FAULT_EVENT_DTYPE)
+        np.testing.assert_array_equal(fault_cause_dense(events, dense.shape), dense)
+        np.testing.assert_array_equal(count_fault_cause(events), count_fault_cause(dense))
+
+    def test_event_engine_sparse_output(self):
+        dense = STAIRCASE.from_arrays(make_dic("Event", 200), EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW, rng=2)
+        dic = dict(make_dic("Event", 200), fault_cause_format="Events")
+        sparse = STAIRCASE.from_arrays(dic, EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW, rng=2)
+        np.testing.assert_array_equal(sparse.fault_cause, fault_cause_events(dense.fault_cause))
+
+    def test_event_engine_sparse_output_by_batch(self):
+        folder = tempfile.mkdtemp()
+        try:
+            dic = make_dic("Event", 200, "True")
+            dense = STAIRCASE.from_arrays(dic, EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW, rng=2)
+            for output in ["Statistics", "Memory-mapped"]:
+                dic = dict(make_dic("Event", 200, "True"), fault_cause_format="Events", output=output, batch_size=200,
+                           LCA_path=folder)
+                sparse = STAIRCASE.from_arrays(dic, EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW, rng=2)
+                if output == "Statistics":
+                    np.testing.assert_allclose(sparse.statistics.mean("EI_total"), dense.EI_total.mean(axis=1))
+                    np.testing.assert_array_equal(sparse.statistics.fault_count(), count_fault_cause(dense.fault_cause))
+                else:
+                    np.testing.assert_array_equal(sparse.fault_cause, fault_cause_events(dense.fault_cause))
+        finally:
+            shutil.rmtree(folder)
+
+
+class TestStaircaseParallel(unittest.TestCase):
+    def run_workers(self, workers, **options):
+        dic = dict(make_dic("Vectorized", 250, "True"), workers=workers, seed=7, batch_size=100, **options)
+        return STAIRCASE.from_arrays(dic, EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW)
+
+    def test_same_outputs_for_any_worker_count(self):
+        single, pool = self.run_workers(1), self.run_workers(3)
+        for name in ["EI_total", "EI_total_manu", "EI_total_use", "EI_total_maintenance", "number_of_fault", "RU_age",
+                     "fault_cause"]:
+            self.assertEqual(getattr(single, name).shape[1], 250)
+            np.testing.assert_array_equal(getattr(single, name), getattr(pool, name), err_msg=name)
+
+    def test_same_statistics_for_any_worker_count(self):
+        single, pool = self.run_workers(1, output="Statistics"), self.run_workers(2, output="Statistics")
+        self.assertEqual(pool.statistics.count, 250)
+        np.testing.assert_array_equal(single.statistics.mean("EI_total"), pool.statistics.mean("EI_total"))
+        np.testing.assert_array_equal(single.statistics.percentile([10, 90]), pool.statistics.percentile([10, 90]))
+
+    def test_fault_events_merged_in_order(self):
+        dense, sparse = self.run_workers(1), self.run_workers(2, fault_cause_format="Events")
+        np.testing.assert_array_equal(sparse.fault_cause, fault_cause_events(dense.fault_cause))
+
+
+class TestStaircaseMemmap(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_memmap_matches_trajectories(self):
+        dic = make_dic("Vectorized", 300, "True")
+        dense = STAIRCASE.from_arrays(dic, EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW, rng=3)
+        dic = dict(make_dic("Vectorized", 300, "True"), output="Memory-mapped", batch_size=300, LCA_path=self.folder)
+        mapped = STAIRCASE.from_arrays(dic, EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW, rng=3)
+        self.assertIsInstance(mapped.EI_total, np.memmap)
+        for name in ["EI_total", "EI_total_manu", "EI_total_use", "EI_total_maintenance", "number_of_fault", "RU_age",
+                     "fault_cause"]:
+            np.testing.assert_allclose(getattr(mapped, name), getattr(dense, name), err_msg=name)
+        np.testing.assert_array_equal(count_fault_cause(mapped.fault_cause), count_fault_cause(dense.fault_cause))
+
+    def test_memmap_parallel(self):
+        dic = dict(make_dic("Vectorized", 250, "True"), seed=7, batch_size=100, LCA_path=self.folder)
+        single = STAIRCASE.from_arrays(dict(dic, workers=1), EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW)
+        mapped = STAIRCASE.from_arrays(dict(dic, workers=2, output="Memory-mapped"), EI_MANUFACTURING, EI_USE,
+                                       BETA_SIGMA_ERW)
+        self.assertIsInstance(mapped.RU_age, np.memmap)
+        np.testing.assert_array_equal(mapped.RU_age, single.RU_age)
+        np.testing.assert_allclose(mapped.EI_total, single.EI_total)
+
+
+class TestStaircaseReprojection(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_projection_from_counts(self):
+        staircase = STAIRCASE.from_arrays(make_dic("Loop", 100, "True"), EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW, rng=2)
+        self.assertEqual(staircase.replacement_count.dtype, np.uint8)
+        EI_manu = EI_MANUFACTURING.sum(axis=1) + np.zeros((100, 2))
+        for year in range(1, 30):
+            EI_manu = EI_manu + (staircase.replacement_count[year] + staircase.maintenance_count[year]) @ EI_MANUFACTURING.T
+            np.testing.assert_allclose(staircase.EI_total_manu[year], EI_manu)
+        fractional = dict(make_dic("Vectorized", 100), Remplacement_matrix=pd.DataFrame([[1, 0.5], [0, 1]]))
+        self.assertEqual(STAIRCASE.from_arrays(fractional, EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW,
+                                               rng=2).replacement_count.dtype, float)
+
+    def test_reproject_matches_new_run(self):
+        for engine in ["Loop", "Vectorized", "Event"]:
+            staircase = STAIRCASE.from_arrays(make_dic(engine, 200, "True"), EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW,
+                                              rng=4)
+            dic = dict(make_dic(engine, 200, "True"), num_hourPerYear=1000)
+            fresh = STAIRCASE.from_arrays(dic, 2 * EI_MANUFACTURING, 3 * EI_USE, BETA_SIGMA_ERW, rng=4)
+            staircase.reproject(dic, 2 * EI_MANUFACTURING, 3 * EI_USE)
+            for name in ["EI_total", "EI_total_manu", "EI_total_use", "EI_total_maintenance", "number_of_fault"]:
+                np.testing.assert_allclose(getattr(staircase, name), getattr(fresh, name), err_msg=engine + name)
+
+    def test_fault_samples_reused(self):
+        dic = dict(make_dic("Vectorized", 150, "True"), reuse_faults="True", LCA_path=self.folder)
+        first = STAIRCASE.from_arrays(dic, EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW, rng=5)
+        dic = dict(dic, num_hourPerYear=100)
+        # another generator: the faults can only be the same if they are read from the samples of the first run
+        second = STAIRCASE.from_arrays(dic, 2 * EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW, rng=6)
+        np.testing.assert_array_equal(second.RU_age, first.RU_age)
+        np.testing.assert_array_equal(second.fault_cause, first.fault_cause)
+        np.testing.assert_allclose(second.EI_total_manu, 2 * first.EI_total_manu)
+        np.testing.assert_allclose(second.EI_total_use, first.EI_total_use * 100 / 666)
+        changed = STAIRCASE.from_arrays(dict(dic, maintenance=np.array([6.0, 5.0])), EI_MANUFACTURING, EI_USE,
+                                        BETA_SIGMA_ERW, rng=6)
+        self.assertFalse(np.array_equal(changed.RU_age, first.RU_age))
+
+
+class TestSampling(unittest.TestCase):
+    def test_initial_uniforms(self):
+        time, kind = _initial_uniforms({"sampling": "Antithetic"}, np.random.default_rng(0), 101, 2)
+        np.testing.assert_allclose(time[0:100:2] + time[1:100:2], 1)
+        np.testing.assert_allclose(kind[0:100:2] + kind[1:100:2], 1)
+        time, kind = _initial_uniforms({"sampling": "Latin hypercube"}, np.random.default_rng(0), 800, 2)
+        # one draw in each of the 100 strata of every dimension of every block
+        for block in np.split(np.column_stack([time, kind]), 8):
+            np.testing.assert_array_equal(np.sort((block * 100).astype(int), axis=0), np.tile(np.arange(100), (4, 1)).T)
+        self.assertEqual(sampling_standard_error(time[:, 0] * 0 + 1, "Latin hypercube"), 0)
+
+    def test_sampling_standard_error(self):
+        for sampling in ["Random", "Antithetic", "Latin hypercube", "Sobol"]:
+            dic = dict(make_dic("Vectorized", 1000), Remplacement_matrix=pd.DataFrame(np.eye(2)), sampling=sampling)
+            staircase = STAIRCASE.from_arrays(dic, EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW, rng=0)
+            exact = STAIRCASE.from_arrays(dict(dic, engine="Renewal"), EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW)
+            standard_error = staircase.standard_error(dic)
+            self.assertTrue((standard_error > 0).all())
+            np.testing.assert_array_less(np.abs(staircase.EI_total[29].mean(axis=0) - exact.statistics.mean("EI_total")[29]),
+                                         5 * standard_error, err_msg=sampling)
+
+
+class TestStaircaseAdaptive(unittest.TestCase):
+    def test_stops_at_target_precision(self):
+        dic = dict(make_dic("Vectorized", 20000), batch_size=250, target_precision=0.002, seed=3)
+        staircase = STAIRCASE.from_arrays(dic, EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW)
+        trace = staircase.convergence
+        self.assertLess(dic["nb_ite_MC"], 20000)
+        self.assertEqual(staircase.EI_total.shape[1], dic["nb_ite_MC"])
+        self.assertEqual(trace["iterations"].iloc[-1], dic["nb_ite_MC"])
+        self.assertLessEqual(trace["relative precision"].iloc[-1], 0.002)
+        self.assertGreater(trace["relative precision"].iloc[-2], 0.002)
+        np.testing.assert_allclose(trace["0 mean"].iloc[-1], staircase.EI_total[29, :, 0].mean())
+        # the same batches as a parallel run of the same seed and batch size
+        parallel = STAIRCASE.from_arrays(dict(make_dic("Vectorized", dic["nb_ite_MC"]), batch_size=250, seed=3, workers=1),
+                                         EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW)
+        np.testing.assert_array_equal(parallel.EI_total, staircase.EI_total)
+
+    def test_statistics_output_and_budget(self):
+        dic = dict(make_dic("Vectorized", 5000), batch_size=500, time_budget=1e-9, output="Statistics", seed=0)
+        staircase = STAIRCASE.from_arrays(dic, EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW)
+        # the time budget is spent by the first round, the run stops after the minimum of two batches
+        self.assertEqual(dic["nb_ite_MC"], 1000)
+        self.assertEqual(staircase.statistics.count, 1000)
+        self.assertEqual(len(staircase.convergence), 2)
+
+
+    def test_last_step(self):
+        # with several steps per year, the precision is the one of the last step of the service life
+        for output in ("Trajectories", "Statistics"):
+            dic = dict(make_dic("Vectorized", 2000), batch_size=500, target_precision=1e-9, step=4, output=output,
+                       seed=0)
+            staircase = STAIRCASE.from_arrays(dic, EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW)
+            last = dic["service_life"] * 4 - 1
+            if output == "Trajectories":
+                mean, std = staircase.EI_total[last, :, 0].mean(), staircase.EI_total[last, :, 0].std()
+            else:
+                mean, std = staircase.statistics.mean("EI_total")[last, 0], staircase.statistics.std(last)[0]
+            np.testing.assert_allclose(staircase.convergence["0 mean"].iloc[-1], mean, err_msg=output)
+            np.testing.assert_allclose(staircase.standard_error(dic)[0], std / np.sqrt(2000), rtol=1e-3, err_msg=output)
+
+
+class TestImportanceSampling(unittest.TestCase):
+    def test_rare_early_failures(self):
+        # early failures only, about 5e-4 per RU over the service life
+        beta_sigma_ERW = BETA_SIGMA_ERW.copy()
+        beta_sigma_ERW[:, 0] = 1e7
+        dic = dict(make_dic("Vectorized", 2000), Remplacement_matrix=pd.DataFrame(np.eye(2)), Random_failure="False",
+                   Wearout_failure="False", importance_sampling=0.5)
+        staircase = STAIRCASE.from_arrays(dic, EI_MANUFACTURING, EI_USE, beta_sigma_ERW, rng=0)
+        exact = STAIRCASE.from_arrays(dict(dic, engine="Renewal"), EI_MANUFACTURING, EI_USE, beta_sigma_ERW)
+        self.assertEqual(staircase.weights.shape, (2000,))
+        # about half of the iterations have a fault instead of 2
+        self.assertGreater((staircase.number_of_fault[29].sum(axis=1) > 0).sum(), 500)
+        mean = np.average(staircase.EI_total[29], axis=0, weights=staircase.weights)
+        standard_error = staircase.standard_error(dic)
+        expected = exact.statistics.mean("EI_total")[29]
+        np.testing.assert_array_less(np.abs(mean - expected), 5 * standard_error)
+        np.testing.assert_array_less(standard_error, 0.05 * (expected - exact.EI_manufacturing_total))
+        # plain Monte Carlo would sample about 2 faults
+        counts = count_fault_cause(staircase.fault_cause, staircase.weights) / 2000
+        np.testing.assert_allclose(counts, exact.statistics.fault_count(), rtol=0.25, atol=1e-12)
+        # the same weighted statistics after a parallel run
+        parallel = STAIRCASE.from_arrays(dict(dic, workers=1, batch_size=500), EI_MANUFACTURING, EI_USE, beta_sigma_ERW,
+                                         rng=0)
+        self.assertEqual(parallel.weights.shape, (2000,))
+        np.testing.assert_allclose(np.average(parallel.EI_total[29], axis=0, weights=parallel.weights), expected, rtol=0.01)
@@ -0,0 +1,54 @@
+import unittest
+
+import numpy as np
+
+from step_statistics import PERCENT, StepStatistics, weighted_percentile
+from streaming import StreamingAccumulator
+
+
+class TestStepStatistics(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.values = np.cumsum(rng.random((12, 301, 3)), axis=0)
+        self.weights = rng.random(301)
+
+    def test_matches_per_step_loop(self):
+        # a few steps per block, so that the blocks are exercised
+        stats = StepStatistics.from_trajectories(self.values, block_size=3000)
+        for k, values in enumerate(self.values):
+            np.testing.assert_allclose(stats.percentile[k], np.percentile(values, PERCENT, axis=0))
+            np.testing.assert_allclose(stats.mean[k], values.mean(axis=0))
+            np.testing.assert_array_equal(stats.min[k], values.min(axis=0))
+            np.testing.assert_array_equal(stats.max[k], values.max(axis=0))
+        np.testing.assert_array_equal(stats.median, stats.percentile[:, 4])
+        percentile, mean, minimum, maximum = stats.select(2)
+        np.testing.assert_array_equal(percentile, stats.percentile[:, :, 2])
+
+    def test_weighted(self):
+        stats = StepStatistics.from_trajectories(self.values, self.weights, block_size=3000)
+        for k, values in enumerate(self.values):
+            for EI in range(3):
+                # reference: interpolation at the midpoints of the cumulated weights of the sorted values
+                order = np.argsort(values[:, EI])
+                cumulated = np.cumsum(self.weights[order])
+                position = 100 * (cumulated - self.weights[order] / 2) / cumulated[-1]
+                np.testing.assert_allclose(stats.percentile[k, :, EI], np.interp(PERCENT, position, values[order, EI]))
+            np.testing.assert_allclose(stats.mean[k], np.average(values, axis=0, weights=self.weights))
+        # equal weights: percentiles at the midpoints (Hazen)
+        np.testing.assert_allclose(weighted_percentile(self.values[5], PERCENT, np.ones(301)),
+                                   np.percentile(self.values[5], PERCENT, axis=0, method="hazen"))
+        weights = np.full(301, 1e-6)
+        weights[7] = 1
+        np.testing.assert_allclose(weighted_percentile(self.values[5], [50], weights)[0], self.values[5, 7], rtol=1e-3)
+
+    def test_from_accumulator(self):
+        accumulator = StreamingAccumulator(12, 1, 3, 11)
+        empty = np.zeros((301, 1))
+        for step, total in enumerate(self.values):
+            EI = {"EI_total": total, "EI_total_manu": total, "EI_total_use": total, "EI_total_maintenance": total}
+            accumulator.update(step, EI, empty, empty)
+        stats = StepStatistics.from_accumulator(accumulator)
+        exact = StepStatistics.from_trajectories(self.values)
+        np.testing.assert_allclose(stats.mean, exact.mean)
+        np.testing.assert_array_equal(stats.min, exact.min)
+        np.testing.assert_allclose(stats.percentile, exact.percentile, rtol=0.05)
@@ -0,0 +1,53 @@
+import unittest
+
+import numpy as np
+
+from streaming import EI_NAMES, QuantileSketch, RunningMoments, StreamingAccumulator
+
+
+class TestQuantileSketch(unittest.TestCase):
+    def test_relative_accuracy(self):
+        values = np.random.default_rng(0).lognormal(3, 1, (20000, 2)) * [1, -1]
+        sketch = QuantileSketch(2, relative_accuracy=0.01)
+        sketch.add(values)
+        q = np.array([0.1, 0.5, 0.9])
+        exact = np.quantile(values, q, axis=0, method="lower")
+        np.testing.assert_allclose(sketch.quantile(q), exact, rtol=0.011)
+
+    def test_merge_equals_single_sketch(self):
+        values = np.random.default_rng(1).normal(0, 10, (5000, 3))
+        single = QuantileSketch(3)
+        single.add(values)
+        merged = QuantileSketch(3)
+        for batch in np.array_split(values, 7):
+            part = QuantileSketch(3)
+            part.add(batch)
+            merged.merge(part)
+        q = np.linspace(0, 1, 11)
+        np.testing.assert_array_equal(merged.quantile(q), single.quantile(q))
+        self.assertEqual(merged.count, 5000)
+
+
+class TestRunningMoments(unittest.TestCase):
+    def test_merge_equals_single_pass(self):
+        values = np.random.default_rng(2).normal(100, 5, (3001, 2))
+        merged = RunningMoments(2)
+        for batch in np.array_split(values, 7):
+            merged.merge(RunningMoments(2).update(batch))
+        np.testing.assert_allclose(merged.mean, values.mean(axis=0))
+        np.testing.assert_allclose(merged.variance(), values.var(axis=0, ddof=1))
+        np.testing.assert_allclose(merged.half_width(), 1.96 * values.std(axis=0, ddof=1) / np.sqrt(3001))
+
+    def test_large_mean_small_spread(self):
+        # a sum of squares of 1e18 per iteration cancels completely against the squared mean at this spread
+        values = 1e9 + np.random.default_rng(3).normal(0, 1e-3, (4000, 2))
+        statistics = StreamingAccumulator(1, 1, 2, 0)
+        for batch in np.array_split(values, 8):
+            part = StreamingAccumulator(1, 1, 2, 0)
+            part.update(0, {name: batch for name in EI_NAMES}, np.zeros((len(batch), 1)), np.zeros((len(batch), 1)))
+            statistics.merge(part)
+        moments = RunningMoments.from_accumulator(statistics)
+        self.assertEqual(moments.count, 4000)
+        np.testing.assert_allclose(moments.variance(), values.var(axis=0, ddof=1), rtol=1e-3)
+        np.testing.assert_allclose(statistics.std(0), values.std(axis=0), rtol=1e-3)
+        np.testing.assert_allclose(statistics.final_std("EI_total"), values.std(axis=0), rtol=1e-3)
@@ -0,0 +1,64 @@
+import unittest
+
+import numpy as np
+
+from staircase import STAIRCASE, end_of_life_step
+from sweep import _run_point, apply_point, design_points, typed_point
+from test_staircase import BETA_SIGMA_ERW, EI_MANUFACTURING, EI_USE, make_dic
+
+
+class TestSweep(unittest.TestCase):
+    def test_grid(self):
+        points = design_points({"parameters": {"step": [1, 12], "beta_wearout[1]": [6, 8, 10]}})
+        self.assertEqual(len(points), 6)
+        self.assertEqual(points[0], {"step": 1, "beta_wearout[1]": 6})
+
+    def test_latin_hypercube(self):
+        spec = {"method": "lhs", "samples": 20, "seed": 0, "parameters": {"service_life": [10, 30], "sigma_early[0]": [50, 150]}}
+        points = design_points(spec)
+        self.assertEqual(len(points), 20)
+        service_life = [point["service_life"] for point in points]
+        self.assertTrue(all(isinstance(value, int) and 10 <= value <= 30 for value in service_life))
+        # one sample in each of the 20 strata of the range
+        sigma = np.array([point["sigma_early[0]"] for point in points])
+        self.assertEqual(sorted(((sigma - 50) // 5).astype(int)), list(range(20)))
+
+    def test_unknown_parameter(self):
+        with self.assertRaises(ValueError):
+            design_points({"parameters": {"beta_wearout": [6, 8]}})
+
+    def test_typed_point(self):
+        point = typed_point(["step", "maintenance[0]", "beta_wearout[1]"], np.array([3.6, 4.2, 7.5]))
+        self.assertEqual(point, {"step": 4, "maintenance[0]": 4, "beta_wearout[1]": 7.5})
+        self.assertIsInstance(point["step"], int)
+        self.assertIsInstance(point["beta_wearout[1]"], float)
+        with self.assertRaises(ValueError):
+            typed_point(["beta_wearout"], [6])
+
+    def test_apply_point(self):
+        dic = make_dic("Vectorized", 10)
+        point_dic, beta_sigma_ERW = apply_point(dic, BETA_SIGMA_ERW, {"step": 12, "beta_wearout[1]": 4, "maintenance[0]": 3})
+        self.assertEqual(point_dic["step"], 12)
+        self.assertEqual(beta_sigma_ERW[1, 5], 4)
+        self.assertEqual(point_dic["maintenance"][0], 3)
+        self.assertEqual(point_dic["Maintenance"], "True")
+        # the base inputs are left untouched
+        self.assertEqual(dic["step"], 1)
+        self.assertEqual(BETA_SIGMA_ERW[1, 5], 8)
+
+    def test_run_point(self):
+        dic = dict(make_dic("Vectorized", 200), EI_name=["GWP", "ADP"])
+        row = _run_point(dic, EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW, {"service_life": 10}, np.random.default_rng(0))
+        self.assertEqual(row["service_life"], 10)
+        self.assertLessEqual(row["GWP p10"], row["GWP p90"])
+        self.assertAlmostEqual(row["GWP mean"], row["GWP manufacturing mean"] + row["GWP use mean"])
+        self.assertGreater(row["faults mean"], 0)
+
+    def test_run_point_end_of_life(self):
+        # with several steps per year, the row reports the last step of the service life, service_life * step - 1
+        dic = dict(make_dic("Vectorized", 200), EI_name=["GWP", "ADP"], output="Statistics")
+        row = _run_point(dic, EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW, {"step": 4}, np.random.default_rng(0))
+        statistics = STAIRCASE.from_arrays(dict(dic, step=4), EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW,
+                                           rng=np.random.default_rng(0)).statistics
+        self.assertEqual(end_of_life_step(dict(dic, step=4)), dic["service_life"] * 4 - 1)
+        self.assertEqual(row["GWP mean"], statistics.mean("EI_total")[-1, 0])
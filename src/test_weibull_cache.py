@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from staircase import STAIRCASE
+from test_staircase import BETA_SIGMA_ERW, EI_MANUFACTURING, EI_USE, make_dic
+from weibull_cache import WeibullCache
+
+
+class TestWeibullCache(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def run_staircase(self, beta_sigma_ERW=BETA_SIGMA_ERW):
+        dic = dict(make_dic("Vectorized", 100), weibull_cache=self.folder)
+        return STAIRCASE.from_arrays(dic, EI_MANUFACTURING, EI_USE, beta_sigma_ERW, rng=1)
+
+    def test_cached_tables_give_same_results(self):
+        reference = STAIRCASE.from_arrays(make_dic("Vectorized", 100), EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW, rng=1)
+        first = self.run_staircase()
+        self.assertEqual(len(os.listdir(self.folder)), 1)
+        second = self.run_staircase()
+        self.assertEqual(len(os.listdir(self.folder)), 1)
+        np.testing.assert_array_equal(first.EI_total, reference.EI_total)
+        np.testing.assert_array_equal(second.EI_total, reference.EI_total)
+        np.testing.assert_array_equal(second.wcdf_total, reference.wcdf_total)
+
+    def test_new_parameters_new_entry(self):
+        self.run_staircase()
+        beta_sigma_ERW = BETA_SIGMA_ERW.copy()
+        beta_sigma_ERW[0, 4] = 20
+        self.run_staircase(beta_sigma_ERW)
+        self.assertEqual(len(os.listdir(self.folder)), 2)
+
+    def test_least_recently_used_evicted(self):
+        cache = WeibullCache(self.folder, max_bytes=2500)
+        table = np.zeros(100)  # 928 bytes with the .npy header
+        for key in ["a", "b"]:
+            cache.put(key, table)
+        os.utime(os.path.join(self.folder, "a.npy"), (0, 0))
+        os.utime(os.path.join(self.folder, "b.npy"), (1, 1))
+        self.assertIsNotNone(cache.get("a"))  # a becomes the most recently used
+        cache.put("c", table)
+        self.assertEqual(sorted(os.listdir(self.folder)), ["a.npy", "c.npy"])
+        self.assertLessEqual(cache.size(), 2500)
+
+    def test_file_system_errors(self):
+        # on Windows a table memory-mapped by another run can be neither replaced nor removed, and a read-only folder
+        # refuses the modification times: the run computes or reads the tables anyway
+        reference = STAIRCASE.from_arrays(make_dic("Vectorized", 100), EI_MANUFACTURING, EI_USE, BETA_SIGMA_ERW, rng=1)
+        with mock.patch("os.replace", side_effect=PermissionError):
+            np.testing.assert_array_equal(self.run_staircase().EI_total, reference.EI_total)
+        self.assertEqual(os.listdir(self.folder), [])  # no temporary file left
+        self.run_staircase()
+        with mock.patch("os.utime", side_effect=PermissionError):
+            np.testing.assert_array_equal(self.run_staircase().EI_total, reference.EI_total)
+        cache = WeibullCache(self.folder, max_bytes=0)
+        with mock.patch("os.remove", side_effect=PermissionError):
+            cache.put("a", np.zeros(100))
+        self.assertEqual(len(os.listdir(self.folder)), 2)
+
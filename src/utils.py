@@ -1,6 +1,9 @@
 import io
+import mmap
 import os
+import shutil
 
+import numpy as np
 from customtkinter import CTkImage
 from PIL import Image
 
@@ -17,12 +20,27 @@ def get_max_fig_size(figs):
 
 
 def export_data(path, file_name, file):
+    """Save file as path/file_name.npy. Fault causes are saved as their uint8 codes (or fault event list), see
+    export_fault_cause. A memory-mapped .npy file (Memory-mapped staircase output) is copied file to file."""
     file_name_pickel = file_name + ".npy"
     path_file_pickel = os.path.join(path, "", file_name_pickel)
+    if isinstance(file, np.memmap) and isinstance(file.base, mmap.mmap) and str(file.filename).endswith(".npy"):
+        if os.path.abspath(file.filename) != os.path.abspath(path_file_pickel):
+            shutil.copyfile(file.filename, path_file_pickel)
+        return
     with open(path_file_pickel, "wb") as f:
         np.save(f, file)
 
 
+def export_fault_cause(path, fault_cause):
+    """Save the fault cause codes (fault_cause.npy) and the table decoding them (fault_cause_labels.npy): the name of
+    code c is labels[c], "" meaning no fault."""
+    from staircase import FAULT_CAUSES
+
+    export_data(path, "fault_cause", fault_cause)
+    export_data(path, "fault_cause_labels", FAULT_CAUSES)
+
+
 def create_thumbnail(fig, size=(100, 100)):
     """Crée une image miniature de la figure pour la compatibilité CTkImage"""
     with io.BytesIO() as buf:
@@ -0,0 +1,120 @@
+"""PELCA (Power Electronics Life Cycle Assessment) is an open-source project aimed at assessing the environmental impact over the life cycle of modular and diagnosable power electronics systems. The integration of modularity and diagnosability aligns with circular economy principles, promoting practices such as repair and reuse. This project provides a tool to calculate the environmental impacts associated with the manufacturing, usage, and replacement of power electronics products.
+Copyright (C) Mitsubishi Electric R&D Centre Europe and SATIE 2024, author Briac Baudais baudaisbriac@gmail.com
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU Lesser General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with this program.  If not, see https://www.gnu.org/licenses/lgpl-3.0.html"""
+
+"""
+On-disk cache of the Weibull tables of the staircase, so that runs sharing fault parameters skip the scipy evaluation.
+"""
+
+import hashlib
+import os
+import uuid
+
+import numpy as np
+
+FAULT_TYPES = ("Early", "Random", "Wearout")
+
+
+def weibull_key(dic, t):
+    """Content hash of everything the Weibull tables depend on: time grid, enabled fault types, beta and sigma."""
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(t, dtype=float).tobytes())
+    for fault in FAULT_TYPES:
+        enabled = dic[fault + "_failure"] == "True"
+        digest.update(fault.encode() + bytes([enabled]))
+        if enabled:
+            digest.update(np.asarray(dic["beta_" + fault.lower()], dtype=float).tobytes())
+            digest.update(np.asarray(dic["sigma_" + fault.lower()], dtype=float).tobytes())
+    return digest.hexdigest()
+
+
+class WeibullCache:
+    """Folder of <key>.npy tables, evicted least recently used first when their total size exceeds max_bytes.
+
+    A hit refreshes the modification time of the file, which is the recency used by the eviction. Files are written
+    under a temporary name then renamed, so that parallel runs sharing the folder never read a partial table. The
+    cache never fails a run: a file system error (read-only folder, or on Windows a table memory-mapped by another
+    process that cannot be replaced or removed) is a miss, a table that is not stored or kept, never an exception.
+    """
+
+    def __init__(self, folder, max_bytes):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        try:
+            os.makedirs(folder, exist_ok=True)
+        except OSError:
+            pass  # every get is then a miss and every put returns the table in memory
+
+    def _path(self, key):
+        return os.path.join(self.folder, key + ".npy")
+
+    def get(self, key):
+        """Memory-mapped (read-only) table of key, None when not cached."""
+        path = self._path(key)
+        try:
+            table = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass  # read-only folder: the hit does not count for the eviction
+        return table
+
+    def put(self, key, table):
+        """Store table under key and return it memory-mapped, or as given when it cannot be stored."""
+        path = self._path(key)
+        temporary = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temporary, "wb") as f:
+                np.save(f, table)
+            os.replace(temporary, path)
+        except OSError:
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+            return table
+        self.evict(keep=path)
+        try:
+            return np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            return table
+
+    def evict(self, keep=None):
+        """Remove the least recently used tables until the cache fits in max_bytes (keep is never removed)."""
+        entries = []
+        try:
+            names = os.listdir(self.folder)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith(".npy"):
+                path = os.path.join(self.folder, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # removed by another run
+            except OSError:
+                continue  # memory-mapped by another run on Windows, kept
+            total -= size
+
+    def size(self):
+        return sum(os.path.getsize(os.path.join(self.folder, name)) for name in os.listdir(self.folder)
+                   if name.endswith(".npy"))